@@ -0,0 +1,248 @@
+"""
+Per-pair evaluation indexes for monitored alerts.
+Keeps ABOVE and BELOW price thresholds sorted so a tick only touches crossed alerts.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .alert_record import AlertRecord
+from .models import AlertDirection, AlertStatus, AlertType
+from .vector_engine import VectorAlertEngine
+
+
+class ThresholdIndex:
+    """Sorted ABOVE/BELOW thresholds per trading pair.
+
+    Only armed alerts live in the index. An ABOVE entry fires once the price
+    reaches its threshold and a BELOW entry once the price falls to it, after
+    which the owner removes it. Every resting entry is therefore on the far
+    side of the last seen price, and the bisected slice returned by
+    ``crossed`` is exactly the band between the previous and current price.
+    """
+
+    def __init__(self):
+        # pair -> sorted [(threshold, alert_id)]
+        self._above: Dict[str, List[Tuple[float, str]]] = {}
+        self._below: Dict[str, List[Tuple[float, str]]] = {}
+        # alert_id -> (pair, direction, threshold) so entries can be removed by id
+        self._entries: Dict[str, Tuple[str, AlertDirection, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._entries
+
+    def add(self, alert_id: str, pair: str, direction: AlertDirection, threshold: float) -> bool:
+        """Index an alert threshold. Returns False for directions a price target cannot fire on."""
+        if direction == AlertDirection.ABOVE:
+            book = self._above
+        elif direction == AlertDirection.BELOW:
+            book = self._below
+        else:
+            return False
+
+        self.remove(alert_id)
+        insort(book.setdefault(pair, []), (threshold, alert_id))
+        self._entries[alert_id] = (pair, direction, threshold)
+        return True
+
+    def remove(self, alert_id: str) -> bool:
+        """Drop an alert from the index if present."""
+        entry = self._entries.pop(alert_id, None)
+        if entry is None:
+            return False
+
+        pair, direction, threshold = entry
+        book = self._above if direction == AlertDirection.ABOVE else self._below
+        levels = book.get(pair)
+        if levels:
+            pos = bisect_left(levels, (threshold, alert_id))
+            if pos < len(levels) and levels[pos] == (threshold, alert_id):
+                del levels[pos]
+            if not levels:
+                del book[pair]
+        return True
+
+    def crossed(self, pair: str, price: float) -> List[str]:
+        """Alert ids whose thresholds the price has reached on this pair."""
+        hits: List[str] = []
+
+        above = self._above.get(pair)
+        if above and above[0][0] <= price:
+            # (price, max-char) sorts after every (price, alert_id) tuple
+            end = bisect_right(above, (price, "\uffff"))
+            hits.extend(alert_id for _, alert_id in above[:end])
+
+        below = self._below.get(pair)
+        if below and below[-1][0] >= price:
+            start = bisect_left(below, (price, ""))
+            hits.extend(alert_id for _, alert_id in below[start:])
+
+        return hits
+
+    def pairs(self) -> List[str]:
+        """Trading pairs that currently have indexed thresholds."""
+        return list(set(self._above) | set(self._below))
+
+    def get(self, alert_id: str) -> Optional[Tuple[str, AlertDirection, float]]:
+        """Return the (pair, direction, threshold) entry for an alert."""
+        return self._entries.get(alert_id)
+
+    def load(self, entries: Iterable[Tuple[str, str, AlertDirection, float]]) -> None:
+        """Bulk-index (alert_id, pair, direction, threshold) entries into an empty index.
+
+        Appends and sorts each book once instead of an insort per entry.
+        """
+        for alert_id, pair, direction, threshold in entries:
+            if direction == AlertDirection.ABOVE:
+                book = self._above
+            elif direction == AlertDirection.BELOW:
+                book = self._below
+            else:
+                continue
+            book.setdefault(pair, []).append((threshold, alert_id))
+            self._entries[alert_id] = (pair, direction, threshold)
+        for book in (self._above, self._below):
+            for levels in book.values():
+                levels.sort()
+
+    def clear(self) -> None:
+        self._above.clear()
+        self._below.clear()
+        self._entries.clear()
+
+
+class AlertSnapshot:
+    """Alerts plus their evaluation indexes, published to the manager as one unit.
+
+    A sync builds a fresh snapshot off to the side and the manager swaps it in
+    with a single reference assignment, so a tick never sees a half-loaded
+    index. Point mutations (create, status change, trigger) are applied to the
+    live snapshot in place.
+
+    With ``vector=True`` armed alerts are held in a VectorAlertEngine instead
+    of the threshold index and scan buckets, and are evaluated in batches.
+
+    Every stored alert, armed or not, is also listed by user, status and
+    trading pair, so listings and counts cost O(result). Status changes must
+    go through ``set_status`` to keep those in step.
+    """
+
+    def __init__(self, vector: bool = False):
+        self.alerts: Dict[str, AlertRecord] = {}
+        self.vector: Optional[VectorAlertEngine] = VectorAlertEngine() if vector else None
+        # Armed PRICE_TARGET thresholds, sorted per trading pair
+        self.price_index = ThresholdIndex()
+        # Armed alerts that still need a per-tick check (percentage change), keyed by trading pair
+        self.scan_by_pair: Dict[str, Dict[str, AlertRecord]] = {}
+        # Secondary indexes over all stored alerts
+        self.by_user: Dict[str, Dict[str, AlertRecord]] = {}
+        self.by_status: Dict[AlertStatus, Dict[str, AlertRecord]] = {status: {} for status in AlertStatus}
+        self.by_pair: Dict[str, Dict[str, AlertRecord]] = {}
+
+    @classmethod
+    def build(cls, alerts: Iterable[AlertRecord], vector: bool = False) -> "AlertSnapshot":
+        """Build a complete snapshot from already converted alerts (the last one per id wins)."""
+        snapshot = cls(vector)
+        snapshot.alerts = {alert.id: alert for alert in alerts}
+        # Nothing to replace yet, so store()'s unindex/unlink pass is skipped and
+        # price targets are sorted into the threshold index in one go
+        thresholds = []
+        for alert in snapshot.alerts.values():
+            snapshot._link(alert)
+            if (vector or alert.status != AlertStatus.ACTIVE or alert.alert_type != AlertType.PRICE_TARGET):
+                snapshot.index(alert)
+            else:
+                thresholds.append((alert.id, alert.pair, alert.direction, alert.target_value))
+        snapshot.price_index.load(thresholds)
+        return snapshot
+
+    def store(self, alert: AlertRecord) -> None:
+        """Insert or replace an alert and keep the indexes in step."""
+        self.unindex(alert.id)
+        old = self.alerts.get(alert.id)
+        if old is not None:
+            self._unlink(old)
+        self.alerts[alert.id] = alert
+        self._link(alert)
+        self.index(alert)
+
+    def discard(self, alert_id: str) -> Optional[AlertRecord]:
+        """Remove an alert entirely."""
+        self.unindex(alert_id)
+        alert = self.alerts.pop(alert_id, None)
+        if alert is not None:
+            self._unlink(alert)
+        return alert
+
+    def set_status(self, alert: AlertRecord, status: AlertStatus) -> None:
+        """Change an alert's status, arming or disarming it to match."""
+        if self.alerts.get(alert.id) is not alert:
+            # Replaced or removed by a sync; nothing here refers to this record
+            alert.status = status
+            return
+        self.unindex(alert.id)
+        del self.by_status[alert.status][alert.id]
+        alert.status = status
+        self.by_status[status][alert.id] = alert
+        self.index(alert)
+
+    def _link(self, alert: AlertRecord) -> None:
+        self.by_user.setdefault(alert.user_id, {})[alert.id] = alert
+        self.by_status[alert.status][alert.id] = alert
+        self.by_pair.setdefault(alert.pair, {})[alert.id] = alert
+
+    def _unlink(self, alert: AlertRecord) -> None:
+        self.by_status[alert.status].pop(alert.id, None)
+        for index, key in ((self.by_user, alert.user_id), (self.by_pair, alert.pair)):
+            bucket = index.get(key)
+            if bucket and bucket.pop(alert.id, None) is not None and not bucket:
+                del index[key]
+
+    def count(self, status: AlertStatus) -> int:
+        return len(self.by_status[status])
+
+    def shrink(self) -> None:
+        """Re-copy the id and status maps; dicts keep their peak table size after deletes."""
+        self.alerts = dict(self.alerts)
+        self.by_status = {status: dict(bucket) for status, bucket in self.by_status.items()}
+
+    def index(self, alert: AlertRecord) -> None:
+        """Arm an alert in the per-pair indexes if it can currently fire."""
+        if alert.status != AlertStatus.ACTIVE:
+            return
+        pair = alert.pair
+        if self.vector is not None:
+            self.vector.add(alert.id, pair, alert.alert_type, alert.direction, alert.target_value, alert.baseline_price)
+        elif alert.alert_type == AlertType.PRICE_TARGET:
+            self.price_index.add(alert.id, pair, alert.direction, alert.target_value)
+        elif alert.alert_type == AlertType.PERCENTAGE_CHANGE:
+            self.scan_by_pair.setdefault(pair, {})[alert.id] = alert
+
+    def unindex(self, alert_id: str) -> None:
+        """Disarm an alert from the per-pair indexes."""
+        if self.vector is not None:
+            self.vector.remove(alert_id)
+            return
+        if self.price_index.remove(alert_id):
+            return
+        alert = self.alerts.get(alert_id)
+        if alert is None:
+            return
+        pair = alert.pair
+        bucket = self.scan_by_pair.get(pair)
+        if bucket and bucket.pop(alert_id, None) is not None and not bucket:
+            del self.scan_by_pair[pair]
+
+    def pairs(self) -> Set[str]:
+        """Trading pairs with at least one armed alert."""
+        if self.vector is not None:
+            return self.vector.pairs()
+        return set(self.price_index.pairs()).union(self.scan_by_pair)
+
+    def candidates(self, pair: str, price: float) -> List[AlertRecord]:
+        """Armed alerts on a pair that need evaluating at this price."""
+        alerts = [self.alerts[alert_id] for alert_id in self.price_index.crossed(pair, price)]
+        alerts.extend(self.scan_by_pair.get(pair, {}).values())
+        return alerts
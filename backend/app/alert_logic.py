@@ -3,26 +3,105 @@ Enhanced Alert Manager with database synchronization.
 Bridges the gap between Supabase database alerts and real-time monitoring.
 """
 import asyncio
+import heapq
 import logging
-from typing import Dict, List, Optional
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from .models import (
     Alert, AlertType, AlertDirection, AlertStatus, AlertTriggerEvent, 
     DatabaseAlert, NotificationType
 )
 from .alerts import notification_service
-from .database import supabase_client
+from .alert_index import AlertSnapshot
+from .alert_record import AlertRecord, ColdAlertFields, compact_notifications
+from .lookup_cache import TTLCache
+from .database import SupabaseClient, supabase_client
+from .vector_engine import VECTOR_ENGINE_AVAILABLE
+from .write_behind import WriteBehindBuffer, trigger_writes
 
 logger = logging.getLogger(__name__)
 
+# Database alert_type / condition_type values to the engine's enums
+ALERT_TYPE_MAP = {
+    'price': AlertType.PRICE_TARGET,
+    'percent_change': AlertType.PERCENTAGE_CHANGE,
+    'percentage': AlertType.PERCENTAGE_CHANGE,
+    'volume': AlertType.VOLUME,
+    'technical_indicator': AlertType.TECHNICAL_INDICATOR
+}
+
+# A fired recurring alert re-arms after its cooldown: cooldown_minutes when set, else the
+# period of its recurring_frequency, else RECURRING_ALERT_COOLDOWN_SECONDS
+RECURRENCE_PERIODS = {
+    'hourly': 3600.0,
+    'daily': 86400.0,
+    'weekly': 7 * 86400.0,
+    'monthly': 30 * 86400.0,
+}
+RECURRING_ALERT_COOLDOWN = float(os.getenv("RECURRING_ALERT_COOLDOWN_SECONDS", "30"))
+
+
+def recurrence_cooldown(db_alert: Dict) -> Optional[float]:
+    """Seconds a recurring alert row waits between fires, or None for the default."""
+    minutes = db_alert.get('cooldown_minutes') or 0
+    if minutes > 0:
+        return minutes * 60.0
+    return RECURRENCE_PERIODS.get(db_alert.get('recurring_frequency'))
+
+
+DIRECTION_MAP = {
+    'price_above': AlertDirection.ABOVE,
+    'price_below': AlertDirection.BELOW,
+    'price_between': AlertDirection.BOTH,
+    'percentage_increase': AlertDirection.ABOVE,
+    'percentage_decrease': AlertDirection.BELOW,
+    'percentage_change': AlertDirection.BOTH
+}
+
 class AlertManager:
     """Enhanced Alert Manager with database synchronization capabilities."""
     
-    def __init__(self):
-        self.alerts: Dict[str, Alert] = {}  # In-memory alert storage
+    def __init__(self, db=None, notifier=None, vector_engine: Optional[bool] = None,
+                 writes: Optional[WriteBehindBuffer] = None):
+        # Data access and notification delivery; swappable for in-memory stand-ins in benchmarks
+        self.db = db or supabase_client
+        self.notifier = notifier or notification_service
+        # Trigger side-effects are written behind the evaluation loop in batches
+        self.writes = writes or (trigger_writes if self.db is supabase_client else WriteBehindBuffer(self.db))
+        # ALERT_ENGINE=numpy evaluates tick batches with the NumPy engine when it is installed
+        if vector_engine is None:
+            vector_engine = os.getenv("ALERT_ENGINE", "").lower() == "numpy"
+            if vector_engine and not VECTOR_ENGINE_AVAILABLE:
+                logger.warning("⚠️ ALERT_ENGINE=numpy but numpy is not installed; using the indexed engine")
+                vector_engine = False
+        self.use_vector_engine = vector_engine
+        # In-memory alerts and their per-pair indexes; replaced wholesale by each sync
+        self._snapshot = AlertSnapshot(vector=self.use_vector_engine)
+        self._sync_lock = asyncio.Lock()
+        # Alert ids mutated locally while a sync is building its snapshot
+        self._touched_during_sync: Optional[set] = None
         self.last_sync: Optional[datetime] = None
         self.last_sync_time: Optional[str] = None  # ISO format for easy serialization
         self.sync_interval = 30  # seconds
+        # Delta sync: newest alerts.updated_at applied so far. A full reload every N syncs is the
+        # backstop for rows committed late with an updated_at already behind the mark
+        self._sync_high_water: Optional[str] = None
+        self._syncs_since_full = 0
+        self.full_sync_every = 20
+        # Single-alert lookups for ids outside the monitored set (inactive or missing rows),
+        # plus the in-flight fetch per id so concurrent lookups share one query
+        self._lookup_cache: TTLCache[AlertRecord] = TTLCache(max_entries=10_000, ttl=30.0)
+        self._lookups: Dict[str, asyncio.Future] = {}
+        # Called when the manager arms alerts on its own (single-alert lookups, recurring re-arms),
+        # so whoever follows the monitored pairs hears about it; syncs are reported by their callers
+        self.on_alerts_changed: Optional[Callable[[], None]] = None
+        # Fired recurring alerts waiting out their cooldown: (monotonic due time, alert id), plus the
+        # due time per id so rescheduling leaves stale heap entries to be skipped
+        self.recurring_cooldown = RECURRING_ALERT_COOLDOWN
+        self._rearm_heap: List[Tuple[float, str]] = []
+        self._rearm_due: Dict[str, float] = {}
         # Symbol mapping for crypto symbols to trading pairs
         self.symbol_to_pair = {
             "BTC": "BTCUSDT",
@@ -61,6 +140,21 @@ class AlertManager:
         }
         logger.info("🔧 AlertManager initialized with symbol mapping")
     
+    @property
+    def alerts(self) -> Dict[str, AlertRecord]:
+        """Alerts in the currently published snapshot."""
+        return self._snapshot.alerts
+    
+    @property
+    def snapshot(self) -> AlertSnapshot:
+        """The currently published snapshot (alerts plus their indexes)."""
+        return self._snapshot
+    
+    @property
+    def sync_high_water(self) -> Optional[str]:
+        """Newest ``alerts.updated_at`` applied so far (the delta sync cursor)."""
+        return self._sync_high_water
+    
     def get_trading_pair(self, symbol: str) -> str:
         """Convert crypto symbol to trading pair for price lookup."""
         symbol = symbol.upper()
@@ -70,216 +164,562 @@ class AlertManager:
         # Convert crypto symbol to trading pair
         return self.symbol_to_pair.get(symbol, f"{symbol}USDT")
     
+    def get_monitored_pairs(self) -> Set[str]:
+        """Trading pairs that armed alerts need price data for."""
+        return self._snapshot.pairs()
+    
     def get_crypto_symbol(self, pair: str) -> str:
         """Convert trading pair back to crypto symbol."""
         if pair.endswith("USDT"):
             return pair[:-4]  # Remove "USDT" suffix
         return pair
     
-    async def sync_database_alerts(self) -> int:
-        """Sync alerts from Supabase database to memory for monitoring."""
-        try:
-            db_alerts = await supabase_client.fetch_active_alerts()
-            
-            # Clear existing database alerts and reload
-            db_alert_ids = set()
-            
-            for db_alert in db_alerts:
-                # Convert database alert to Alert model
-                alert = self._convert_db_alert_to_model(db_alert)
-                if alert:
-                    self.alerts[alert.id] = alert
-                    db_alert_ids.add(alert.id)
-            
-            # Remove alerts that are no longer in database
-            self._cleanup_stale_alerts(db_alert_ids)
-            
-            self.last_sync = datetime.now()
-            self.last_sync_time = self.last_sync.isoformat()
-            logger.info(f"✅ Synced {len(db_alerts)} alerts from database at {self.last_sync_time}")
-            return len(db_alerts)
-            
-        except Exception as e:
-            logger.error(f"❌ Database sync failed: {e}")
-            return 0
+    async def sync_database_alerts(self, full: bool = False) -> Optional[int]:
+        """Sync alerts from Supabase database to memory for monitoring.
+
+        Normally a delta sync: only alerts whose ``updated_at`` moved past the
+        high-water mark are fetched and applied, plus an id-only check for
+        deleted or deactivated rows. The first sync, every ``full_sync_every``-th
+        sync and ``full=True`` reload everything instead; the new alert set is
+        converted and indexed in a worker thread and then published with a
+        single snapshot swap, so tick evaluation never waits on the rebuild.
+        Returns the number of alerts applied, or None if the sync failed and
+        the current alerts were kept.
+        """
+        async with self._sync_lock:
+            try:
+                self._touched_during_sync = set()
+                # Buffered trigger writes must land before rows are re-read, or a fired alert comes back armed
+                await self.writes.flush()
+                if full or self._sync_high_water is None or self._syncs_since_full >= self.full_sync_every:
+                    count = await self._full_sync()
+                    self._syncs_since_full = 0
+                else:
+                    count = await self._delta_sync()
+                    self._syncs_since_full += 1
+                
+                self.last_sync = datetime.now()
+                self.last_sync_time = self.last_sync.isoformat()
+                return count
+                
+            except Exception as e:
+                logger.error(f"❌ Database sync failed: {e}")
+                return None
+            finally:
+                self._touched_during_sync = None
+    
+    async def restore_alerts(self, alerts: List[AlertRecord], sync_high_water: Optional[str]) -> None:
+        """Publish alerts loaded from a warm-start snapshot (see app/warm_start.py).
+
+        The snapshot's high-water mark comes with them, so the next sync is a
+        delta that reconciles whatever changed in the database since it was saved.
+        Recurring alerts saved mid-cooldown get their re-arm rescheduled from
+        ``triggered_at``; those whose cooldown ran out while the process was
+        down re-arm straight away.
+        """
+        async with self._sync_lock:
+            snapshot = await asyncio.to_thread(AlertSnapshot.build, alerts, self.use_vector_engine)
+            self._snapshot = snapshot
+            self._lookup_cache.clear()
+            self._rearm_heap.clear()
+            self._rearm_due.clear()
+            for alert in snapshot.by_status[AlertStatus.TRIGGERED].values():
+                if not alert.is_one_time and alert.triggered_at is not None:
+                    self._schedule_rearm(alert)
+            self._sync_high_water = sync_high_water
+            self._syncs_since_full = 0
+        self._rearm_expired()
+    
+    async def _full_sync(self) -> int:
+        """Reload every active alert into a fresh snapshot."""
+        db_alerts = await self.db.fetch_active_alerts()
+        if db_alerts is None:
+            raise RuntimeError("full fetch failed; keeping the current alerts")
+        
+        previous = self._snapshot
+        snapshot = await asyncio.to_thread(
+            self._build_snapshot, db_alerts, previous, list(previous.alerts)
+        )
+        
+        # Local changes made while the snapshot was building win over the fetched rows
+        for alert_id in self._touched_during_sync:
+            alert = previous.alerts.get(alert_id)
+            if alert is not None:
+                snapshot.store(alert)
+        
+        self._snapshot = snapshot
+        self._lookup_cache.clear()
+        self._schedule_rearms(snapshot)
+        self._advance_high_water(db_alerts)
+        logger.info(f"✅ Synced {len(db_alerts)} alerts from database at {datetime.now().isoformat()}")
+        return len(db_alerts)
+    
+    async def _delta_sync(self) -> int:
+        """Apply alerts changed since the high-water mark to the live snapshot."""
+        changed, active_ids = await asyncio.gather(
+            self.db.fetch_changed_alerts(self._sync_high_water),
+            self.db.fetch_active_alert_ids(),
+        )
+        if changed is None or active_ids is None:
+            raise RuntimeError("delta fetch failed; keeping the current alerts")
+        
+        snapshot = self._snapshot
+        touched = self._touched_during_sync
+        applied = self._apply_changed_rows(changed)
+        
+        # Tombstones: rows deleted outright never show up as changed
+        active = set(active_ids)
+        for alert_id in [a for a in snapshot.alerts if a not in active and a not in touched]:
+            snapshot.discard(alert_id)
+            applied += 1
+            logger.info(f"🗑️ Removed stale alert: {alert_id}")
+        
+        self._advance_high_water(changed)
+        if applied:
+            logger.info(f"✅ Delta sync applied {applied} alert changes ({len(changed)} rows since {self._sync_high_water})")
+        return applied
+    
+    async def apply_alert_changes(self, alert_ids: Iterable[str]) -> int:
+        """Re-read the given alerts and apply them to the live snapshot.
+
+        Used by the change feed: only the alerts named in notifications are
+        fetched, and an id with no row left is removed. Raises if the fetch
+        fails so the caller can fall back to a full resync.
+        """
+        alert_ids = list(alert_ids)
+        async with self._sync_lock:
+            try:
+                self._touched_during_sync = set()
+                await self.writes.flush()
+                rows = await self.db.fetch_alerts_by_ids(alert_ids)
+                if rows is None:
+                    raise RuntimeError(f"fetch of {len(alert_ids)} changed alerts failed")
+                
+                applied = self._apply_changed_rows(rows)
+                found = {row.get('id') for row in rows}
+                for alert_id in alert_ids:
+                    self._lookup_cache.invalidate(alert_id)
+                    if alert_id not in found and alert_id not in self._touched_during_sync:
+                        if self._snapshot.discard(alert_id) is not None:
+                            applied += 1
+                            logger.info(f"🗑️ Removed deleted alert: {alert_id}")
+                return applied
+            finally:
+                self._touched_during_sync = None
+    
+    def _apply_changed_rows(self, db_alerts: List[Dict]) -> int:
+        """Store or drop changed database rows in the live snapshot."""
+        snapshot = self._snapshot
+        touched = self._touched_during_sync
+        applied = 0
+        for db_alert in db_alerts:
+            alert_id = db_alert.get('id')
+            self._lookup_cache.invalidate(alert_id)
+            # A local trigger or edit made while fetching is newer than this row
+            if alert_id in touched:
+                continue
+            alert = self._convert_db_alert(db_alert) if db_alert.get('is_active', True) else None
+            if alert is None:
+                if snapshot.discard(alert_id) is not None:
+                    applied += 1
+                    logger.info(f"🗑️ Removed inactive alert: {alert_id}")
+                continue
+            old = snapshot.alerts.get(alert.id)
+            if old is not None and old.baseline_price and not alert.baseline_price:
+                alert.baseline_price = old.baseline_price
+            self._carry_trigger_state(old, alert)
+            snapshot.store(alert)
+            applied += 1
+        return applied
+    
+    def _advance_high_water(self, db_alerts: List[Dict]) -> None:
+        """Move the delta high-water mark to the newest ``updated_at`` seen."""
+        stamps = [row['updated_at'] for row in db_alerts if row.get('updated_at')]
+        if stamps:
+            newest = max(stamps, key=self._parse_timestamp)
+            if self._sync_high_water is None or self._parse_timestamp(newest) > self._parse_timestamp(self._sync_high_water):
+                self._sync_high_water = newest
+    
+    @staticmethod
+    def _parse_timestamp(value: str) -> datetime:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    
+    def _build_snapshot(self, db_alerts: List[Dict], previous: AlertSnapshot, previous_ids: List[str]) -> AlertSnapshot:
+        """Convert database rows into a new snapshot (runs off the event loop)."""
+        alerts = []
+        for db_alert in db_alerts:
+            # Convert database alert to a runtime record
+            alert = self._convert_db_alert(db_alert)
+            if alert:
+                # Keep the lazily captured percentage baseline across syncs
+                old = previous.alerts.get(alert.id)
+                if old is not None and old.baseline_price and not alert.baseline_price:
+                    alert.baseline_price = old.baseline_price
+                self._carry_trigger_state(old, alert)
+                alerts.append(alert)
+        snapshot = AlertSnapshot.build(alerts, vector=self.use_vector_engine)
+        
+        # Alerts that are no longer in database are simply absent from the new snapshot
+        for alert_id in previous_ids:
+            if alert_id not in snapshot.alerts:
+                logger.info(f"🗑️ Removed stale alert: {alert_id}")
+        
+        return snapshot
+    
+    def _cooldown(self, alert: AlertRecord) -> float:
+        cooldown = alert.cold.cooldown
+        return self.recurring_cooldown if cooldown is None else cooldown
+    
+    def _cooling_down(self, alert: AlertRecord) -> bool:
+        """A fired recurring alert whose cooldown has not run out yet."""
+        return (alert.status == AlertStatus.TRIGGERED and not alert.is_one_time and alert.triggered_at is not None
+                and (datetime.now() - alert.triggered_at).total_seconds() < self._cooldown(alert))
+    
+    def _carry_trigger_state(self, old: Optional[AlertRecord], alert: AlertRecord) -> None:
+        """Keep a re-read recurring alert disarmed while the record it replaces cools down.
+
+        The trigger bookkeeping write bumps ``updated_at`` (and notifies the
+        change feed), so without this the row an alert's own fire produced
+        would re-arm it straight away.
+        """
+        if old is not None and not alert.is_one_time and self._cooling_down(old):
+            alert.status = AlertStatus.TRIGGERED
+            alert.triggered_at = old.triggered_at
+            alert.current_price = old.current_price
+            alert.trigger_count = max(alert.trigger_count, old.trigger_count)
+    
+    def _schedule_rearm(self, alert: AlertRecord) -> None:
+        remaining = self._cooldown(alert) - (datetime.now() - alert.triggered_at).total_seconds()
+        due = time.monotonic() + max(0.0, remaining)
+        self._rearm_due[alert.id] = due
+        heapq.heappush(self._rearm_heap, (due, alert.id))
     
-    def _convert_db_alert_to_model(self, db_alert: Dict) -> Optional[Alert]:
-        """Convert database alert format to Alert model for monitoring."""
+    def _schedule_rearms(self, snapshot: AlertSnapshot) -> None:
+        """Queue re-arms for the cooling-down alerts of a freshly published snapshot."""
+        for alert in snapshot.by_status[AlertStatus.TRIGGERED].values():
+            if self._cooling_down(alert) and alert.id not in self._rearm_due:
+                self._schedule_rearm(alert)
+    
+    def _rearm_expired(self) -> None:
+        """Re-arm recurring alerts whose cooldown has run out."""
+        heap = self._rearm_heap
+        now = time.monotonic()
+        rearmed = False
+        while heap and heap[0][0] <= now:
+            due, alert_id = heapq.heappop(heap)
+            if self._rearm_due.get(alert_id) != due:
+                continue  # Rescheduled since
+            del self._rearm_due[alert_id]
+            alert = self.alerts.get(alert_id)
+            if alert is None or alert.status != AlertStatus.TRIGGERED or alert.is_one_time:
+                continue
+            if self._cooling_down(alert):
+                self._schedule_rearm(alert)
+                continue
+            self._snapshot.set_status(alert, AlertStatus.ACTIVE)
+            self._note_local_change(alert_id)
+            rearmed = True
+            logger.info(f"🔁 Re-armed recurring alert {alert_id}")
+        if rearmed:
+            self._alerts_changed()
+    
+    def _alerts_changed(self) -> None:
+        if self.on_alerts_changed is not None:
+            self.on_alerts_changed()
+    
+    def _note_local_change(self, alert_id: str) -> None:
+        """Record a local mutation so an in-flight sync carries it over."""
+        if self._touched_during_sync is not None:
+            self._touched_during_sync.add(alert_id)
+    
+    def _convert_db_alert(self, db_alert: Dict) -> Optional[AlertRecord]:
+        """Convert database alert format to a runtime record for monitoring."""
         try:
             # Extract condition data
             conditions = db_alert.get('alert_conditions', [])
             condition = conditions[0] if conditions else {}
             
-            # Extract notification data
-            notifications = db_alert.get('alert_notifications', [])
-            
-            # Map database fields to Alert model
-            alert_type_map = {
-                'price': AlertType.PRICE_TARGET,
-                'percent_change': AlertType.PERCENTAGE_CHANGE,
-                'percentage': AlertType.PERCENTAGE_CHANGE,
-                'volume': AlertType.VOLUME,
-                'technical_indicator': AlertType.TECHNICAL_INDICATOR
-            }
-            
-            direction_map = {
-                'price_above': AlertDirection.ABOVE,
-                'price_below': AlertDirection.BELOW,
-                'price_between': AlertDirection.BOTH,
-                'percentage_increase': AlertDirection.ABOVE,
-                'percentage_decrease': AlertDirection.BELOW,
-                'percentage_change': AlertDirection.BOTH
-            }
+            alert_type = ALERT_TYPE_MAP.get(db_alert.get('alert_type'), AlertType.PRICE_TARGET)
+            direction = DIRECTION_MAP.get(condition.get('condition_type', 'price_above'), AlertDirection.ABOVE)
+            symbol = db_alert['symbol'].upper()
             
-            alert_type = alert_type_map.get(
-                db_alert.get('alert_type'), 
-                AlertType.PRICE_TARGET
+            # Messages and notification targets are only read once the alert fires
+            cold = ColdAlertFields(
+                db_alert['user_id'],
+                db_alert.get('description', ''),
+                db_alert['created_at'],
+                compact_notifications(db_alert.get('alert_notifications', [])),
+                recurrence_cooldown(db_alert),
             )
-            
-            condition_type = condition.get('condition_type', 'price_above')
-            direction = direction_map.get(condition_type, AlertDirection.ABOVE)
-            
-            return Alert(
+            return AlertRecord(
                 id=db_alert['id'],
-                user_id=db_alert['user_id'],
-                symbol=db_alert['symbol'].upper(),
+                symbol=symbol,
+                pair=self.get_trading_pair(symbol),
                 alert_type=alert_type,
                 direction=direction,
                 target_value=float(condition.get('target_value', 0)),
-                status=AlertStatus.ACTIVE,
-                message=db_alert.get('description', ''),
-                created_at=datetime.fromisoformat(
-                    db_alert['created_at'].replace('Z', '+00:00') 
-                    if 'Z' in db_alert['created_at'] 
-                    else db_alert['created_at']
-                ),
+                cold=cold,
                 trigger_count=db_alert.get('trigger_count', 0),
                 is_one_time=not db_alert.get('is_recurring', True),
-                notification_data=notifications
             )
             
         except Exception as e:
             logger.error(f"❌ Failed to convert database alert: {e}")
             return None
     
-    def _cleanup_stale_alerts(self, current_db_alert_ids: set):
-        """Remove alerts that are no longer in the database."""
-        stale_alerts = []
-        for alert_id, alert in self.alerts.items():
-            # Only remove database alerts that are no longer active
-            if alert_id not in current_db_alert_ids and hasattr(alert, 'user_id'):
-                stale_alerts.append(alert_id)
-        
-        for alert_id in stale_alerts:
-            del self.alerts[alert_id]
-            logger.info(f"🗑️ Removed stale alert: {alert_id}")
-
-    def create_alert(self, alert: Alert) -> Alert:
+    def create_alert(self, alert: Alert) -> AlertRecord:
         """Create a new alert (for in-memory alerts)"""
-        self.alerts[alert.id] = alert
+        alert = AlertRecord.from_model(alert, self.get_trading_pair(alert.symbol))
+        self._snapshot.store(alert)
+        self._note_local_change(alert.id)
         logger.info(f"✅ Alert created: {alert.symbol} {alert.alert_type.value} {alert.direction.value} {alert.target_value}")
         return alert
 
-    def get_alert(self, alert_id: str) -> Optional[Alert]:
+    def get_alert(self, alert_id: str) -> Optional[AlertRecord]:
         """Get a specific alert by ID"""
         return self.alerts.get(alert_id)
     
-    async def get_database_alert(self, alert_id: str) -> Optional[Alert]:
-        """Get a specific alert from database and convert to model."""
-        db_alert = await supabase_client.get_alert_by_id(alert_id)
+    async def get_database_alert(self, alert_id: str) -> Optional[AlertRecord]:
+        """Get a specific alert from database and convert it to a runtime record."""
+        db_alert = await self.db.get_alert_by_id(alert_id)
         if db_alert:
-            return self._convert_db_alert_to_model(db_alert)
+            alert = self._convert_db_alert(db_alert)
+            if alert and not db_alert.get('is_active', True):
+                alert.status = AlertStatus.TRIGGERED if db_alert.get('triggered_at') else AlertStatus.PAUSED
+            return alert
         return None
+    
+    async def lookup_alert(self, alert_id: str) -> Optional[AlertRecord]:
+        """Find one alert without a resync: memory, then the lookup cache, then one row fetch.
+
+        An active row found in the database is merged into the monitored set;
+        inactive and missing ids are cached for a short TTL. Concurrent
+        lookups of the same id share a single ``get_alert_by_id`` call.
+        """
+        alert = self.alerts.get(alert_id)
+        if alert is not None:
+            return alert
+        hit, alert = self._lookup_cache.get(alert_id)
+        if hit:
+            return alert
+        
+        pending = self._lookups.get(alert_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_alert(alert_id))
+            self._lookups[alert_id] = pending
+            pending.add_done_callback(lambda _: self._lookups.pop(alert_id, None))
+        # Shielded so one caller going away does not cancel the fetch for the others
+        return await asyncio.shield(pending)
+    
+    async def _fetch_alert(self, alert_id: str) -> Optional[AlertRecord]:
+        alert = await self.get_database_alert(alert_id)
+        current = self.alerts.get(alert_id)
+        if current is not None:
+            # A sync or the change feed loaded it while we were fetching
+            return current
+        if alert is not None and alert.status == AlertStatus.ACTIVE:
+            self._snapshot.store(alert)
+            self._note_local_change(alert_id)
+            self._alerts_changed()
+            logger.info(f"✅ Armed alert {alert_id} from a single-alert lookup")
+        else:
+            self._lookup_cache.set(alert_id, alert)
+        return alert
 
-    def get_all_alerts(self, user_id: str = "default_user", status: Optional[AlertStatus] = None) -> List[Alert]:
-        """Get all alerts for a user, optionally filtered by status"""
-        alerts = [alert for alert in self.alerts.values() if alert.user_id == user_id]
+    def get_all_alerts(self, user_id: str = "default_user", status: Optional[AlertStatus] = None,
+                       symbol: Optional[str] = None) -> List[AlertRecord]:
+        """Get all alerts for a user, optionally filtered by status and symbol"""
+        snapshot = self._snapshot
+        pair = self.get_trading_pair(symbol) if symbol else None
+        # Walk the smallest applicable index and filter on the rest
+        candidates = [snapshot.by_user.get(user_id, {})]
         if status:
-            alerts = [alert for alert in alerts if alert.status == status]
-        return alerts
+            candidates.append(snapshot.by_status[status])
+        if pair:
+            candidates.append(snapshot.by_pair.get(pair, {}))
+        smallest = min(candidates, key=len)
+        return [
+            alert for alert in smallest.values()
+            if alert.user_id == user_id
+            and (not status or alert.status == status)
+            and (not pair or alert.pair == pair)
+        ]
 
-    def get_active_alerts(self) -> List[Alert]:
+    def get_active_alerts(self) -> List[AlertRecord]:
         """Get all active alerts"""
-        return [alert for alert in self.alerts.values() if alert.status == AlertStatus.ACTIVE]
+        return list(self._snapshot.by_status[AlertStatus.ACTIVE].values())
 
-    def update_alert_status(self, alert_id: str, status: AlertStatus) -> Optional[Alert]:
+    def update_alert_status(self, alert_id: str, status: AlertStatus) -> Optional[AlertRecord]:
         """Update alert status"""
-        if alert_id in self.alerts:
-            self.alerts[alert_id].status = status
-            return self.alerts[alert_id]
+        alert = self.alerts.get(alert_id)
+        if alert is not None:
+            self._snapshot.set_status(alert, status)
+            self._note_local_change(alert_id)
+            return alert
         return None
 
     def delete_alert(self, alert_id: str) -> bool:
         """Delete an alert"""
-        if alert_id in self.alerts:
-            self.alerts[alert_id].status = AlertStatus.DELETED
+        alert = self.alerts.get(alert_id)
+        if alert is not None:
+            self._snapshot.set_status(alert, AlertStatus.DELETED)
+            self._note_local_change(alert_id)
             return True
         return False
 
+    async def evict_alerts(self, alerts: Iterable[AlertRecord], shrink: bool = False) -> List[AlertRecord]:
+        """Drop finished alerts (deleted, or one-time and fired) from memory.
+
+        Used by the compactor (see app/compaction.py). Runs under the sync lock
+        so it never races a snapshot rebuild, and skips any alert that was
+        replaced or re-armed since it was picked. ``shrink`` also re-copies
+        the id and status maps to release their tables.
+        """
+        async with self._sync_lock:
+            snapshot = self._snapshot
+            evicted = []
+            for alert in alerts:
+                if snapshot.alerts.get(alert.id) is alert and alert.is_finished:
+                    snapshot.discard(alert.id)
+                    self._lookup_cache.invalidate(alert.id)
+                    evicted.append(alert)
+            if shrink and evicted:
+                snapshot.shrink()
+            return evicted
+
     async def check_alert_conditions(self, symbol: str, current_price: float) -> List[AlertTriggerEvent]:
-        """Enhanced alert checking with database sync and notification support."""
-        # Sync database alerts periodically
-        if (not self.last_sync or 
-            (datetime.now() - self.last_sync).seconds > self.sync_interval):
-            await self.sync_database_alerts()
+        """Enhanced alert checking with notification support.
+
+        Database sync happens in the background (``periodic_database_sync``);
+        evaluation only reads the currently published snapshot.
+        """
+        if self.use_vector_engine:
+            return await self.check_alert_batch([(symbol, current_price)])
+        if self._rearm_heap:
+            self._rearm_expired()
         
         triggered_events = []
         
-        # Convert trading pair to crypto symbol for comparison
-        # WebSocket gives us "SOLUSDT", alerts are stored as "SOL"
-        crypto_symbol = self.get_crypto_symbol(symbol)
+        # Alerts are indexed by trading pair ("SOL" and "SOLUSDT" both live under "SOLUSDT"),
+        # so only thresholds the price has reached and per-tick alerts for this pair are touched
+        pair = self.get_trading_pair(symbol)
+        candidates = self._snapshot.candidates(pair, current_price)
         
-        for alert in self.alerts.values():
-            # Check if alert symbol matches (either direct or after conversion)
-            alert_matches = (
-                alert.symbol.upper() == symbol.upper() or  # Direct match (SOLUSDT == SOLUSDT)
-                alert.symbol.upper() == crypto_symbol.upper()  # Crypto symbol match (SOL == SOL)
-            )
-            
-            if (alert_matches and 
-                alert.status == AlertStatus.ACTIVE and 
+        for alert in candidates:
+            # Skip alerts replaced by a snapshot swap while an earlier trigger was awaiting
+            if (alert.status == AlertStatus.ACTIVE and 
+                self.alerts.get(alert.id) is alert and
                 self._should_trigger_alert(alert, current_price)):
                 
-                # Handle alert trigger in database
-                await self._handle_alert_trigger(alert, current_price)
-                
-                # Create trigger event
-                message = self._generate_alert_message(alert, current_price)
-                trigger_event = AlertTriggerEvent(
-                    alert_id=alert.id,
-                    symbol=alert.symbol,
-                    trigger_price=current_price,
-                    target_value=alert.target_value,
-                    alert_type=alert.alert_type,
-                    direction=alert.direction,
-                    message=message,
-                    triggered_at=datetime.now(),
-                    notification_data=getattr(alert, 'notification_data', [])
-                )
-                
-                triggered_events.append(trigger_event)
-                logger.info(f"🚨 Alert triggered: {message}")
+                triggered_events.append(await self._fire_alert(alert, current_price))
+        
+        return triggered_events
+    
+    async def check_alert_batch(self, ticks: Iterable[Tuple[str, float]]) -> List[AlertTriggerEvent]:
+        """Evaluate a batch of (symbol, price) ticks, one per symbol.
+
+        With the vector engine every armed alert on the batch's pairs is checked
+        in one set of array comparisons; otherwise this is a loop over
+        ``check_alert_conditions``.
+        """
+        if not self.use_vector_engine:
+            triggered_events = []
+            for symbol, price in ticks:
+                triggered_events.extend(await self.check_alert_conditions(symbol, price))
+            return triggered_events
+        
+        if self._rearm_heap:
+            self._rearm_expired()
+        snapshot = self._snapshot
+        prices = {self.get_trading_pair(symbol): price for symbol, price in ticks}
+        fired, baselines = snapshot.vector.evaluate(prices.items())
+        
+        # Mirror captured baselines onto the models so messages and later syncs see them
+        for alert_id, baseline in baselines:
+            snapshot.alerts[alert_id].baseline_price = baseline
+        
+        triggered_events = []
+        for alert_id in fired:
+            alert = snapshot.alerts.get(alert_id)
+            if alert is None or alert.status != AlertStatus.ACTIVE or self.alerts.get(alert_id) is not alert:
+                continue
+            triggered_events.append(await self._fire_alert(alert, prices[self.get_trading_pair(alert.symbol)]))
+        return triggered_events
+    
+    async def _fire_alert(self, alert: AlertRecord, current_price: float) -> AlertTriggerEvent:
+        """Record a trigger and build its event."""
+        # Handle alert trigger in database
+        await self._handle_alert_trigger(alert, current_price)
+        
+        # Create trigger event
+        message = self._generate_alert_message(alert, current_price)
+        trigger_event = AlertTriggerEvent(
+            alert_id=alert.id,
+            symbol=alert.symbol,
+            trigger_price=current_price,
+            target_value=alert.target_value,
+            alert_type=alert.alert_type,
+            direction=alert.direction,
+            message=message,
+            triggered_at=datetime.now(),
+            notification_data=getattr(alert, 'notification_data', []),
+            custom_message=bool(alert.message),
+            trigger_count=alert.trigger_count
+        )
         
+        logger.info(f"🚨 Alert triggered: {message}")
+        return trigger_event
+    
+    def _range_fires(self, alert: AlertRecord, price: float) -> bool:
+        """Whether a price from a gap's range fires an armed price target.
+
+        Percentage alerts are left out: the range's high and low come in no
+        known order and may predate the alert's baseline (or become it), so
+        measuring one against the other could fire on moves that never happened.
+        """
+        return (alert.status == AlertStatus.ACTIVE and alert.alert_type == AlertType.PRICE_TARGET and
+                self.alerts.get(alert.id) is alert and self._check_price_target(alert, price))
+    
+    def range_fires_alert(self, symbol: str, low: float, high: float) -> bool:
+        """Whether a price range would fire any armed price target on the symbol's pair."""
+        alerts = list(self._snapshot.by_pair.get(self.get_trading_pair(symbol), {}).values())
+        return any(self._range_fires(alert, price) for price in (high, low) for alert in alerts)
+    
+    async def check_price_range(self, symbol: str, low: float, high: float, last: float) -> List[AlertTriggerEvent]:
+        """Evaluate a price range the feed did not see tick by tick (e.g. during a disconnect).
+
+        The high is checked first so ABOVE targets fire at the peak, then the
+        low for BELOW targets; only price targets are checked against the
+        range. The last price then goes through the normal tick path, which
+        evaluates percentage alerts (and captures a missing baseline).
+        """
+        if self._rearm_heap:
+            self._rearm_expired()
+        triggered_events = []
+        pair = self.get_trading_pair(symbol)
+        for price in (high, low):
+            for alert in list(self._snapshot.by_pair.get(pair, {}).values()):
+                if self._range_fires(alert, price):
+                    triggered_events.append(await self._fire_alert(alert, price))
+        triggered_events.extend(await self.check_alert_conditions(symbol, last))
         return triggered_events
     
-    async def _handle_alert_trigger(self, alert: Alert, current_price: float) -> None:
+    async def _handle_alert_trigger(self, alert: AlertRecord, current_price: float) -> None:
         """Handle alert trigger in database and update status."""
         try:
             # Update alert status in memory
-            alert.status = AlertStatus.TRIGGERED
+            self._snapshot.set_status(alert, AlertStatus.TRIGGERED)
             alert.triggered_at = datetime.now()
             alert.current_price = current_price
             alert.trigger_count += 1
+            self._note_local_change(alert.id)
+            if not alert.is_one_time:
+                self._schedule_rearm(alert)
             
-            # Update alert status in database
-            status_data = {
-                'triggered_at': datetime.now().isoformat(),
-                'trigger_count': alert.trigger_count,
-                'last_trigger_price': current_price,
-                'is_active': not alert.is_one_time  # Deactivate if one-time alert
-            }
-            
-            await supabase_client.update_alert_status(alert.id, status_data)
+            # Count, timestamp, last price and one-time deactivation are applied atomically server-side;
+            # the count is sent as this trigger's sequence, so a batch applied twice counts once
+            await self.writes.record_trigger(alert.id, alert.trigger_count, current_price,
+                                             alert.triggered_at.isoformat())
             
             # Create detailed trigger log
             trigger_data = {
@@ -296,12 +736,12 @@ class AlertManager:
                 }
             }
             
-            await supabase_client.create_alert_log_entry(alert.id, trigger_data)
+            await self.writes.log(SupabaseClient.alert_log_entry(alert.id, trigger_data))
             
         except Exception as e:
             logger.error(f"❌ Failed to handle alert trigger for {alert.id}: {e}")
 
-    def _should_trigger_alert(self, alert: Alert, current_price: float) -> bool:
+    def _should_trigger_alert(self, alert: AlertRecord, current_price: float) -> bool:
         """Determine if an alert should be triggered based on current price"""
         if alert.alert_type == AlertType.PRICE_TARGET:
             return self._check_price_target(alert, current_price)
@@ -309,7 +749,7 @@ class AlertManager:
             return self._check_percentage_change(alert, current_price)
         return False
 
-    def _check_price_target(self, alert: Alert, current_price: float) -> bool:
+    def _check_price_target(self, alert: AlertRecord, current_price: float) -> bool:
         """Check if price target condition is met"""
         if alert.direction == AlertDirection.ABOVE:
             return current_price >= alert.target_value
@@ -317,7 +757,7 @@ class AlertManager:
             return current_price <= alert.target_value
         return False
 
-    def _check_percentage_change(self, alert: Alert, current_price: float) -> bool:
+    def _check_percentage_change(self, alert: AlertRecord, current_price: float) -> bool:
         """Check if percentage change condition is met"""
         if not alert.baseline_price:
             # Set baseline price if not set (first time checking)
@@ -336,7 +776,7 @@ class AlertManager:
         
         return False
 
-    def _generate_alert_message(self, alert: Alert, current_price: float) -> str:
+    def _generate_alert_message(self, alert: AlertRecord, current_price: float) -> str:
         """Generate a custom voice message for the alert"""
         if alert.message:
             return alert.message
@@ -358,7 +798,7 @@ class AlertManager:
     async def send_notifications_for_trigger(self, trigger_event: AlertTriggerEvent) -> List[Dict]:
         """Send notifications for a triggered alert."""
         try:
-            results = await notification_service.send_notifications(trigger_event)
+            results = await self.notifier.send_notifications(trigger_event)
             logger.info(f"� Sent {len(results)} notifications for alert {trigger_event.alert_id}")
             return results
         except Exception as e:
@@ -367,22 +807,25 @@ class AlertManager:
 
     def get_alert_stats(self) -> Dict:
         """Get statistics about alerts"""
-        total_alerts = len(self.alerts)
-        active_alerts = len([a for a in self.alerts.values() if a.status == AlertStatus.ACTIVE])
-        triggered_alerts = len([a for a in self.alerts.values() if a.status == AlertStatus.TRIGGERED])
+        snapshot = self._snapshot
+        total_alerts = len(snapshot.alerts)
+        active_alerts = snapshot.count(AlertStatus.ACTIVE)
+        triggered_alerts = snapshot.count(AlertStatus.TRIGGERED)
         
         return {
             "total_alerts": total_alerts,
             "active_alerts": active_alerts,
             "triggered_alerts": triggered_alerts,
             "paused_alerts": total_alerts - active_alerts - triggered_alerts,
+            "alert_pairs": len(snapshot.by_pair),
             "last_sync": self.last_sync.isoformat() if self.last_sync else None,
-            "database_connected": supabase_client.is_connected()
+            "database_connected": self.db.is_connected(),
+            "lookup_cache": self._lookup_cache.get_stats()
         }
     
     async def get_monitoring_status(self, alert_id: str) -> Dict:
         """Get monitoring status for a specific alert."""
-        alert = self.get_alert(alert_id)
+        alert = await self.lookup_alert(alert_id)
         return {
             "alert_id": alert_id,
             "is_active": alert.status == AlertStatus.ACTIVE if alert else False,
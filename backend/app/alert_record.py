@@ -0,0 +1,173 @@
+"""
+Compact runtime records for monitored alerts.
+The evaluation path reads only slot attributes on AlertRecord; fields used for
+messages, notifications and API responses sit in a separate ColdAlertFields
+record and are turned into datetimes and dicts only when something asks.
+Pydantic models stay at the API boundary (see AlertRecord.from_model).
+"""
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .models import Alert, AlertDirection, AlertStatus, AlertType
+
+# (notification_type, destination, is_enabled)
+NotificationEntry = Tuple[str, Optional[str], bool]
+
+
+def compact_notifications(notifications: Optional[List[Dict[str, Any]]]) -> Tuple[NotificationEntry, ...]:
+    """Keep just the fields NotificationService reads from each alert_notifications row."""
+    return tuple(
+        (sys.intern(n.get('notification_type') or ''), n.get('destination'), bool(n.get('is_enabled', True)))
+        for n in notifications or ()
+    )
+
+
+class ColdAlertFields:
+    """Fields an alert only needs once it fires or is shown."""
+
+    __slots__ = ("user_id", "message", "_created_at", "_notifications", "cooldown")
+
+    def __init__(self, user_id: str, message: Optional[str], created_at: Union[str, datetime],
+                 notifications: Tuple[NotificationEntry, ...] = (), cooldown: Optional[float] = None):
+        self.user_id = sys.intern(user_id)
+        self.message = message or None
+        # ISO string from the database until first read
+        self._created_at = created_at
+        self._notifications = notifications
+        # Seconds a recurring alert waits before re-arming; None uses the manager's default
+        self.cooldown = cooldown
+
+    @property
+    def created_at(self) -> datetime:
+        if isinstance(self._created_at, str):
+            self._created_at = datetime.fromisoformat(self._created_at.replace('Z', '+00:00'))
+        return self._created_at
+
+    @property
+    def notification_data(self) -> List[Dict[str, Any]]:
+        return [
+            {'notification_type': kind, 'destination': destination, 'is_enabled': enabled}
+            for kind, destination, enabled in self._notifications
+        ]
+
+
+class AlertRecord:
+    """One monitored alert: what evaluation and trigger handling read, nothing more.
+
+    Attribute names match the ``Alert`` model, so indexes, the evaluator and
+    response builders accept either. Symbol and pair strings are interned and
+    shared by every alert on the same pair.
+    """
+
+    __slots__ = (
+        "id", "symbol", "pair", "alert_type", "direction", "target_value", "baseline_price",
+        "status", "trigger_count", "is_one_time", "current_price", "triggered_at", "last_checked", "cold",
+    )
+
+    def __init__(self, id: str, symbol: str, pair: str, alert_type: AlertType, direction: AlertDirection,
+                 target_value: float, cold: ColdAlertFields, baseline_price: Optional[float] = None,
+                 status: AlertStatus = AlertStatus.ACTIVE, trigger_count: int = 0, is_one_time: bool = True):
+        self.id = id
+        self.symbol = sys.intern(symbol)
+        self.pair = sys.intern(pair)
+        self.alert_type = alert_type
+        self.direction = direction
+        self.target_value = target_value
+        self.baseline_price = baseline_price
+        self.status = status
+        self.trigger_count = trigger_count
+        self.is_one_time = is_one_time
+        self.current_price: Optional[float] = None
+        self.triggered_at: Optional[datetime] = None
+        self.last_checked: Optional[datetime] = None
+        self.cold = cold
+
+    @property
+    def user_id(self) -> str:
+        return self.cold.user_id
+
+    @property
+    def message(self) -> Optional[str]:
+        return self.cold.message
+
+    @property
+    def created_at(self) -> datetime:
+        return self.cold.created_at
+
+    @property
+    def notification_data(self) -> List[Dict[str, Any]]:
+        return self.cold.notification_data
+
+    @property
+    def is_finished(self) -> bool:
+        """Deleted, or a one-time alert that has already fired."""
+        return self.status == AlertStatus.DELETED or (self.status == AlertStatus.TRIGGERED and self.is_one_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready form of the record, cold fields included."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "symbol": self.symbol,
+            "alert_type": self.alert_type.value,
+            "direction": self.direction.value,
+            "target_value": self.target_value,
+            "baseline_price": self.baseline_price,
+            "status": self.status.value,
+            "trigger_count": self.trigger_count,
+            "is_one_time": self.is_one_time,
+            "current_price": self.current_price,
+            "message": self.message,
+            "created_at": self.created_at.isoformat(),
+            "triggered_at": self.triggered_at.isoformat() if self.triggered_at else None,
+            "notification_data": self.notification_data,
+        }
+
+    @classmethod
+    def from_model(cls, alert: Alert, pair: str) -> "AlertRecord":
+        """Runtime record for an alert created through the API."""
+        record = cls(
+            id=alert.id,
+            symbol=alert.symbol,
+            pair=pair,
+            alert_type=alert.alert_type,
+            direction=alert.direction,
+            target_value=alert.target_value,
+            cold=ColdAlertFields(alert.user_id, alert.message, alert.created_at,
+                                 compact_notifications(alert.notification_data)),
+            baseline_price=alert.baseline_price,
+            status=alert.status,
+            trigger_count=alert.trigger_count,
+            is_one_time=alert.is_one_time,
+        )
+        record.current_price = alert.current_price
+        record.triggered_at = alert.triggered_at
+        record.last_checked = alert.last_checked
+        return record
+
+    @classmethod
+    def restore(cls, id: str, symbol: str, pair: str, alert_type: AlertType, direction: AlertDirection,
+                target_value: float, baseline_price: Optional[float], status: AlertStatus, trigger_count: int,
+                is_one_time: bool, current_price: Optional[float], triggered_at: Optional[datetime],
+                last_checked: Optional[datetime], cold: ColdAlertFields) -> "AlertRecord":
+        """Record with every slot given as stored, for warm-start loads.
+
+        Skips ``__init__``: the strings come out of marshal already interned.
+        """
+        record = cls.__new__(cls)
+        record.id = id
+        record.symbol = symbol
+        record.pair = pair
+        record.alert_type = alert_type
+        record.direction = direction
+        record.target_value = target_value
+        record.baseline_price = baseline_price
+        record.status = status
+        record.trigger_count = trigger_count
+        record.is_one_time = is_one_time
+        record.current_price = current_price
+        record.triggered_at = triggered_at
+        record.last_checked = last_checked
+        record.cold = cold
+        return record
@@ -5,29 +5,41 @@ Supports multiple notification types including SMS, Email, and Voice calls.
 import os
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from twilio.rest import Client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+import httpx
 from dotenv import load_dotenv
 from .models import AlertTriggerEvent, NotificationType, NotificationRequest
-from .database import supabase_client
+from .providers import close_twilio_clients, twilio_client, webhook_http_client
+from .write_behind import trigger_writes
+from .metrics import NOTIFICATION_LATENCY
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Channels NotificationService can deliver on
+NOTIFICATION_CHANNELS = ("voice", "sms", "email", "push", "webhook")
+# Threads for blocking provider SDK calls (Twilio's client is synchronous)
+NOTIFY_BLOCKING_WORKERS = int(os.getenv("NOTIFY_BLOCKING_WORKERS", "8"))
+
 class NotificationService:
     """Enhanced notification service with multiple delivery methods."""
     
-    def __init__(self):
+    def __init__(self, blocking_workers: int = NOTIFY_BLOCKING_WORKERS):
+        # Blocking SDK calls run here so a slow provider never stalls the event loop
+        self._executor = ThreadPoolExecutor(max_workers=blocking_workers, thread_name_prefix="notify")
+        self._http: Optional[httpx.AsyncClient] = None
         # Twilio configuration
         self.twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.twilio_phone = os.getenv("TWILIO_PHONE_NUMBER")
         
-        # Initialize Twilio client if credentials are available
+        # Shared pooled client for the account (see app/providers.py)
         if self.twilio_account_sid and self.twilio_auth_token:
             try:
-                self.twilio_client = Client(self.twilio_account_sid, self.twilio_auth_token)
+                self.twilio_client = twilio_client(self.twilio_account_sid, self.twilio_auth_token)
                 logger.info("✅ Twilio client initialized successfully")
             except Exception as e:
                 logger.error(f"❌ Failed to initialize Twilio client: {e}")
@@ -40,16 +52,10 @@ class NotificationService:
         """Check if Twilio is properly configured."""
         return self.twilio_client is not None
     
-    async def send_notifications(self, trigger_event: AlertTriggerEvent) -> List[Dict[str, Any]]:
-        """Send notifications based on alert configuration."""
-        notifications = getattr(trigger_event, 'notification_data', [])
-        results = []
-        
-        if not notifications:
-            logger.warning(f"No notification configuration found for alert {trigger_event.alert_id}")
-            return results
-        
-        for notification in notifications:
+    def targets(self, trigger_event: AlertTriggerEvent) -> List[Tuple[str, str]]:
+        """Enabled (notification_type, destination) pairs configured for a triggered alert."""
+        targets = []
+        for notification in getattr(trigger_event, 'notification_data', None) or []:
             if not notification.get('is_enabled', True):
                 logger.info(f"Notification disabled, skipping: {notification}")
                 continue
@@ -60,42 +66,72 @@ class NotificationService:
             if not destination:
                 logger.warning(f"No destination provided for {notification_type} notification")
                 continue
-            
-            try:
-                result = None
-                if notification_type == 'sms' or notification_type == 'voice':
-                    result = await self._send_voice_call(destination, trigger_event.message)
-                elif notification_type == 'email':
-                    result = await self._send_email(destination, trigger_event)
-                elif notification_type == 'push':
-                    result = await self._send_push_notification(destination, trigger_event)
-                else:
-                    logger.warning(f"Unknown notification type: {notification_type}")
-                    continue
-                
-                results.append({
-                    'type': notification_type,
-                    'destination': destination,
-                    'success': result is not None,
-                    'result': result,
-                    'timestamp': trigger_event.triggered_at.isoformat()
-                })
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to send {notification_type} notification: {e}")
-                results.append({
-                    'type': notification_type,
-                    'destination': destination,
-                    'success': False,
-                    'error': str(e),
-                    'timestamp': trigger_event.triggered_at.isoformat()
-                })
+            if notification_type not in NOTIFICATION_CHANNELS:
+                logger.warning(f"Unknown notification type: {notification_type}")
+                continue
+            targets.append((notification_type, destination))
+        return targets
+    
+    async def send_notifications(self, trigger_event: AlertTriggerEvent) -> List[Dict[str, Any]]:
+        """Send notifications based on alert configuration, one destination after another.
+
+        The live trigger path goes through NotificationDispatcher instead (see app/dispatch.py).
+        """
+        if not getattr(trigger_event, 'notification_data', None):
+            logger.warning(f"No notification configuration found for alert {trigger_event.alert_id}")
+            return []
+        
+        results = [
+            await self.send_notification(notification_type, destination, trigger_event)
+            for notification_type, destination in self.targets(trigger_event)
+        ]
         
         # Log notification results to database
-        await self._log_notification_results(trigger_event.alert_id, results)
+        await self.log_notification_results(trigger_event.alert_id, results)
         
         return results
     
+    async def send_notification(self, notification_type: str, destination: str, trigger_event: AlertTriggerEvent,
+                                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Deliver one notification and return its result entry; failures are reported, not raised.
+
+        ``idempotency_key`` is passed on to receivers that can deduplicate retries (webhooks).
+        """
+        try:
+            if notification_type == 'sms' or notification_type == 'voice':
+                result = await self._send_voice_call(destination, trigger_event.message)
+            elif notification_type == 'email':
+                result = await self._send_email(destination, trigger_event)
+            elif notification_type == 'push':
+                result = await self._send_push_notification(destination, trigger_event)
+            elif notification_type == 'webhook':
+                result = await self._send_webhook(destination, trigger_event, idempotency_key)
+            else:
+                raise ValueError(f"Unknown notification type: {notification_type}")
+            
+            if result is not None:
+                NOTIFICATION_LATENCY.labels(notification_type).observe(
+                    (datetime.now() - trigger_event.triggered_at).total_seconds()
+                )
+            
+            return {
+                'type': notification_type,
+                'destination': destination,
+                'success': result is not None,
+                'result': result,
+                'timestamp': trigger_event.triggered_at.isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to send {notification_type} notification: {e}")
+            return {
+                'type': notification_type,
+                'destination': destination,
+                'success': False,
+                'error': str(e),
+                'timestamp': trigger_event.triggered_at.isoformat()
+            }
+    
     async def _send_voice_call(self, phone_number: str, message: str) -> Optional[str]:
         """Send Twilio voice call with enhanced message."""
         if not self.is_twilio_configured():
@@ -103,35 +139,36 @@ class NotificationService:
             raise Exception("Twilio service not available")
         
         try:
-            # Clean phone number (ensure it has country code)
-            clean_number = self._clean_phone_number(phone_number)
-            
-            # Enhanced TwiML with better voice and pacing
-            twiml = f'''
-            <Response>
-                <Say voice="alice" language="en-US">
-                    <prosody rate="medium" volume="loud">
-                        Crypto Alarm Alert! {message}
-                        <break time="0.5s"/>
-                        I repeat: {message}
-                    </prosody>
-                </Say>
-            </Response>
-            '''
-            
-            call = self.twilio_client.calls.create(
-                to=clean_number,
-                from_=self.twilio_phone,
-                twiml=twiml
+            # The Twilio SDK does a synchronous HTTP request
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.place_voice_call, phone_number, message
             )
-            
-            logger.info(f"📞 Voice call sent to {clean_number}: {call.sid}")
-            return call.sid
-            
         except Exception as e:
             logger.error(f"❌ Voice call failed: {e}")
             raise
     
+    def place_voice_call(self, phone_number: str, message: str) -> str:
+        """Place a Twilio voice call on the calling thread and return its SID."""
+        # Clean phone number (ensure it has country code)
+        clean_number = self._clean_phone_number(phone_number)
+        
+        # Enhanced TwiML with better voice and pacing
+        twiml = f'''
+        <Response>
+            <Say voice="alice" language="en-US">
+                <prosody rate="medium" volume="loud">
+                    Crypto Alarm Alert! {message}
+                    <break time="0.5s"/>
+                    I repeat: {message}
+                </prosody>
+            </Say>
+        </Response>
+        '''
+        
+        call = self.twilio_client.calls.create(to=clean_number, from_=self.twilio_phone, twiml=twiml)
+        logger.info(f"📞 Voice call sent to {clean_number}: {call.sid}")
+        return call.sid
+    
     async def _send_email(self, email_address: str, trigger_event: AlertTriggerEvent) -> Optional[str]:
         """Send email notification (placeholder for future implementation)."""
         logger.info(f"📧 Email notification to {email_address}: {trigger_event.message}")
@@ -144,6 +181,28 @@ class NotificationService:
         # TODO: Implement push notification service (Firebase, etc.)
         return f"push_placeholder_{trigger_event.alert_id}"
     
+    async def _send_webhook(self, url: str, trigger_event: AlertTriggerEvent,
+                            idempotency_key: Optional[str] = None) -> Optional[str]:
+        """POST the trigger event as JSON to a webhook URL."""
+        if self._http is None:
+            self._http = webhook_http_client()
+        headers = {'Content-Type': 'application/json'}
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        response = await self._http.post(url, content=trigger_event.model_dump_json(exclude={'notification_data'}),
+                                         headers=headers)
+        response.raise_for_status()
+        logger.info(f"🔗 Webhook delivered to {url}: HTTP {response.status_code}")
+        return f"webhook_{response.status_code}"
+    
+    async def close(self) -> None:
+        """Release the webhook HTTP client, the pooled Twilio sessions and the blocking-call threads."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        close_twilio_clients()
+    
     def _clean_phone_number(self, phone_number: str) -> str:
         """Clean and format phone number for Twilio."""
         # Remove any non-digit characters
@@ -155,10 +214,9 @@ class NotificationService:
         
         return '+' + clean
     
-    async def _log_notification_results(self, alert_id: str, results: List[Dict[str, Any]]) -> None:
+    async def log_notification_results(self, alert_id: str, results: List[Dict[str, Any]]) -> None:
         """Log notification results to database."""
         try:
-            from datetime import datetime
             log_data = {
                 'alert_id': alert_id,
                 'notification_results': results,
@@ -167,7 +225,7 @@ class NotificationService:
                 'logged_at': datetime.now().isoformat()
             }
             
-            await supabase_client.log_alert_trigger(log_data)
+            await trigger_writes.log(log_data)
             
         except Exception as e:
             logger.error(f"❌ Failed to log notification results: {e}")
@@ -213,10 +271,12 @@ class NotificationService:
 
 # Legacy function for backward compatibility
 def send_voice_alert(message="CryptoAlarm alert! A price target has been reached.", phone_number=None):
-    """Legacy function for backward compatibility."""
-    service = NotificationService()
-    
-    if not service.is_twilio_configured():
+    """Legacy function for backward compatibility.
+
+    Places the call synchronously through the shared service and its pooled
+    Twilio client; call it from a worker thread, not the event loop.
+    """
+    if not notification_service.is_twilio_configured():
         logger.error("❌ Twilio not configured")
         return None
     
@@ -226,14 +286,7 @@ def send_voice_alert(message="CryptoAlarm alert! A price target has been reached
         return None
     
     try:
-        # Run async function in sync context
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # Create a new task if loop is already running
-            task = asyncio.create_task(service._send_voice_call(target_phone, message))
-            return task
-        else:
-            return loop.run_until_complete(service._send_voice_call(target_phone, message))
+        return notification_service.place_voice_call(target_phone, message)
     except Exception as e:
         logger.error(f"❌ Legacy voice alert failed: {e}")
         return None
@@ -1,5 +1,124 @@
-# Binance client placeholder
-# Will handle websocket connection to Binance in later steps
+"""
+Binance REST client.
+Used to take bulk price snapshots, e.g. to recover what the WebSocket feed missed during a disconnect.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
 
-def connect_to_binance():
-    return "Binance WebSocket client not implemented yet"
+import httpx
+
+logger = logging.getLogger(__name__)
+
+BINANCE_REST_URL = os.getenv("BINANCE_REST_URL", "https://api.binance.com")
+# /api/v3/ticker accepts at most 100 symbols per request
+MAX_SYMBOLS_PER_REQUEST = 100
+# /api/v3/klines returns at most this many candles per request
+MAX_KLINES_PER_REQUEST = 1000
+# Per-pair kline requests in flight at once
+BINANCE_KLINE_CONCURRENCY = int(os.getenv("BINANCE_KLINE_CONCURRENCY", "8"))
+# Kline intervals from finest to coarsest, in seconds
+KLINE_INTERVALS = (("1s", 1), ("1m", 60), ("1h", 3600), ("1d", 86400))
+
+# pair -> (low, high, last) over a window
+PriceRange = Tuple[float, float, float]
+
+
+def window_size_for(seconds: float) -> str:
+    """Smallest rolling-window size Binance accepts that covers ``seconds`` (1m..59m, 1h..23h, 1d..7d)."""
+    minutes = max(1, math.ceil(seconds / 60) + 1)
+    if minutes <= 59:
+        return f"{minutes}m"
+    hours = math.ceil(minutes / 60)
+    if hours <= 23:
+        return f"{hours}h"
+    return f"{min(7, math.ceil(hours / 24))}d"
+
+
+def kline_interval_for(seconds: float) -> Tuple[str, int]:
+    """Finest kline interval that covers ``seconds`` in one request."""
+    for name, length in KLINE_INTERVALS:
+        if seconds <= length * MAX_KLINES_PER_REQUEST:
+            return name, length
+    return KLINE_INTERVALS[-1]
+
+
+class BinanceRestClient:
+    """Async Binance REST client with one pooled HTTP session."""
+
+    def __init__(self, base_url: str = BINANCE_REST_URL, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    async def get_window_ranges(self, pairs: List[str], window_seconds: float) -> Dict[str, PriceRange]:
+        """Low/high/last price for each pair over a rolling window covering ``window_seconds``.
+
+        Rolling windows come in whole minutes and one is added for safety, so
+        the range also covers at least a minute before the window; see
+        ``get_gap_ranges`` for one bounded to the gap.
+        """
+        window = window_size_for(window_seconds)
+        ranges: Dict[str, PriceRange] = {}
+        for i in range(0, len(pairs), MAX_SYMBOLS_PER_REQUEST):
+            chunk = pairs[i:i + MAX_SYMBOLS_PER_REQUEST]
+            try:
+                response = await self._http().get(
+                    "/api/v3/ticker",
+                    params={"symbols": json.dumps(chunk, separators=(",", ":")), "windowSize": window},
+                )
+                response.raise_for_status()
+                for row in response.json():
+                    ranges[row["symbol"]] = (float(row["lowPrice"]), float(row["highPrice"]), float(row["lastPrice"]))
+            except Exception as e:
+                logger.error(f"❌ Binance window snapshot failed for {len(chunk)} pairs: {e}")
+        return ranges
+
+    async def get_gap_ranges(self, pairs: List[str], started_at: float,
+                             ended_at: Optional[float] = None) -> Dict[str, PriceRange]:
+        """Low/high/last price for each pair from ``started_at`` (epoch seconds) on, from klines.
+
+        The range starts at most one kline interval (1s for gaps under ~16
+        minutes) before ``started_at``. It takes one request per pair, so it
+        is meant for the few pairs a rolling window flagged, not a whole shard.
+        """
+        ended_at = ended_at or time.time()
+        interval, length = kline_interval_for(ended_at - started_at)
+        start_ms = int(started_at // length * length * 1000)
+        end_ms = int(ended_at * 1000)
+        limit = asyncio.Semaphore(BINANCE_KLINE_CONCURRENCY)
+        ranges: Dict[str, PriceRange] = {}
+
+        async def fetch(pair: str) -> None:
+            async with limit:
+                try:
+                    response = await self._http().get("/api/v3/klines", params={
+                        "symbol": pair, "interval": interval, "startTime": start_ms, "endTime": end_ms,
+                        "limit": MAX_KLINES_PER_REQUEST,
+                    })
+                    response.raise_for_status()
+                    # [open time, open, high, low, close, ...]
+                    candles = response.json()
+                except Exception as e:
+                    logger.error(f"❌ Binance kline snapshot failed for {pair}: {e}")
+                    return
+            if candles:
+                ranges[pair] = (min(float(c[3]) for c in candles), max(float(c[2]) for c in candles),
+                                float(candles[-1][4]))
+
+        await asyncio.gather(*(fetch(pair) for pair in pairs))
+        return ranges
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,228 @@
+"""
+Push-based alert change feed over Postgres LISTEN/NOTIFY.
+Triggers on alerts, alert_conditions and alert_notifications publish the
+changed alert id (see docs/alert-change-feed-migration.sql); the feed
+re-reads just those alerts and applies them to the AlertManager, so edits
+made in the frontend are armed without waiting for a poll.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from .metrics import ALERT_CHANGE_TO_APPLIED
+from .subscriptions import Backoff
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+except ImportError:  # psycopg2-binary is in requirements; the feed just stays off without it
+    psycopg2 = None
+
+logger = logging.getLogger(__name__)
+
+# Direct (session) Postgres connection string; LISTEN does not work through the transaction pooler
+ALERT_FEED_DSN = os.getenv("SUPABASE_DB_URL")
+ALERT_CHANGES_CHANNEL = "alert_changes"
+# Notifications arriving this close together are applied as one batch
+FEED_DEBOUNCE_SECONDS = float(os.getenv("ALERT_FEED_DEBOUNCE_SECONDS", "0.005"))
+
+
+class PostgresNotifyListener:
+    """One LISTEN connection whose notifications are read from the event loop.
+
+    The socket is watched with ``loop.add_reader`` rather than a polling
+    thread, so a payload is handed over as soon as Postgres delivers it.
+    TCP keepalives surface a silently dead connection as a read error.
+    """
+
+    def __init__(self, dsn: str, channel: str = ALERT_CHANGES_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self._conn = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    async def connect(self) -> None:
+        if psycopg2 is None:
+            raise RuntimeError("psycopg2 is not installed")
+        self._conn = await asyncio.to_thread(self._connect)
+        self._queue = asyncio.Queue()
+        asyncio.get_running_loop().add_reader(self._conn.fileno(), self._on_readable)
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _on_readable(self) -> None:
+        try:
+            self._conn.poll()
+        except psycopg2.Error as e:
+            asyncio.get_running_loop().remove_reader(self._conn.fileno())
+            self._queue.put_nowait(e)
+            return
+        while self._conn.notifies:
+            self._queue.put_nowait(self._conn.notifies.pop(0).payload)
+
+    async def next_payload(self) -> str:
+        """Wait for the next notification payload; raises ConnectionError once the connection is lost."""
+        item = await self._queue.get()
+        if isinstance(item, Exception):
+            raise ConnectionError(f"LISTEN connection lost: {item}") from item
+        return item
+
+    async def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+        except (ValueError, OSError):
+            pass  # Already closed by the server
+        conn.close()
+
+
+class AlertChangeFeed:
+    """Streams alert changes from the database into an AlertManager.
+
+    Every (re)connect starts LISTENing first and then runs one catch-up sync
+    (a delta from the high-water mark, or a full reload if there is none),
+    retried until it succeeds, so a change committed while the feed was down
+    is picked up by the sync and one committed after it arrives as a
+    notification. While ``live`` the
+    periodic poll is unnecessary.
+    """
+
+    def __init__(self, manager, listener, on_applied: Optional[Callable[[], None]] = None,
+                 debounce: float = FEED_DEBOUNCE_SECONDS):
+        self.manager = manager
+        self.listener = listener
+        self.on_applied = on_applied
+        self.debounce = debounce
+        self.backoff = Backoff()
+        self._live = False
+        self.connects = 0
+        self.disconnects = 0
+        self.catchup_failures = 0
+        self.notifications = 0
+        self.bad_payloads = 0
+        self.batches = 0
+        self.alerts_applied = 0
+        self.last_apply_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.listener is not None
+
+    @property
+    def live(self) -> bool:
+        """True while connected and caught up, i.e. the in-memory alerts track the database."""
+        return self._live
+
+    async def run(self) -> None:
+        """Listen for changes until cancelled, reconnecting with backoff."""
+        if self.listener is None:
+            logger.info("ℹ️ Alert change feed not configured (SUPABASE_DB_URL); relying on periodic sync")
+            return
+        try:
+            while True:
+                try:
+                    await self._session()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Alert change feed error: {e}")
+
+                self._live = False
+                self.disconnects += 1
+                await self.listener.close()
+                delay = self.backoff.next_delay()
+                logger.info(f"🔁 Alert change feed reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        finally:
+            self._live = False
+            await self.listener.close()
+
+    async def _session(self) -> None:
+        await self.listener.connect()
+        self.connects += 1
+        # Catch up on anything committed before LISTEN took effect; the feed is not live until that works.
+        # Notifications keep queueing on the open connection meanwhile. A delta from the high-water mark
+        # is enough (a warm start restores one); the manager falls back to a full reload without it
+        while await self.manager.sync_database_alerts() is None:
+            self.catchup_failures += 1
+            delay = self.backoff.next_delay()
+            logger.warning(f"⚠️ Alert change feed catch-up sync failed, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        self._notify_applied()
+        self._live = True
+        self.backoff.reset()
+        logger.info("✅ Alert change feed listening")
+
+        loop = asyncio.get_running_loop()
+        while True:
+            # alert_id -> commit time of its oldest pending change (epoch seconds, if sent)
+            pending: Dict[str, Optional[float]] = {}
+            self._take(await self.listener.next_payload(), pending)
+            deadline = loop.time() + self.debounce
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    payload = await asyncio.wait_for(self.listener.next_payload(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._take(payload, pending)
+            if pending:
+                await self._apply(pending)
+
+    def _take(self, payload: str, pending: Dict[str, Optional[float]]) -> None:
+        """Parse one ``{"table", "op", "alert_id", "ts"}`` payload into the pending batch."""
+        self.notifications += 1
+        try:
+            change = json.loads(payload)
+            alert_id = str(change["alert_id"])
+        except (ValueError, KeyError, TypeError):
+            self.bad_payloads += 1
+            logger.warning(f"⚠️ Ignoring malformed alert change payload: {payload[:200]}")
+            return
+        committed_at = change.get("ts")
+        if alert_id not in pending or pending[alert_id] is None:
+            pending[alert_id] = committed_at
+
+    async def _apply(self, pending: Dict[str, Optional[float]]) -> None:
+        """Apply a batch; a failed fetch ends the session so the reconnect resyncs."""
+        started = time.monotonic()
+        applied = await self.manager.apply_alert_changes(pending)
+        now = time.time()
+        for committed_at in pending.values():
+            if committed_at is not None:
+                ALERT_CHANGE_TO_APPLIED.observe(max(0.0, now - float(committed_at)))
+        self.batches += 1
+        self.alerts_applied += applied
+        self.last_apply_ms = (time.monotonic() - started) * 1000
+        if applied:
+            self._notify_applied()
+
+    def _notify_applied(self) -> None:
+        if self.on_applied is not None:
+            self.on_applied()
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "live": self._live,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "catchup_failures": self.catchup_failures,
+            "notifications": self.notifications,
+            "bad_payloads": self.bad_payloads,
+            "batches": self.batches,
+            "alerts_applied": self.alerts_applied,
+            "last_apply_ms": round(self.last_apply_ms, 3),
+        }
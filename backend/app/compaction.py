@@ -0,0 +1,166 @@
+"""
+Compaction of finished alerts out of the in-memory snapshot.
+Deleted alerts and one-time alerts that have fired are evicted from the
+AlertManager once they have been finished for a TTL, after being appended to
+a cold JSON-lines archive, so the monitored set only grows with live alerts.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .alert_record import AlertRecord
+from .models import AlertStatus
+
+logger = logging.getLogger(__name__)
+
+# Seconds an alert stays queryable in memory after it is deleted or fires for the last time
+ALERT_COMPACTION_TTL = float(os.getenv("ALERT_COMPACTION_TTL_SECONDS", "600"))
+ALERT_COMPACTION_INTERVAL = float(os.getenv("ALERT_COMPACTION_INTERVAL_SECONDS", "60"))
+# Evicted alerts are appended here; unset keeps no local copy (database rows remain the record)
+ALERT_ARCHIVE_PATH = os.getenv("ALERT_ARCHIVE_PATH")
+ALERT_ARCHIVE_MAX_BYTES = int(os.getenv("ALERT_ARCHIVE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Alerts evicted per event-loop turn
+EVICT_CHUNK = 2000
+
+# Rough cost of one alert's entries in the id, user, status and pair maps
+INDEX_ENTRY_BYTES = 4 * 48
+
+
+def estimate_alert_bytes(alert: AlertRecord) -> int:
+    """Approximate heap held by one alert record and what only it references."""
+    cold = alert.cold
+    size = sys.getsizeof(alert) + sys.getsizeof(cold) + sys.getsizeof(alert.id) + INDEX_ENTRY_BYTES
+    # current_price is left out: every alert fired by one tick shares that float
+    for value in (alert.target_value, alert.baseline_price, alert.triggered_at,
+                  alert.last_checked, cold.message, cold._created_at):
+        if value is not None:
+            size += sys.getsizeof(value)
+    size += sys.getsizeof(cold._notifications)
+    for entry in cold._notifications:
+        size += sys.getsizeof(entry) + (sys.getsizeof(entry[1]) if entry[1] else 0)
+    return size
+
+
+class AlertArchive:
+    """Append-only JSON-lines file of evicted alerts, rotated to ``<path>.1`` when full.
+
+    ``append`` serializes and writes in the calling thread; the compactor
+    runs it in a worker thread so the event loop only pays for the eviction.
+    """
+
+    def __init__(self, path: str, max_bytes: int = ALERT_ARCHIVE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rows_written = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, alerts: List[AlertRecord]) -> None:
+        archived_at = datetime.now().isoformat()
+        rows = [json.dumps(dict(alert.to_dict(), archived_at=archived_at), default=str) + "\n" for alert in alerts]
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(rows)
+        self.rows_written += len(rows)
+
+
+class AlertCompactor:
+    """Periodically archives and evicts alerts that can no longer fire.
+
+    An alert becomes due ``ttl`` seconds after a pass first sees it finished
+    (so eviction lands between ``ttl`` and ``ttl + interval``). Only the
+    TRIGGERED and DELETED buckets are walked, so a pass costs O(finished
+    alerts), not O(all alerts). Recurring alerts that fired are left to the
+    database sync, which re-arms them.
+    """
+
+    def __init__(self, manager, archive: Optional[AlertArchive] = None,
+                 ttl: float = ALERT_COMPACTION_TTL, interval: float = ALERT_COMPACTION_INTERVAL):
+        self.manager = manager
+        self.archive = archive
+        self.ttl = ttl
+        self.interval = interval
+        # alert_id -> monotonic time a pass first saw it finished
+        self._finished_since: Dict[str, float] = {}
+        self.passes = 0
+        self.alerts_evicted = 0
+        self.bytes_reclaimed = 0
+        self.archive_failures = 0
+        self.last_pass_ms: Optional[float] = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"❌ Alert compaction failed: {e}")
+
+    async def compact(self, now: Optional[float] = None) -> int:
+        """Archive and evict every alert whose TTL has run out; returns how many were evicted."""
+        started = time.perf_counter()
+        now = time.monotonic() if now is None else now
+        snapshot = self.manager.snapshot
+        finished = {
+            alert.id: alert
+            for status in (AlertStatus.TRIGGERED, AlertStatus.DELETED)
+            for alert in snapshot.by_status[status].values()
+            if alert.is_finished
+        }
+        # Ids that were evicted, re-armed or reloaded drop out here
+        self._finished_since = {alert_id: self._finished_since.get(alert_id, now) for alert_id in finished}
+        due = [finished[alert_id] for alert_id, since in self._finished_since.items() if now - since >= self.ttl]
+        self.passes += 1
+        if not due:
+            self.last_pass_ms = (time.perf_counter() - started) * 1000
+            return 0
+
+        if self.archive is not None:
+            try:
+                await asyncio.to_thread(self.archive.append, due)
+            except OSError as e:
+                # Keep them in memory rather than lose the only copy of API-created alerts
+                self.archive_failures += 1
+                logger.error(f"❌ Failed to archive {len(due)} alerts to {self.archive.path}: {e}")
+                return 0
+
+        # Evicted in chunks so a large backlog does not stall tick evaluation; the last
+        # chunk re-copies the maps once the pass has freed a quarter of them
+        shrink = len(due) * 4 >= len(snapshot.alerts)
+        evicted: List[AlertRecord] = []
+        for start in range(0, len(due), EVICT_CHUNK):
+            evicted.extend(await self.manager.evict_alerts(
+                due[start:start + EVICT_CHUNK], shrink=shrink and start + EVICT_CHUNK >= len(due)))
+        for alert in evicted:
+            self._finished_since.pop(alert.id, None)
+        reclaimed = sum(estimate_alert_bytes(alert) for alert in evicted)
+        self.alerts_evicted += len(evicted)
+        self.bytes_reclaimed += reclaimed
+        self.last_pass_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"🧹 Compacted {len(evicted)} finished alerts (~{reclaimed / 1024:.0f} KiB), "
+                    f"{len(self.manager.alerts)} left in memory")
+        return len(evicted)
+
+    def get_stats(self) -> Dict:
+        snapshot = self.manager.snapshot
+        return {
+            "hot_alerts": len(snapshot.alerts),
+            "armed_alerts": snapshot.count(AlertStatus.ACTIVE),
+            "finished_pending": len(self._finished_since),
+            "ttl_seconds": self.ttl,
+            "passes": self.passes,
+            "alerts_evicted": self.alerts_evicted,
+            "estimated_bytes_reclaimed": self.bytes_reclaimed,
+            "archive_path": self.archive.path if self.archive else None,
+            "archive_rows_written": self.archive.rows_written if self.archive else 0,
+            "archive_failures": self.archive_failures,
+            "last_pass_ms": round(self.last_pass_ms, 3) if self.last_pass_ms is not None else None,
+        }
@@ -4,19 +4,39 @@ Connects to Supabase database for alert management and synchronization.
 """
 from supabase import create_client, Client
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import asyncio
 import logging
+from .metrics import SUPABASE_CALL, SUPABASE_TIMEOUTS, timed
 
 logger = logging.getLogger(__name__)
 
+# The supabase client is synchronous, so queries run on a small worker pool that
+# reuses the client's keep-alive HTTP connections; this caps queries in flight
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8"))
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+# Per-operation overrides; full reloads move the whole alerts table
+OPERATION_TIMEOUTS = {
+    "fetch_active_alerts": 30.0,
+    "fetch_changed_alerts": 20.0,
+}
+
 class SupabaseClient:
-    """Supabase database client for alert operations."""
+    """Supabase database client for alert operations.
+
+    Every query is executed off the event loop with a per-operation timeout,
+    so a slow round trip never stalls the Binance reader or alert evaluation.
+    """
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = SUPABASE_MAX_CONCURRENCY, timeout: float = SUPABASE_TIMEOUT_SECONDS):
         self.url = os.getenv('SUPABASE_URL')
         self.key = os.getenv('SUPABASE_ANON_KEY')
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="supabase")
+        # Held until the worker finishes, not until the caller stops waiting
+        self._slots = asyncio.Semaphore(max_concurrency)
         
         if not self.url or not self.key:
             logger.warning("Supabase credentials not configured - using mock mode")
@@ -33,18 +53,48 @@ class SupabaseClient:
         """Check if Supabase client is properly connected."""
         return self.client is not None
     
-    async def fetch_active_alerts(self) -> List[Dict[str, Any]]:
-        """Fetch all active alerts from database with conditions and notifications."""
+    async def _execute(self, operation: str, query):
+        """Run a PostgREST query builder's blocking ``execute()`` on the worker pool.
+
+        Raises TimeoutError once the operation's timeout passes; the worker
+        keeps its slot until the abandoned request actually returns.
+        """
+        timeout = OPERATION_TIMEOUTS.get(operation, self.timeout)
+        await self._slots.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, query.execute)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            SUPABASE_TIMEOUTS.labels(operation).inc()
+            raise TimeoutError(f"{operation} timed out after {timeout:g}s") from None
+    
+    def close(self) -> None:
+        """Stop the worker pool without waiting for abandoned requests."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    @timed(SUPABASE_CALL, "fetch_active_alerts")
+    async def fetch_active_alerts(self) -> Optional[List[Dict[str, Any]]]:
+        """Fetch all active alerts from database with conditions and notifications.
+
+        Returns None if the fetch fails, so callers can tell an outage from an
+        empty table.
+        """
         if not self.client:
             logger.warning("Supabase not connected - returning empty alerts list")
             return []
         
         try:
-            response = self.client.table('alerts').select(
+            query = self.client.table('alerts').select(
                 '*', 
                 'alert_conditions(*)',
                 'alert_notifications(*)'
-            ).eq('is_active', True).execute()
+            ).eq('is_active', True)
+            response = await self._execute('fetch_active_alerts', query)
             
             alerts = response.data or []
             logger.info(f"📊 Fetched {len(alerts)} active alerts from database")
@@ -52,19 +102,83 @@ class SupabaseClient:
             
         except Exception as e:
             logger.error(f"❌ Failed to fetch alerts from database: {e}")
-            return []
+            return None
     
+    @timed(SUPABASE_CALL, "fetch_changed_alerts")
+    async def fetch_changed_alerts(self, since: str) -> Optional[List[Dict[str, Any]]]:
+        """Fetch alerts (active or not) whose updated_at is after ``since``.
+
+        Child-table edits bump the parent's updated_at (see docs/delta-sync-migration.sql).
+        Returns None on failure so callers can tell "no changes" from "unknown".
+        """
+        if not self.client:
+            return []
+
+        try:
+            query = self.client.table('alerts').select(
+                '*',
+                'alert_conditions(*)',
+                'alert_notifications(*)'
+            ).gt('updated_at', since)
+            response = await self._execute('fetch_changed_alerts', query)
+
+            return response.data or []
+
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch changed alerts since {since}: {e}")
+            return None
+
+    @timed(SUPABASE_CALL, "fetch_active_alert_ids")
+    async def fetch_active_alert_ids(self) -> Optional[List[str]]:
+        """Fetch only the ids of active alerts (tombstone check for deleted rows)."""
+        if not self.client:
+            return []
+
+        try:
+            query = self.client.table('alerts').select('id').eq('is_active', True)
+            response = await self._execute('fetch_active_alert_ids', query)
+            return [row['id'] for row in response.data or []]
+
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch active alert ids: {e}")
+            return None
+
+    @timed(SUPABASE_CALL, "fetch_alerts_by_ids")
+    async def fetch_alerts_by_ids(self, alert_ids: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Fetch specific alerts (active or not) with conditions and notifications.
+
+        Ids with no row in the result have been deleted. Returns None on failure.
+        """
+        if not self.client:
+            return []
+
+        try:
+            query = self.client.table('alerts').select(
+                '*',
+                'alert_conditions(*)',
+                'alert_notifications(*)'
+            ).in_('id', alert_ids)
+            response = await self._execute('fetch_alerts_by_ids', query)
+
+            return response.data or []
+
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch {len(alert_ids)} changed alerts: {e}")
+            return None
+
+    @timed(SUPABASE_CALL, "get_alert_by_id")
     async def get_alert_by_id(self, alert_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific alert by ID with all related data."""
         if not self.client:
             return None
         
         try:
-            response = self.client.table('alerts').select(
+            query = self.client.table('alerts').select(
                 '*', 
                 'alert_conditions(*)',
                 'alert_notifications(*)'
-            ).eq('id', alert_id).single().execute()
+            ).eq('id', alert_id).single()
+            response = await self._execute('get_alert_by_id', query)
             
             return response.data
             
@@ -72,6 +186,7 @@ class SupabaseClient:
             logger.error(f"❌ Failed to fetch alert {alert_id}: {e}")
             return None
     
+    @timed(SUPABASE_CALL, "update_alert_status")
     async def update_alert_status(self, alert_id: str, status_data: Dict[str, Any]) -> bool:
         """Update alert status and metadata in database."""
         if not self.client:
@@ -79,7 +194,8 @@ class SupabaseClient:
             return False
         
         try:
-            response = self.client.table('alerts').update(status_data).eq('id', alert_id).execute()
+            query = self.client.table('alerts').update(status_data).eq('id', alert_id)
+            response = await self._execute('update_alert_status', query)
             
             if response.data:
                 logger.info(f"✅ Updated alert {alert_id} status")
@@ -92,6 +208,7 @@ class SupabaseClient:
             logger.error(f"❌ Failed to update alert status for {alert_id}: {e}")
             return False
     
+    @timed(SUPABASE_CALL, "log_alert_trigger")
     async def log_alert_trigger(self, alert_log_data: Dict[str, Any]) -> bool:
         """Log alert trigger event to database."""
         if not self.client:
@@ -100,7 +217,8 @@ class SupabaseClient:
         
         try:
             # Ensure the alert_logs table exists or create the log record
-            response = self.client.table('alert_logs').insert(alert_log_data).execute()
+            query = self.client.table('alert_logs').insert(alert_log_data)
+            response = await self._execute('log_alert_trigger', query)
             
             if response.data:
                 logger.info(f"📝 Logged alert trigger for alert {alert_log_data.get('alert_id')}")
@@ -113,22 +231,40 @@ class SupabaseClient:
             logger.error(f"❌ Failed to log alert trigger: {e}")
             return False
     
+    @timed(SUPABASE_CALL, "insert_alert_logs")
+    async def insert_alert_logs(self, rows: List[Dict[str, Any]]) -> bool:
+        """Bulk-insert alert log rows in a single request."""
+        if not self.client:
+            return False
+        
+        try:
+            query = self.client.table('alert_logs').insert(rows)
+            response = await self._execute('insert_alert_logs', query)
+            return bool(response.data)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to insert {len(rows)} alert logs: {e}")
+            return False
+    
+    @timed(SUPABASE_CALL, "get_user_profile")
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile data for notifications."""
         if not self.client:
             return None
         
         try:
-            response = self.client.table('profiles').select('*').eq('id', user_id).single().execute()
+            query = self.client.table('profiles').select('*').eq('id', user_id).single()
+            response = await self._execute('get_user_profile', query)
             return response.data
             
         except Exception as e:
             logger.error(f"❌ Failed to fetch user profile {user_id}: {e}")
             return None
     
-    async def create_alert_log_entry(self, alert_id: str, trigger_data: Dict[str, Any]) -> bool:
-        """Create a structured log entry for alert triggers."""
-        log_entry = {
+    @staticmethod
+    def alert_log_entry(alert_id: str, trigger_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the structured ``alert_logs`` row for an alert trigger."""
+        return {
             'alert_id': alert_id,
             'trigger_price': trigger_data.get('trigger_price'),
             'trigger_timestamp': datetime.now().isoformat(),
@@ -137,30 +273,42 @@ class SupabaseClient:
             'notification_sent': trigger_data.get('notification_sent', False),
             'notification_details': trigger_data.get('notification_details', {})
         }
-        
-        return await self.log_alert_trigger(log_entry)
     
-    async def increment_alert_trigger_count(self, alert_id: str) -> bool:
-        """Increment the trigger count for an alert."""
+    async def create_alert_log_entry(self, alert_id: str, trigger_data: Dict[str, Any]) -> bool:
+        """Create a structured log entry for alert triggers."""
+        return await self.log_alert_trigger(self.alert_log_entry(alert_id, trigger_data))
+    
+    @timed(SUPABASE_CALL, "record_alert_triggers")
+    async def record_alert_triggers(self, triggers: List[Dict[str, Any]]) -> bool:
+        """Apply trigger bookkeeping for many alerts in one atomic RPC.
+
+        Each entry is ``{"alert_id", "trigger_count", "price", "triggered_at"}``,
+        ``trigger_count`` being the trigger's sequence number; the server raises
+        trigger_count to it (an entry without one adds one), sets triggered_at
+        and last_trigger_price, and deactivates one-time alerts (see
+        docs/atomic-trigger-count-migration.sql). Applying the same entries
+        again changes nothing.
+        """
         if not self.client:
+            logger.warning("Supabase not connected - skipping alert trigger bookkeeping")
             return False
         
         try:
-            # First get current count
-            current_response = self.client.table('alerts').select('trigger_count').eq('id', alert_id).single().execute()
-            current_count = current_response.data.get('trigger_count', 0) if current_response.data else 0
-            
-            # Update with incremented count
-            update_data = {
-                'trigger_count': current_count + 1,
-                'last_triggered_at': datetime.now().isoformat()
-            }
-            
-            return await self.update_alert_status(alert_id, update_data)
+            query = self.client.rpc('record_alert_triggers', {'triggers': triggers})
+            await self._execute('record_alert_triggers', query)
+            return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to increment trigger count for {alert_id}: {e}")
+            logger.error(f"❌ Failed to record {len(triggers)} alert triggers: {e}")
             return False
+    
+    async def increment_alert_trigger_count(self, alert_id: str, trigger_price: Optional[float] = None) -> bool:
+        """Increment the trigger count for an alert."""
+        return await self.record_alert_triggers([{
+            'alert_id': alert_id,
+            'price': trigger_price,
+            'triggered_at': datetime.now().isoformat()
+        }])
 
 # Global instance
 supabase_client = SupabaseClient()
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Selective decoders for Binance combined-stream frames.
+Turns a raw ``{"stream": ..., "data": {...}}`` frame into a compact Tick record,
+using the fastest JSON parser available and falling back to the standard library.
+"""
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional speed-up
+    msgspec = None
+
+Frame = Union[str, bytes]
+
+
+class Tick(NamedTuple):
+    """The only fields the alert engine reads from a market frame."""
+    symbol_id: int
+    price: float
+    volume: float
+    event_time: int  # Binance event time "E", epoch milliseconds
+
+
+class SymbolTable:
+    """Interns trading pair names to small integer ids."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def id_for(self, symbol: str) -> int:
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self._symbols)
+            self._ids[symbol] = symbol_id
+            self._symbols.append(symbol)
+        return symbol_id
+
+    def symbol(self, symbol_id: int) -> str:
+        return self._symbols[symbol_id]
+
+
+class FrameDecoder(ABC):
+    """Base decoder; subclasses turn one raw frame into a Tick or None."""
+
+    name = "base"
+
+    def __init__(self, symbols: Optional[SymbolTable] = None):
+        self.symbols = symbols if symbols is not None else SymbolTable()
+
+    @abstractmethod
+    def decode(self, raw: Frame) -> Optional[Tick]:
+        """Decode one frame; None for frames that carry no price."""
+
+    def _tick_from_payload(self, payload: Dict) -> Optional[Tick]:
+        # Ticker (@ticker) frames carry the last price in "c" and base volume in "v";
+        # trade (@trade) frames carry the price in "p" and quantity in "q".
+        # Note that a ticker's "p" is the 24h price change, so "c" must win.
+        price = payload.get("c")
+        if price is None:
+            price = payload.get("p")
+            if price is None:
+                return None
+            volume = payload.get("q")
+        else:
+            volume = payload.get("v")
+        return Tick(
+            self.symbols.id_for(payload["s"]),
+            float(price),
+            float(volume) if volume is not None else 0.0,
+            payload.get("E", 0),
+        )
+
+
+class StdlibDecoder(FrameDecoder):
+    """Reference decoder built on ``json.loads``."""
+
+    name = "json"
+
+    def decode(self, raw: Frame) -> Optional[Tick]:
+        return self._tick_from_payload(json.loads(raw)["data"])
+
+
+class OrjsonDecoder(FrameDecoder):
+    """``orjson`` parse; still builds the payload dict, but in C."""
+
+    name = "orjson"
+
+    def decode(self, raw: Frame) -> Optional[Tick]:
+        return self._tick_from_payload(orjson.loads(raw)["data"])
+
+
+if msgspec is not None:
+    class _Payload(msgspec.Struct):
+        s: str
+        c: Optional[str] = None
+        p: Optional[str] = None
+        v: Optional[str] = None
+        q: Optional[str] = None
+        E: int = 0
+
+    class _Envelope(msgspec.Struct):
+        data: _Payload
+
+
+class MsgspecDecoder(FrameDecoder):
+    """Typed ``msgspec`` decode; unknown ticker fields are skipped without building dicts."""
+
+    name = "msgspec"
+
+    def __init__(self, symbols: Optional[SymbolTable] = None):
+        super().__init__(symbols)
+        self._decoder = msgspec.json.Decoder(_Envelope)
+
+    def decode(self, raw: Frame) -> Optional[Tick]:
+        payload = self._decoder.decode(raw).data
+        if payload.c is not None:
+            price, volume = payload.c, payload.v
+        elif payload.p is not None:
+            price, volume = payload.p, payload.q
+        else:
+            return None
+        return Tick(
+            self.symbols.id_for(payload.s),
+            float(price),
+            float(volume) if volume is not None else 0.0,
+            payload.E,
+        )
+
+
+# Fastest first
+DECODERS = {
+    "msgspec": (MsgspecDecoder, msgspec is not None),
+    "orjson": (OrjsonDecoder, orjson is not None),
+    "json": (StdlibDecoder, True),
+}
+
+# Errors a decoder raises for a malformed or unexpected frame
+DECODE_ERRORS = (ValueError, KeyError, TypeError) + ((msgspec.DecodeError,) if msgspec is not None else ())
+
+
+def available_decoders() -> List[str]:
+    """Names of decoders whose parser is installed, fastest first."""
+    return [name for name, (_, installed) in DECODERS.items() if installed]
+
+
+def get_decoder(name: Optional[str] = None, symbols: Optional[SymbolTable] = None) -> FrameDecoder:
+    """Return the requested decoder (or ``TICK_DECODER``), else the fastest installed one."""
+    name = name or os.getenv("TICK_DECODER")
+    if name:
+        decoder_cls, installed = DECODERS.get(name, (None, False))
+        if installed:
+            return decoder_cls(symbols)
+        logger.warning(f"⚠️ Tick decoder '{name}' not available, falling back")
+
+    decoder_cls, _ = DECODERS[available_decoders()[0]]
+    return decoder_cls(symbols)
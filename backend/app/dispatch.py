@@ -0,0 +1,608 @@
+"""
+Notification dispatch off the alert evaluation path.
+Triggered alerts are fanned out per destination, and alerts reaching the same
+destination within a short window are merged into one notification. Jobs are
+paced by token buckets per destination and per provider account, shed by
+priority class when dispatch is over capacity, and sent by a fixed pool of
+workers per channel, so a wave of triggers never spawns unbounded work.
+Failed sends are retried with backoff and recorded in the durable outbox.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .alerts import NOTIFICATION_CHANNELS
+from .metrics import (
+    NOTIFICATION_QUEUE_WAIT, NOTIFICATION_SEND, NOTIFICATIONS_COALESCED, NOTIFICATIONS_DEAD_LETTERED,
+    NOTIFICATIONS_DELAYED, NOTIFICATIONS_RETRIED, NOTIFICATIONS_SHED, NOTIFICATIONS_THROTTLED
+)
+from .models import AlertDirection, AlertTriggerEvent, AlertType
+from .outbox import DEAD, DROPPED, PENDING, SENT, idempotency_key
+from .rate_limit import BucketMap, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Concurrent sends per channel; NOTIFY_CONCURRENCY_<CHANNEL> overrides, e.g. NOTIFY_CONCURRENCY_VOICE=2
+DEFAULT_CONCURRENCY = {"voice": 4, "sms": 4, "email": 8, "push": 16, "webhook": 16}
+NOTIFY_CONCURRENCY = {
+    channel: int(os.getenv(f"NOTIFY_CONCURRENCY_{channel.upper()}", str(DEFAULT_CONCURRENCY[channel])))
+    for channel in NOTIFICATION_CHANNELS
+}
+
+# Priority classes: 0 (voice, sms) is admitted ahead of 1 (email, push, webhook) under load
+CHANNEL_PRIORITY = {"voice": 0, "sms": 0, "email": 1, "push": 1, "webhook": 1}
+# Added to a job's class priority when it is a retry, so first sends overtake queued retries
+RETRY_PRIORITY = 2
+# Jobs queued or delayed across all channels. Lower-priority jobs are shed once
+# LOW_PRIORITY_SHARE of it is taken, which keeps the rest for voice and sms
+NOTIFY_MAX_PENDING = int(os.getenv("NOTIFY_MAX_PENDING", "5000"))
+LOW_PRIORITY_SHARE = 0.5
+
+# Per-destination pacing as (burst, sustained per minute); NOTIFY_DESTINATION_PER_MINUTE_<CHANNEL> overrides the rate
+DEFAULT_DESTINATION_LIMITS = {"voice": (2, 2), "sms": (3, 4), "email": (10, 20), "push": (20, 60), "webhook": (50, 300)}
+NOTIFY_DESTINATION_LIMITS = {
+    channel: (burst, float(os.getenv(f"NOTIFY_DESTINATION_PER_MINUTE_{channel.upper()}", str(per_minute))))
+    for channel, (burst, per_minute) in DEFAULT_DESTINATION_LIMITS.items()
+}
+# A notification whose destination has no slot free within this many seconds is throttled
+NOTIFY_MAX_DELAY = float(os.getenv("NOTIFY_MAX_DELAY_SECONDS", "30"))
+
+# Alerts for the same destination within this window go out as one notification
+NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW_MS", "250")) / 1000
+# Webhook consumers get every event on its own
+COALESCED_CHANNELS = ("voice", "sms", "email", "push")
+# Alerts spelled out in a merged message before the rest are summarised as "N more"
+MAX_MERGED_SUMMARIES = 5
+
+# Sends per notification before it is dead-lettered, with exponential backoff between them
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_RETRY_BASE = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "2"))
+NOTIFY_RETRY_MAX = float(os.getenv("NOTIFY_RETRY_MAX_SECONDS", "300"))
+
+# Provider accounts shared by several channels, with their sends per second
+CHANNEL_ACCOUNTS = {"voice": "twilio", "sms": "twilio"}
+PROVIDER_RATES = {"twilio": float(os.getenv("TWILIO_CALLS_PER_SECOND", "1"))}
+
+
+class _Delivery:
+    """One trigger event's fan-out; its results are logged once every destination is done."""
+
+    __slots__ = ("event", "pending", "results")
+
+    def __init__(self, event: AlertTriggerEvent, pending: int):
+        self.event = event
+        self.pending = pending
+        self.results: List[Dict[str, Any]] = []
+
+
+class _Batch:
+    """Events for one (channel, destination) sent as a single notification."""
+
+    __slots__ = ("destination", "deliveries", "events", "keys", "opened_at", "attempts")
+
+    def __init__(self, destination: str, opened_at: float):
+        self.destination = destination
+        self.deliveries: List[_Delivery] = []
+        self.events: List[AlertTriggerEvent] = []
+        # Outbox idempotency keys, one per event
+        self.keys: List[str] = []
+        self.opened_at = opened_at
+        self.attempts = 0
+
+    def add(self, delivery: _Delivery, key: str) -> None:
+        self.deliveries.append(delivery)
+        self.events.append(delivery.event)
+        self.keys.append(key)
+
+
+# (batch, destination, merged event, delayed)
+_Job = Tuple[_Batch, str, AlertTriggerEvent, bool]
+
+
+def job_priority(channel: str, batch: _Batch) -> int:
+    """Queue order of a job; lower goes first."""
+    return CHANNEL_PRIORITY.get(channel, 1) + (RETRY_PRIORITY if batch.attempts else 0)
+
+
+def retry_delay(attempts: int, base: float = NOTIFY_RETRY_BASE, cap: float = NOTIFY_RETRY_MAX) -> float:
+    """Backoff before the next send after ``attempts`` failed ones, jittered so retries spread out."""
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+def _format_price(value: float) -> str:
+    if value >= 1:
+        return f"{value:,.2f}".removesuffix(".00")
+    return f"{value:.8g}"
+
+
+def summarize_event(event: AlertTriggerEvent) -> str:
+    """Short clause for one alert, e.g. "BTC above 70,000"."""
+    symbol = event.symbol.upper().removesuffix("USDT")
+    if event.alert_type == AlertType.PERCENTAGE_CHANGE:
+        moved = {AlertDirection.ABOVE: "up", AlertDirection.BELOW: "down"}.get(event.direction, "moved")
+        return f"{symbol} {moved} {event.target_value:g}%"
+    side = "above" if event.direction == AlertDirection.ABOVE else "below"
+    return f"{symbol} {side} {_format_price(event.target_value)}"
+
+
+def _sentence(text: str) -> str:
+    text = text.strip()
+    return text if text.endswith((".", "!", "?")) else f"{text}."
+
+
+def merge_events(events: List[AlertTriggerEvent]) -> AlertTriggerEvent:
+    """One event carrying a combined message, timed from the earliest trigger.
+
+    Generated messages are condensed into one summary sentence; messages the
+    user wrote are kept word for word after it, in trigger order.
+    """
+    if len(events) == 1:
+        return events[0]
+    generated = [event for event in events if not event.custom_message]
+    sentences = []
+    if generated:
+        clauses = [summarize_event(event) for event in generated[:MAX_MERGED_SUMMARIES]]
+        if len(generated) > MAX_MERGED_SUMMARIES:
+            clauses.append(f"{len(generated) - MAX_MERGED_SUMMARIES} more alerts")
+        listed = clauses[0] if len(clauses) == 1 else f"{', '.join(clauses[:-1])} and {clauses[-1]}"
+        sentences.append(f"CryptoAlarm Alert! {listed}.")
+    sentences.extend(_sentence(event.message) for event in events if event.custom_message)
+    return events[0].model_copy(update={
+        'message': " ".join(sentences),
+        'triggered_at': min(event.triggered_at for event in events),
+        'custom_message': len(generated) < len(events),
+    })
+
+
+class NotificationDispatcher:
+    """Coalesced, rate-limited, prioritized notification delivery with worker pools per channel.
+
+    ``submit`` never waits. On coalesced channels the first event for a
+    destination opens a batch that collects every event for it over
+    ``coalesce_window`` seconds; the batch then becomes one job with a merged
+    message ("BTC above 70,000 and ETH above 4,000", followed by any messages
+    the user wrote for those alerts). Each job is admitted, delayed or dropped:
+
+    * shed: dispatch already holds its class's share of ``max_pending`` (open
+      batches, parked and queued jobs and retries all count). This is checked
+      when a batch opens, before a failed send is parked for a retry and for
+      each row ``recover`` re-admits, so no path grows the backlog past it;
+    * throttled: the destination's bucket has no token within ``max_delay``;
+    * delayed: the destination's next token is a few seconds out, so the job
+      is parked until then.
+
+    Admitted jobs wait in a priority queue per channel, ordered by
+    ``job_priority`` and then arrival, so a fresh notification goes out ahead
+    of retries already queued; parked items due at the same moment are
+    released in the same order. Workers then take a token from the provider
+    account bucket (Twilio's calls-per-second limit is shared by voice and
+    sms) before calling ``NotificationService.send_notification``. Dropped notifications are
+    recorded in the event's logged results with the reason as the error; that
+    bookkeeping runs on its own task, so dropping never makes ``submit`` wait.
+    Every event in a batch gets the batch's result, with the merged alert ids.
+
+    A failed send is re-admitted after ``retry_delay`` and dead-lettered
+    after ``max_attempts``; shed and throttled notifications are not retried,
+    and a retry that finds dispatch over capacity is shed. With an
+    ``outbox`` each destination is recorded under its idempotency key before
+    it is sent (a duplicate trigger is skipped) and settled afterwards, and
+    ``recover`` re-admits whatever was still pending when the process stopped.
+    """
+
+    def __init__(self, service, concurrency: Optional[Dict[str, int]] = None,
+                 max_pending: int = NOTIFY_MAX_PENDING,
+                 destination_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 provider_rates: Optional[Dict[str, float]] = None,
+                 max_delay: float = NOTIFY_MAX_DELAY, coalesce_window: float = NOTIFY_COALESCE_WINDOW,
+                 outbox=None, max_attempts: int = NOTIFY_MAX_ATTEMPTS, retry_base: float = NOTIFY_RETRY_BASE,
+                 retry_max: float = NOTIFY_RETRY_MAX):
+        self.service = service
+        self.outbox = outbox
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.coalesce_window = coalesce_window
+        self.concurrency = dict(NOTIFY_CONCURRENCY, **(concurrency or {}))
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        limits = dict(NOTIFY_DESTINATION_LIMITS, **(destination_limits or {}))
+        self._destinations = {
+            channel: BucketMap(per_minute / 60, burst) for channel, (burst, per_minute) in limits.items()
+        }
+        self._accounts = {
+            account: TokenBucket(rate, max(1.0, rate))
+            for account, rate in dict(PROVIDER_RATES, **(provider_rates or {})).items()
+        }
+        # Per channel: (priority, seq, job), lowest first
+        self._queues: Dict[str, asyncio.PriorityQueue] = {}
+        self._workers: List[asyncio.Task] = []
+        # Open batches per (channel, destination), collecting events until their window closes
+        self._batches: Dict[Tuple[str, str], _Batch] = {}
+        # (ready_at, priority, seq, channel, item): a _Job parked until its destination has a token,
+        # or a _Batch to admit then (its coalescing window closes, or it is due for a retry)
+        self._delayed: List[Tuple[float, int, int, str, Any]] = []
+        self._delayed_changed: Optional[asyncio.Event] = None
+        # (channel, batch, result) for dropped notifications, settled off the submit path
+        self._dropped: Optional[asyncio.Queue] = None
+        self._seq = itertools.count()
+        self._in_flight = {channel: 0 for channel in self.concurrency}
+        self._sent = {channel: 0 for channel in self.concurrency}
+        self._failed = {channel: 0 for channel in self.concurrency}
+        self._delayed_total = {channel: 0 for channel in self.concurrency}
+        self._throttled = {channel: 0 for channel in self.concurrency}
+        self._shed = {channel: 0 for channel in self.concurrency}
+        self._notifications = {channel: 0 for channel in self.concurrency}
+        # Destination-events routed to each channel, merged or not
+        self._routed = {channel: 0 for channel in self.concurrency}
+        self._coalesced = {channel: 0 for channel in self.concurrency}
+        self._retried = {channel: 0 for channel in self.concurrency}
+        self._dead_lettered = {channel: 0 for channel in self.concurrency}
+        # Labeled metric children resolved once
+        self._queue_wait = {channel: NOTIFICATION_QUEUE_WAIT.labels(channel) for channel in self.concurrency}
+        self._send_time = {channel: NOTIFICATION_SEND.labels(channel) for channel in self.concurrency}
+        self._delayed_metric = {channel: NOTIFICATIONS_DELAYED.labels(channel) for channel in self.concurrency}
+        self._throttled_metric = {channel: NOTIFICATIONS_THROTTLED.labels(channel) for channel in self.concurrency}
+        self._shed_metric = {channel: NOTIFICATIONS_SHED.labels(channel) for channel in self.concurrency}
+        self._coalesced_metric = {channel: NOTIFICATIONS_COALESCED.labels(channel) for channel in self.concurrency}
+        self._retried_metric = {channel: NOTIFICATIONS_RETRIED.labels(channel) for channel in self.concurrency}
+        self._dead_metric = {channel: NOTIFICATIONS_DEAD_LETTERED.labels(channel) for channel in self.concurrency}
+        self.events_submitted = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    @property
+    def pending(self) -> int:
+        """Open batches, retries and jobs admitted but not yet picked up by a worker."""
+        return self.queue_depth + len(self._delayed)
+
+    def _start(self) -> None:
+        if self._queues:
+            return
+        self._delayed_changed = asyncio.Event()
+        self._dropped = asyncio.Queue()
+        for channel, limit in self.concurrency.items():
+            queue = asyncio.PriorityQueue()
+            self._queues[channel] = queue
+            self._workers.extend(
+                asyncio.create_task(self._worker(channel, queue), name=f"notify-{channel}-{i}")
+                for i in range(limit)
+            )
+        self._workers.append(asyncio.create_task(self._release_delayed(), name="notify-delayed"))
+        self._workers.append(asyncio.create_task(self._settle_dropped(), name="notify-dropped"))
+
+    async def submit(self, trigger_event: AlertTriggerEvent) -> int:
+        """Route the event to each configured destination; returns how many destinations."""
+        self._start()
+        if not trigger_event.notification_data:
+            logger.warning(f"No notification configuration found for alert {trigger_event.alert_id}")
+            return 0
+        targets = [
+            (channel, destination, idempotency_key(trigger_event, channel, destination))
+            for channel, destination in self.service.targets(trigger_event)
+        ]
+        if self.outbox is not None:
+            targets = [target for target in targets if self.outbox.add(target[2], trigger_event, *target[:2])]
+            if not targets:
+                logger.info(f"Notifications for alert {trigger_event.alert_id} were already recorded; skipping")
+        if not targets:
+            return 0
+
+        self.events_submitted += 1
+        delivery = _Delivery(trigger_event, len(targets))
+        now = time.monotonic()
+        for channel, destination, key in targets:
+            self._routed[channel] += 1
+            batch = self._batches.get((channel, destination))
+            if batch is not None:
+                # Rides along with the notification already being collected for this destination
+                batch.add(delivery, key)
+                self._coalesced[channel] += 1
+                self._coalesced_metric[channel].inc()
+                continue
+            batch = _Batch(destination, now)
+            batch.add(delivery, key)
+            if not self._has_room(channel):
+                self._notifications[channel] += 1
+                self._drop(channel, batch, trigger_event, "shed")
+                continue
+            if self.coalesce_window > 0 and channel in COALESCED_CHANNELS:
+                self._batches[(channel, destination)] = batch
+                self._park(now + self.coalesce_window, channel, batch)
+            else:
+                self._dispatch(channel, batch, now)
+        return len(targets)
+
+    async def recover(self) -> int:
+        """Re-admit the outbox's pending notifications, one per destination and event."""
+        if self.outbox is None:
+            return 0
+        self._start()
+        rows = await self.outbox.load_pending()
+        wall_now, now = time.time(), time.monotonic()
+        recovered = 0
+        for key, channel, destination, event_json, attempts, next_attempt_at in rows:
+            try:
+                if channel not in self.concurrency:
+                    raise ValueError(f"unknown channel {channel!r}")
+                event = AlertTriggerEvent.model_validate_json(event_json)
+            except ValueError as e:
+                logger.error(f"❌ Dead-lettering unreadable outbox row {key}: {e}")
+                self.outbox.mark([key], DEAD, attempts, str(e))
+                continue
+            self._routed[channel] += 1
+            batch = _Batch(destination, now)
+            batch.add(_Delivery(event, 1), key)
+            batch.attempts = attempts
+            if not self._has_room(channel):
+                self._drop(channel, batch, event, "shed")
+                continue
+            self._park(now + max(0.0, (next_attempt_at or wall_now) - wall_now), channel, batch)
+            recovered += 1
+        if rows:
+            logger.info(f"📬 Recovered {recovered} of {len(rows)} pending notifications from the outbox")
+        return recovered
+
+    def _park(self, ready_at: float, channel: str, item: Any) -> None:
+        batch = item if isinstance(item, _Batch) else item[0]
+        heapq.heappush(self._delayed, (ready_at, job_priority(channel, batch), next(self._seq), channel, item))
+        self._delayed_changed.set()
+
+    def _enqueue(self, channel: str, job: _Job) -> None:
+        self._queues[channel].put_nowait((job_priority(channel, job[0]), next(self._seq), job))
+
+    def _dispatch(self, channel: str, batch: _Batch, now: float) -> None:
+        """Turn a closed batch into one job: queue it, park it for its rate slot, or throttle it.
+
+        The batch already holds its ``max_pending`` slot, taken when it opened
+        (or was recovered, or parked for a retry).
+        """
+        destination = batch.destination
+        event = merge_events(batch.events)
+        if batch.attempts:
+            # A retry was admitted and charged to its destination the first time; the backoff paces it
+            self._enqueue(channel, (batch, destination, event, False))
+            return
+        self._notifications[channel] += 1
+        bucket = self._destinations[channel].get(destination, now)
+        if bucket.wait_time(now) > self.max_delay:
+            self._throttled[channel] += 1
+            self._throttled_metric[channel].inc()
+            self._drop(channel, batch, event, "throttled")
+            return
+        wait = bucket.reserve(now)
+        if wait > 0:
+            self._count_delayed(channel)
+            self._park(now + wait, channel, (batch, destination, event, True))
+        else:
+            self._enqueue(channel, (batch, destination, event, False))
+
+    def _has_room(self, channel: str) -> bool:
+        """Whether one more job fits in the channel's class share of ``max_pending``; counts a shed if not."""
+        capacity = self.max_pending
+        if CHANNEL_PRIORITY.get(channel, 1) > 0:
+            capacity = int(capacity * LOW_PRIORITY_SHARE)
+        if self.pending < capacity:
+            return True
+        self._shed[channel] += 1
+        self._shed_metric[channel].inc()
+        return False
+
+    def _drop(self, channel: str, batch: _Batch, event: AlertTriggerEvent, reason: str) -> None:
+        """Give up on a notification; its result is recorded by the notify-dropped task."""
+        logger.warning(f"⚠️ {reason.capitalize()} {channel} notification to {batch.destination} "
+                       f"for {len(batch.events)} alert(s)")
+        self._dropped.put_nowait((channel, batch, self._dropped_result(channel, batch.destination, event, reason)))
+
+    def _count_delayed(self, channel: str) -> None:
+        self._delayed_total[channel] += 1
+        self._delayed_metric[channel].inc()
+
+    @staticmethod
+    def _dropped_result(channel: str, destination: str, trigger_event: AlertTriggerEvent, reason: str) -> Dict[str, Any]:
+        return {
+            'type': channel,
+            'destination': destination,
+            'success': False,
+            'error': reason,
+            'timestamp': trigger_event.triggered_at.isoformat()
+        }
+
+    async def _settle(self, channel: str, batch: _Batch, result: Dict[str, Any]) -> None:
+        """Schedule a retry for a failed attempt, or record the final result."""
+        batch.attempts += 1
+        error = result.get('error')
+        if result.get('success'):
+            status = SENT
+        elif error in ("shed", "throttled"):
+            # Deliberate load decisions; retrying them would defeat the point
+            status = DROPPED
+        elif batch.attempts < self.max_attempts and not self._has_room(channel):
+            # Retries count against max_pending like new notifications; one that finds no room is shed
+            status = DROPPED
+            error = f"shed before retry {batch.attempts} ({error})"
+            result = dict(result, error=error)
+            logger.warning(f"⚠️ Shed {channel} notification to {batch.destination} instead of retrying it")
+        elif batch.attempts < self.max_attempts:
+            delay = retry_delay(batch.attempts, self.retry_base, self.retry_max)
+            self._retried[channel] += 1
+            self._retried_metric[channel].inc()
+            logger.warning(f"⚠️ {channel} notification to {batch.destination} failed ({error}); "
+                           f"retry {batch.attempts} in {delay:.1f}s")
+            if self.outbox is not None:
+                self.outbox.mark(batch.keys, PENDING, batch.attempts, error, time.time() + delay)
+            batch.opened_at = time.monotonic() + delay
+            self._park(batch.opened_at, channel, batch)
+            return
+        else:
+            status = DEAD
+            self._dead_lettered[channel] += 1
+            self._dead_metric[channel].inc()
+            logger.error(f"❌ Dead-lettered {channel} notification to {batch.destination} "
+                         f"after {batch.attempts} attempts: {error}")
+        if self.outbox is not None:
+            self.outbox.mark(batch.keys, status, batch.attempts, error)
+        await self._complete_batch(batch, result)
+
+    async def _complete_batch(self, batch: _Batch, result: Dict[str, Any]) -> None:
+        """Record one notification's result against every event it carried."""
+        if len(batch.events) > 1:
+            result = dict(result, merged_alert_ids=[event.alert_id for event in batch.events])
+        for delivery in batch.deliveries:
+            delivery.results.append(result)
+            delivery.pending -= 1
+            if delivery.pending == 0:
+                await self.service.log_notification_results(delivery.event.alert_id, delivery.results)
+
+    async def _release_delayed(self) -> None:
+        """Admit batches whose window closed or retry is due, and queue parked jobs whose token is due."""
+        while True:
+            if not self._delayed:
+                self._delayed_changed.clear()
+                await self._delayed_changed.wait()
+                continue
+            wait = self._delayed[0][0] - time.monotonic()
+            if wait > 0:
+                # Woken early if an earlier job is parked meanwhile
+                self._delayed_changed.clear()
+                try:
+                    await asyncio.wait_for(self._delayed_changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, _, channel, item = heapq.heappop(self._delayed)
+            if isinstance(item, _Batch):
+                if self._batches.get((channel, item.destination)) is item:
+                    del self._batches[(channel, item.destination)]
+                try:
+                    self._dispatch(channel, item, time.monotonic())
+                except Exception as e:
+                    logger.error(f"❌ Failed to dispatch {channel} notification to {item.destination}: {e}")
+            else:
+                self._enqueue(channel, item)
+
+    async def _settle_dropped(self) -> None:
+        """Record dropped notifications' results, so logging them never holds up ``submit``."""
+        while True:
+            channel, batch, result = await self._dropped.get()
+            try:
+                await self._settle(channel, batch, result)
+            except Exception as e:
+                logger.error(f"❌ Failed to record dropped {channel} notification to {batch.destination}: {e}")
+            finally:
+                self._dropped.task_done()
+
+    async def _worker(self, channel: str, queue: asyncio.PriorityQueue) -> None:
+        account = self._accounts.get(CHANNEL_ACCOUNTS.get(channel))
+        while True:
+            _, _, (batch, destination, event, delayed) = await queue.get()
+            try:
+                if account is not None:
+                    wait = account.reserve(time.monotonic())
+                    if wait > 0:
+                        if not delayed:
+                            self._count_delayed(channel)
+                        await asyncio.sleep(wait)
+
+                if self.outbox is not None:
+                    await self.outbox.wait_durable()
+                started = time.monotonic()
+                self._queue_wait[channel].observe(started - batch.opened_at)
+                self._in_flight[channel] += 1
+                try:
+                    result = await self.service.send_notification(channel, destination, event,
+                                                                  idempotency_key=batch.keys[0])
+                except Exception as e:
+                    # send_notification reports provider failures itself; this only guards against bugs
+                    logger.error(f"❌ {channel} dispatch to {destination} failed: {e}")
+                    result = {'type': channel, 'destination': destination, 'success': False, 'error': str(e)}
+                finally:
+                    self._in_flight[channel] -= 1
+                self._send_time[channel].observe(time.monotonic() - started)
+                if result.get('success'):
+                    self._sent[channel] += 1
+                else:
+                    self._failed[channel] += 1
+                await self._settle(channel, batch, result)
+            finally:
+                queue.task_done()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Give admitted notifications up to ``timeout`` seconds to go out, then stop the workers."""
+        if self._queues:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                while self._delayed and time.monotonic() < deadline:
+                    await asyncio.sleep(min(0.1, deadline - time.monotonic()))
+                try:
+                    await asyncio.wait_for(
+                        asyncio.gather(self._dropped.join(), *(queue.join() for queue in self._queues.values())),
+                        max(0.0, deadline - time.monotonic()),
+                    )
+                except asyncio.TimeoutError:
+                    break
+                # A failed send parks its retry before the worker marks the job done
+                if not self._delayed:
+                    break
+            if self.pending:
+                logger.warning(f"⚠️ Stopping notification dispatch with {self.pending} notifications not sent")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        self._dropped = None
+        self._delayed.clear()
+        self._batches.clear()
+
+    @staticmethod
+    def _coalesce_ratio(events: int, notifications: int) -> Optional[float]:
+        return round(events / notifications, 3) if notifications else None
+
+    def get_stats(self) -> Dict:
+        parked = {channel: 0 for channel in self.concurrency}
+        retrying = {channel: 0 for channel in self.concurrency}
+        for _, _, _, channel, item in self._delayed:
+            if not isinstance(item, _Batch):
+                parked[channel] += 1
+            elif item.attempts:
+                retrying[channel] += 1
+        notifications = sum(self._notifications.values())
+        return {
+            "events_submitted": self.events_submitted,
+            "coalesce_window_ms": round(self.coalesce_window * 1000),
+            # Events in per notification out, counting each destination of an event (1.0 = nothing merged)
+            "coalesce_ratio": self._coalesce_ratio(sum(self._routed.values()), notifications),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "destinations_tracked": sum(len(buckets) for buckets in self._destinations.values()),
+            "outbox": self.outbox.get_stats() if self.outbox is not None else None,
+            "channels": {
+                channel: {
+                    "priority": CHANNEL_PRIORITY.get(channel, 1),
+                    "limit": limit,
+                    "queued": self._queues[channel].qsize() if channel in self._queues else 0,
+                    "waiting_for_rate": parked[channel],
+                    "collecting": sum(1 for key in self._batches if key[0] == channel),
+                    "retrying": retrying[channel],
+                    "in_flight": self._in_flight[channel],
+                    "sent": self._sent[channel],
+                    "failed": self._failed[channel],
+                    "delayed": self._delayed_total[channel],
+                    "throttled": self._throttled[channel],
+                    "shed": self._shed[channel],
+                    "notifications": self._notifications[channel],
+                    "coalesced": self._coalesced[channel],
+                    "coalesce_ratio": self._coalesce_ratio(self._routed[channel], self._notifications[channel]),
+                    "retried": self._retried[channel],
+                    "dead_lettered": self._dead_lettered[channel],
+                }
+                for channel, limit in self.concurrency.items()
+            },
+        }
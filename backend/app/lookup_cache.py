@@ -0,0 +1,55 @@
+"""
+Bounded LRU cache with per-entry expiry for single-alert lookups.
+Holds alerts that are not in the monitored set (inactive rows and ids with no
+row), so repeated status or test requests do not go back to the database.
+"""
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Least-recently-used cache whose entries expire ``ttl`` seconds after being set.
+
+    ``None`` is a cacheable value (a negative lookup), so ``get`` returns a
+    ``(hit, value)`` pair rather than overloading ``None``.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, value), oldest first
+        self._entries: "OrderedDict[Hashable, Tuple[float, Optional[V]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[V]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def set(self, key: Hashable, value: Optional[V]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -2,12 +2,12 @@
 Enhanced CryptoAlarm API with database integration and comprehensive notification support.
 """
 import asyncio
-import json
-import websockets
 import logging
+import time
 from datetime import datetime
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from typing import List, Optional
 from .alerts import notification_service
 from .models import (
@@ -15,7 +15,20 @@ from .models import (
     NotificationRequest, AlertSyncResponse, TestAlertRequest, AlertStatusResponse
 )
 from .alert_logic import alert_manager
+from .binance_client import BinanceRestClient
+from .change_feed import ALERT_FEED_DSN, AlertChangeFeed, PostgresNotifyListener
+from .compaction import ALERT_ARCHIVE_PATH, AlertArchive, AlertCompactor
 from .database import supabase_client
+from .decoders import DECODE_ERRORS, get_decoder
+from .dispatch import NotificationDispatcher
+from .metrics import TICK_EVALUATE, TICK_RECEIVE_TO_EVALUATE, registry as metrics_registry
+from .outbox import NOTIFY_OUTBOX_PATH, NotificationOutbox
+from .providers import provider_stats
+from .replay import FrameRecorder
+from .subscriptions import SubscriptionManager
+from .tick_pipeline import ConflatingTickBuffer
+from .warm_start import WARM_START_PATH, WarmStartStore
+from .write_behind import trigger_writes
 from dotenv import load_dotenv
 import os
 import requests
@@ -41,61 +54,189 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Boot-to-armed is measured from module import, i.e. roughly process start
+BOOT_STARTED = time.monotonic()
+boot_to_armed: Optional[float] = None
+
 # Shared dictionary for latest prices
 latest_prices = {}
 
-# Binance WebSocket stream - All 20 cryptocurrencies
-BINANCE_STREAM_URL = (
-    "wss://stream.binance.com:9443/stream?"
-    "streams="
-    "btcusdt@ticker/ethusdt@ticker/bnbusdt@ticker/solusdt@ticker/xrpusdt@ticker/"
-    "dogeusdt@ticker/adausdt@ticker/shibusdt@ticker/usdcusdt@ticker/suiusdt@ticker/"
-    "pepeusdt@ticker/trxusdt@ticker/linkusdt@ticker/ltcusdt@ticker/polyusdt@ticker/"
-    "bchusdt@ticker/dotusdt@ticker/avaxusdt@ticker/uniusdt@ticker/xlmusdt@ticker"
+# Hand-off between the WebSocket reader and the alert evaluator
+tick_buffer = ConflatingTickBuffer()
+
+# Triggered alerts go to bounded per-channel worker pools instead of a task each,
+# recorded in a local outbox so a restart or provider outage does not lose them
+notification_outbox = NotificationOutbox(NOTIFY_OUTBOX_PATH) if NOTIFY_OUTBOX_PATH else None
+notification_dispatcher = NotificationDispatcher(notification_service, outbox=notification_outbox)
+
+# Pipeline counters are read at scrape time rather than double-counted on the hot path
+metrics_registry.counter_callback(
+    "cryptoalarm_ticks_conflated_total", "Ticks overwritten before evaluation", lambda: tick_buffer.ticks_conflated)
+metrics_registry.counter_callback(
+    "cryptoalarm_frames_dropped_total", "Frames that did not decode into a tick", lambda: tick_buffer.frames_dropped)
+metrics_registry.gauge_callback(
+    "cryptoalarm_tick_queue_depth", "Symbols waiting for evaluation", lambda: tick_buffer.queue_depth)
+metrics_registry.gauge_callback(
+    "cryptoalarm_notification_queue_depth", "Notifications waiting for a dispatch worker",
+    lambda: notification_dispatcher.pending)
+metrics_registry.gauge_callback(
+    "cryptoalarm_alert_change_feed_live", "1 while the alert change feed is connected and caught up",
+    lambda: 1 if alert_change_feed.live else 0)
+metrics_registry.gauge_callback(
+    "cryptoalarm_boot_to_armed_seconds", "Time from process start until alerts were armed",
+    lambda: boot_to_armed if boot_to_armed is not None else float("nan"))
+metrics_registry.gauge_callback(
+    "cryptoalarm_alerts_in_memory", "Alerts held in the in-memory snapshot", lambda: len(alert_manager.alerts))
+metrics_registry.counter_callback(
+    "cryptoalarm_alerts_compacted_total", "Finished alerts evicted from memory", lambda: alert_compactor.alerts_evicted)
+metrics_registry.counter_callback(
+    "cryptoalarm_alert_compaction_reclaimed_bytes_total", "Estimated heap released by alert compaction",
+    lambda: alert_compactor.bytes_reclaimed)
+
+# Frame decoder (msgspec/orjson when installed, stdlib json otherwise)
+frame_decoder = get_decoder()
+
+# Optional raw frame recording for offline replay (see app/replay.py)
+RECORD_FRAMES_DIR = os.getenv("RECORD_FRAMES_DIR")
+frame_recorder = FrameRecorder(RECORD_FRAMES_DIR) if RECORD_FRAMES_DIR else None
+
+def handle_binance_frame(msg, received_at: float) -> None:
+    """Reader stage: decode one frame and publish the latest tick for its symbol.
+
+    Alert evaluation runs in ``evaluate_ticks`` so a slow check or database
+    write never backs up the socket.
+    """
+    tick_buffer.frame_received()
+    if frame_recorder is not None:
+        frame_recorder.record(msg)
+    try:
+        # Handles both ticker (@ticker) and trade (@trade) stream formats
+        tick = frame_decoder.decode(msg)
+    except DECODE_ERRORS:
+        tick = None
+    if tick is None:
+        tick_buffer.drop_frame()
+        return  # Skip if no price data
+    
+    symbol = frame_decoder.symbols.symbol(tick.symbol_id)  # e.g. "BTCUSDT"
+    latest_prices[symbol] = tick.price
+    tick_buffer.put(symbol, tick.price, received_at)
+
+# REST snapshots for the price range a shard missed while disconnected
+binance_rest_client = BinanceRestClient()
+
+async def recover_feed_gap(pairs: List[str], gap_seconds: float) -> None:
+    """Evaluate the high/low Binance saw during a shard outage against pending alerts."""
+    monitored = alert_manager.get_monitored_pairs()
+    pending = [pair for pair in pairs if pair in monitored]
+    if not pending:
+        return
+    
+    started_at = time.time() - gap_seconds
+    ranges = await binance_rest_client.get_window_ranges(pending, gap_seconds)
+    # Rolling windows reach back a minute or more before the outage, into crossings the stream already
+    # handled; the pairs they would fire on are re-read from klines bounded to the gap (a pair whose
+    # klines cannot be read keeps its rolling range, so a failure over-reports rather than misses)
+    flagged = [pair for pair, (low, high, _) in ranges.items() if alert_manager.range_fires_alert(pair, low, high)]
+    if flagged:
+        ranges.update(await binance_rest_client.get_gap_ranges(flagged, started_at))
+    for pair, (low, high, last) in ranges.items():
+        triggered_events = await alert_manager.check_price_range(pair, low, high, last)
+        for event in triggered_events:
+            await notification_dispatcher.submit(event)
+
+# Binance streams: the 20 default pairs for /prices plus every pair an active alert needs,
+# sharded across connections and updated at runtime
+subscription_manager = SubscriptionManager(
+    on_frame=handle_binance_frame,
+    base_pairs=alert_manager.symbol_to_pair.values(),
+    on_gap=recover_feed_gap,
+)
+# Alerts the manager arms by itself (lookups, recurring re-arms) may need a new stream too
+alert_manager.on_alerts_changed = subscription_manager.notify_changed
+
+# Pushed alert changes from Postgres LISTEN/NOTIFY; replaces polling while live
+alert_change_feed = AlertChangeFeed(
+    alert_manager,
+    PostgresNotifyListener(ALERT_FEED_DSN) if ALERT_FEED_DSN else None,
+    on_applied=subscription_manager.notify_changed,
 )
 
+# Evicts deleted and fired one-time alerts from memory, archiving them first
+alert_compactor = AlertCompactor(
+    alert_manager,
+    AlertArchive(ALERT_ARCHIVE_PATH) if ALERT_ARCHIVE_PATH else None,
+)
+
+# Alert engine state saved to local disk so restarts arm alerts before Supabase answers
+warm_start = WarmStartStore(WARM_START_PATH) if WARM_START_PATH else None
+
 async def listen_to_binance():
-    """Enhanced WebSocket listener with database alert checking."""
-    try:
-        async with websockets.connect(BINANCE_STREAM_URL) as ws:
-            logger.info("✅ Connected to Binance WebSocket...")
-            while True:
-                msg = await ws.recv()
-                data = json.loads(msg)
-                payload = data["data"]
-                symbol = payload["s"]      # e.g. "BTCUSDT"
-                
-                # Handle both ticker (@ticker) and trade (@trade) stream formats
-                if "c" in payload:  # Ticker stream - use close price
-                    price = float(payload["c"])
-                elif "p" in payload:  # Trade stream - use trade price  
-                    price = float(payload["p"])
-                else:
-                    continue  # Skip if no price data
-                    
-                latest_prices[symbol] = price
-                
+    """Run the Binance stream shards, following the pairs the active alerts need."""
+    logger.info(f"✅ Starting Binance WebSocket streams ({frame_decoder.name} decoder)...")
+    await subscription_manager.run(alert_manager.get_monitored_pairs)
+
+async def evaluate_ticks():
+    """Alert evaluator: drain dirty symbols from the tick buffer as a batch."""
+    while True:
+        batch = await tick_buffer.drain()
+        if alert_manager.use_vector_engine:
+            await evaluate_tick_batch(batch)
+            continue
+        for symbol, price, received_at in batch:
+            started = time.monotonic()
+            TICK_RECEIVE_TO_EVALUATE.observe(started - received_at)
+            try:
                 # Check alerts (both in-memory and database)
                 triggered_events = await alert_manager.check_alert_conditions(symbol, price)
-                
-                # Send notifications for triggered events
-                for event in triggered_events:
-                    asyncio.create_task(alert_manager.send_notifications_for_trigger(event))
-                    
+            except Exception as e:
+                logger.error(f"❌ Alert evaluation failed for {symbol}: {e}")
+                continue
+            TICK_EVALUATE.observe(time.monotonic() - started)
+            tick_buffer.record_evaluated(received_at)
+            
+            # Send notifications for triggered events
+            for event in triggered_events:
+                await notification_dispatcher.submit(event)
+
+async def evaluate_tick_batch(batch):
+    """Evaluate a whole drained batch at once with the vector engine."""
+    started = time.monotonic()
+    for _, _, received_at in batch:
+        TICK_RECEIVE_TO_EVALUATE.observe(started - received_at)
+    try:
+        triggered_events = await alert_manager.check_alert_batch([(symbol, price) for symbol, price, _ in batch])
     except Exception as e:
-        logger.error(f"❌ Binance WebSocket error: {e}")
-        # Retry connection after delay
-        await asyncio.sleep(5)
-        asyncio.create_task(listen_to_binance())
+        logger.error(f"❌ Alert evaluation failed for batch of {len(batch)} ticks: {e}")
+        return
+    # Per-tick share of the batch so the histogram stays comparable with the per-tick engine
+    per_tick = (time.monotonic() - started) / len(batch)
+    for _, _, received_at in batch:
+        TICK_EVALUATE.observe(per_tick)
+        tick_buffer.record_evaluated(received_at)
+    
+    for event in triggered_events:
+        await notification_dispatcher.submit(event)
 
 async def periodic_database_sync():
-    """Periodically sync database alerts for monitoring."""
+    """Periodically sync database alerts for monitoring.
+
+    This is the only recurring sync; the tick path just reads the snapshot it publishes.
+    It stands down while the change feed is live and resumes if the feed drops.
+    """
     while True:
         try:
+            if alert_change_feed.live:
+                await asyncio.sleep(alert_manager.sync_interval)
+                continue
             synced_count = await alert_manager.sync_database_alerts()
+            if synced_count is None:
+                await asyncio.sleep(60)  # Wait longer on error
+                continue
+            subscription_manager.notify_changed()
             if synced_count > 0:
                 logger.info(f"🔄 Periodic sync: {synced_count} alerts")
-            await asyncio.sleep(30)  # Sync every 30 seconds
+            await asyncio.sleep(alert_manager.sync_interval)  # Sync every 30 seconds
         except Exception as e:
             logger.error(f"❌ Periodic sync failed: {e}")
             await asyncio.sleep(60)  # Wait longer on error
@@ -105,17 +246,57 @@ async def startup_event():
     """Initialize services when FastAPI launches."""
     logger.info("🚀 Starting CryptoAlarm API...")
     
-    # Initialize database connection and sync alerts
-    await alert_manager.sync_database_alerts()
+    # Arm alerts from the warm-start snapshot when there is one; periodic_database_sync's first
+    # pass (or the change feed on connect) then reconciles with the database in the background
+    global boot_to_armed
+    warm = warm_start is not None and await warm_start.restore(alert_manager, latest_prices)
+    if not warm:
+        await alert_manager.sync_database_alerts()
+    boot_to_armed = time.monotonic() - BOOT_STARTED
+    logger.info(f"⏱️ Boot to armed: {boot_to_armed * 1000:.0f}ms ({'warm start' if warm else 'full sync'}, "
+                f"{len(alert_manager.alerts)} alerts)")
     
-    # Start Binance WebSocket listener
+    # Resend notifications that were still pending when the process last stopped
+    if notification_outbox is not None:
+        try:
+            await notification_outbox.open()
+            await notification_dispatcher.recover()
+        except Exception as e:
+            logger.error(f"❌ Notification outbox unavailable, retrying in memory only: {e}")
+            notification_dispatcher.outbox = None
+    
+    # Start Binance WebSocket listener and the alert evaluator it feeds
     asyncio.create_task(listen_to_binance())
+    asyncio.create_task(evaluate_ticks())
     
-    # Start periodic database sync
+    # Follow database changes as they happen, with periodic sync as the fallback
+    asyncio.create_task(alert_change_feed.run())
     asyncio.create_task(periodic_database_sync())
+    asyncio.create_task(alert_compactor.run())
+    if warm_start is not None:
+        asyncio.create_task(warm_start.run(alert_manager, latest_prices))
     
     logger.info("✅ CryptoAlarm API started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush and release resources when FastAPI stops."""
+    if frame_recorder is not None:
+        frame_recorder.close()
+        logger.info(f"📼 Recorded {frame_recorder.frames_recorded} frames to {RECORD_FRAMES_DIR}")
+    await binance_rest_client.close()
+    await notification_dispatcher.close()
+    if notification_outbox is not None:
+        await notification_outbox.close()
+    await notification_service.close()
+    await trigger_writes.close()
+    if warm_start is not None:
+        try:
+            await warm_start.checkpoint(alert_manager, latest_prices)
+        except Exception as e:
+            logger.error(f"❌ Final warm-start snapshot failed: {e}")
+    supabase_client.close()
+
 # Basic endpoints
 @app.get("/")
 def root():
@@ -138,9 +319,23 @@ def health_check():
         "notification_service": notification_service.is_twilio_configured(),
         "active_symbols": len(latest_prices),
         "alert_stats": stats,
+        "ingest": tick_buffer.get_stats(),
+        "subscriptions": subscription_manager.get_stats(),
+        "alert_change_feed": alert_change_feed.get_stats(),
+        "write_behind": trigger_writes.get_stats(),
+        "notifications": notification_dispatcher.get_stats(),
+        "providers": provider_stats(),
+        "compaction": alert_compactor.get_stats(),
+        "warm_start": dict(warm_start.get_stats() if warm_start else {},
+                           boot_to_armed_ms=round(boot_to_armed * 1000, 1) if boot_to_armed is not None else None),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics for the ingest, evaluation and notification paths."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/prices")
 def get_prices():
     """Return the latest tracked prices."""
@@ -153,6 +348,8 @@ async def debug_alerts():
     try:
         # Get database alerts
         db_alerts = await supabase_client.fetch_active_alerts()
+        if db_alerts is None:
+            raise HTTPException(status_code=503, detail="Could not fetch alerts from the database")
         
         # Get in-memory alerts
         memory_alerts = list(alert_manager.alerts.keys())
@@ -181,6 +378,8 @@ async def debug_alerts():
                 "ETH": alert_manager.get_trading_pair("ETH")
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Debug alerts failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -189,7 +388,9 @@ async def debug_alerts():
 async def sync_alerts():
     """Manually trigger alert synchronization with database."""
     try:
-        synced_count = await alert_manager.sync_database_alerts()
+        synced_count = await alert_manager.sync_database_alerts(full=True)
+        if synced_count is None:
+            raise HTTPException(status_code=503, detail="Alert sync failed; the current alerts were kept")
         active_alerts = [alert.id for alert in alert_manager.get_active_alerts()]
         
         return AlertSyncResponse(
@@ -198,6 +399,8 @@ async def sync_alerts():
             message=f"Successfully synchronized {synced_count} alerts from database",
             timestamp=datetime.now()
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Manual sync failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -208,37 +411,11 @@ async def test_alert(alert_id: str, test_request: Optional[TestAlertRequest] = N
     try:
         logger.info(f"🧪 Testing alert {alert_id}")
         
-        # First check if we have this alert in our in-memory storage
-        if alert_id in alert_manager.alerts:
-            logger.info(f"✅ Found alert {alert_id} in memory")
-            alert = alert_manager.alerts[alert_id]
-        else:
-            logger.info(f"🔍 Alert {alert_id} not in memory, checking database...")
-            # Force sync first to ensure we have latest data
-            logger.info(f"🔄 Syncing database alerts before lookup...")
-            synced_count = await alert_manager.sync_database_alerts()
-            logger.info(f"📊 Sync completed: {synced_count} alerts synced")
-            
-            # Try again after sync
-            if alert_id in alert_manager.alerts:
-                logger.info(f"✅ Found alert {alert_id} in memory after sync")
-                alert = alert_manager.alerts[alert_id]
-            else:
-                # Fetch alert from database directly
-                alert = await alert_manager.get_database_alert(alert_id)
-                if not alert:
-                    logger.warning(f"❌ Alert {alert_id} not found in database either")
-                    # Let's also check what alerts we do have
-                    all_db_alerts = await supabase_client.fetch_active_alerts()
-                    logger.info(f"📊 Database has {len(all_db_alerts)} total alerts")
-                    if all_db_alerts:
-                        alert_ids = [a.get('id', 'no-id') for a in all_db_alerts[:3]]
-                        logger.info(f"🔍 Sample alert IDs: {alert_ids}")
-                    memory_alert_ids = list(alert_manager.alerts.keys())[:3]
-                    logger.info(f"🧠 Sample memory alert IDs: {memory_alert_ids}")
-                    raise HTTPException(status_code=404, detail="Alert not found")
-                else:
-                    logger.info(f"✅ Found alert {alert_id} directly from database")
+        # Memory first, then the lookup cache, then a single-row fetch; never a full resync
+        alert = await alert_manager.lookup_alert(alert_id)
+        if not alert:
+            logger.warning(f"❌ Alert {alert_id} not found in memory or database")
+            raise HTTPException(status_code=404, detail="Alert not found")
         
         logger.info(f"✅ Using alert: {alert.symbol} - {alert.alert_type}")
         
@@ -291,10 +468,7 @@ async def test_alert(alert_id: str, test_request: Optional[TestAlertRequest] = N
 async def get_alert_monitoring_status(alert_id: str):
     """Get monitoring status for a specific alert."""
     try:
-        # Force a sync to ensure we have latest data
-        logger.info(f"🔍 Getting status for alert {alert_id}, forcing sync first...")
-        await alert_manager.sync_database_alerts()
-        
+        # Looks the one alert up (memory, cache, then a single-row fetch) instead of resyncing
         status_info = await alert_manager.get_monitoring_status(alert_id)
         logger.info(f"📊 Alert {alert_id} status: {status_info}")
         
@@ -332,6 +506,7 @@ def create_alert(alert_request: CreateAlertRequest):
         )
         
         created_alert = alert_manager.create_alert(alert)
+        subscription_manager.notify_changed()
         
         return AlertResponse(
             id=created_alert.id,
@@ -352,9 +527,9 @@ def create_alert(alert_request: CreateAlertRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/alerts", response_model=List[AlertResponse])
-def get_alerts(status: Optional[AlertStatus] = None):
-    """Get all alerts, optionally filtered by status"""
-    alerts = alert_manager.get_all_alerts(status=status)
+def get_alerts(status: Optional[AlertStatus] = None, symbol: Optional[str] = None):
+    """Get all alerts, optionally filtered by status and symbol"""
+    alerts = alert_manager.get_all_alerts(status=status, symbol=symbol)
     return [
         AlertResponse(
             id=alert.id,
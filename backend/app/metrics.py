@@ -0,0 +1,248 @@
+"""
+Low-overhead Prometheus-style metrics for the alert hot path.
+Histograms use preallocated bucket arrays and labeled children are resolved once,
+so observing a value is a bisect and two array updates; ``/metrics`` renders the
+text exposition format on scrape.
+"""
+import functools
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond evaluation up to slow provider calls
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket counts live in a preallocated array."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        # One slot per bound plus +Inf
+        self.counts = array("Q", bytes(8 * (len(self.bounds) + 1)))
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        """Context manager observing elapsed seconds."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricFamily:
+    """A named metric with optional labels; children are created once and cached."""
+
+    def __init__(self, kind: str, name: str, help_text: str, label_names: Sequence[str] = (),
+                 factory: Callable = Counter):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names:
+            self._children[()] = factory()
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._factory()
+        return child
+
+    # Unlabeled families proxy to their single child
+    def inc(self, amount: int = 1) -> None:
+        self._children[()].inc(amount)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            if self.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(child.bounds + (float("inf"),), child.counts):
+                    cumulative += count
+                    le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{labels} {child.count}")
+            else:
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(child.value)}")
+        return lines
+
+
+class CallbackMetric:
+    """Counter or gauge read from an existing attribute at scrape time (zero hot-path cost)."""
+
+    def __init__(self, kind: str, name: str, help_text: str, read: Callable[[], float]):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_value(self.read())}"]
+
+
+class MetricsRegistry:
+    """Holds metric families and renders the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            return self._metrics[metric.name]
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Iterable[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily("counter", name, help_text, tuple(label_names), Counter))
+
+    def histogram(self, name: str, help_text: str, label_names: Iterable[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(MetricFamily(
+            "histogram", name, help_text, tuple(label_names), functools.partial(Histogram, buckets)
+        ))
+
+    def counter_callback(self, name: str, help_text: str, read: Callable[[], float]) -> CallbackMetric:
+        return self._register(CallbackMetric("counter", name, help_text, read))
+
+    def gauge_callback(self, name: str, help_text: str, read: Callable[[], float]) -> CallbackMetric:
+        return self._register(CallbackMetric("gauge", name, help_text, read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram: MetricFamily, label: Optional[str] = None):
+    """Decorator observing an async function's duration in a (labeled) histogram."""
+    child = histogram.labels(label) if label is not None else histogram
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+# Rows per write-behind flush
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+# Global registry and the hot-path metrics
+registry = MetricsRegistry()
+
+TICK_RECEIVE_TO_EVALUATE = registry.histogram(
+    "cryptoalarm_tick_receive_to_evaluate_seconds", "Time from frame receipt to the start of alert evaluation")
+TICK_EVALUATE = registry.histogram(
+    "cryptoalarm_tick_evaluate_seconds", "Alert evaluation time per tick")
+NOTIFICATION_LATENCY = registry.histogram(
+    "cryptoalarm_trigger_to_notification_seconds", "Time from alert trigger to notification sent",
+    label_names=("channel",))
+SUPABASE_CALL = registry.histogram(
+    "cryptoalarm_supabase_call_seconds", "Supabase call latency by method", label_names=("method",))
+SUPABASE_TIMEOUTS = registry.counter(
+    "cryptoalarm_supabase_timeouts_total", "Supabase calls abandoned after their timeout", label_names=("method",))
+BINANCE_RECONNECTS = registry.counter(
+    "cryptoalarm_binance_reconnects_total", "Binance WebSocket reconnects across all shards")
+ALERT_CHANGE_TO_APPLIED = registry.histogram(
+    "cryptoalarm_alert_change_to_applied_seconds", "Time from an alert change committing to it being armed in memory")
+WRITE_BEHIND_BATCH_SIZE = registry.histogram(
+    "cryptoalarm_write_behind_batch_rows", "Status updates and log rows written per write-behind flush",
+    buckets=BATCH_SIZE_BUCKETS)
+WRITE_BEHIND_FLUSH = registry.histogram(
+    "cryptoalarm_write_behind_flush_seconds", "Write-behind flush duration")
+NOTIFICATION_QUEUE_WAIT = registry.histogram(
+    "cryptoalarm_notification_queue_wait_seconds", "Time a notification waited for a dispatch worker",
+    label_names=("channel",))
+NOTIFICATION_SEND = registry.histogram(
+    "cryptoalarm_notification_send_seconds", "Provider call duration per notification", label_names=("channel",))
+NOTIFICATIONS_DELAYED = registry.counter(
+    "cryptoalarm_notifications_delayed_total", "Notifications held back for a destination or provider rate limit",
+    label_names=("channel",))
+NOTIFICATIONS_THROTTLED = registry.counter(
+    "cryptoalarm_notifications_throttled_total", "Notifications dropped because their destination was over its rate",
+    label_names=("channel",))
+NOTIFICATIONS_SHED = registry.counter(
+    "cryptoalarm_notifications_shed_total", "Notifications dropped because dispatch was over capacity",
+    label_names=("channel",))
+NOTIFICATIONS_COALESCED = registry.counter(
+    "cryptoalarm_notifications_coalesced_total", "Alert events merged into another event's notification",
+    label_names=("channel",))
+NOTIFICATIONS_RETRIED = registry.counter(
+    "cryptoalarm_notifications_retried_total", "Failed notifications scheduled for another attempt",
+    label_names=("channel",))
+NOTIFICATIONS_DEAD_LETTERED = registry.counter(
+    "cryptoalarm_notifications_dead_lettered_total", "Notifications given up on after their last attempt",
+    label_names=("channel",))
+PROVIDER_REQUEST = registry.histogram(
+    "cryptoalarm_provider_request_seconds", "HTTP request duration to a notification provider API",
+    label_names=("provider",))
@@ -26,6 +26,7 @@ class NotificationType(str, Enum):
     EMAIL = "email"
     PUSH = "push"
     VOICE = "voice"
+    WEBHOOK = "webhook"
 
 class Alert(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -82,6 +83,10 @@ class AlertTriggerEvent(BaseModel):
     message: str
     triggered_at: datetime
     notification_data: Optional[List[Dict[str, Any]]] = []
+    # The message is the user's own text rather than one generated from the alert
+    custom_message: bool = False
+    # The alert's trigger_count after this fire; 0 for events not raised by AlertManager
+    trigger_count: int = 0
 
 class NotificationRequest(BaseModel):
     alert_id: str
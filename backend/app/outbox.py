@@ -0,0 +1,274 @@
+"""
+Durable outbox for triggered-alert notifications.
+Every notification the dispatcher accepts is recorded in a local SQLite file
+(WAL mode) under an idempotency key and marked sent, dropped or dead once it
+settles, so notifications still pending at a crash or restart go out on the
+next boot. Writes are buffered and committed in batches from one thread.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .models import AlertTriggerEvent
+
+logger = logging.getLogger(__name__)
+
+# SQLite file on a persistent volume, e.g. /var/lib/cryptoalarm/notification_outbox.db. Unset
+# disables the outbox (retries still happen, but only in memory)
+NOTIFY_OUTBOX_PATH = os.getenv("NOTIFY_OUTBOX_PATH")
+NOTIFY_OUTBOX_FLUSH_INTERVAL = float(os.getenv("NOTIFY_OUTBOX_FLUSH_INTERVAL_MS", "20")) / 1000
+# Sent and dropped rows (and their keys) are kept this long; dead letters stay until removed by hand
+NOTIFY_OUTBOX_RETENTION = float(os.getenv("NOTIFY_OUTBOX_RETENTION_SECONDS", "86400"))
+NOTIFY_OUTBOX_PRUNE_INTERVAL = 300
+
+PENDING, SENT, DROPPED, DEAD = "pending", "sent", "dropped", "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    alert_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    event TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, updated_at);
+"""
+
+# (key, channel, destination, event JSON, attempts, next_attempt_at)
+PendingRow = Tuple[str, str, str, str, int, Optional[float]]
+
+
+def idempotency_key(event: AlertTriggerEvent, channel: str, destination: str) -> str:
+    """One key per (alert, trigger sequence, destination); a replayed trigger maps to the same row.
+
+    The sequence is the alert's trigger_count, which is the same however
+    often or late the trigger is replayed. Events without one (raised
+    outside AlertManager) fall back to their trigger time.
+    """
+    sequence = event.trigger_count or event.triggered_at.isoformat()
+    return f"{event.alert_id}|{sequence}|{channel}|{destination}"
+
+
+class NotificationOutbox:
+    """SQLite-backed record of every notification until it settles.
+
+    ``add`` and ``mark`` only buffer; a flush loop commits the buffer every
+    ``flush_interval`` in one transaction, which is what keeps enqueues in the
+    thousands per second. Senders call ``wait_durable`` first, so a
+    notification is never sent before its row is committed. Delivery is
+    at-least-once: a row that was in flight at a crash is sent again.
+    """
+
+    def __init__(self, path: str, flush_interval: float = NOTIFY_OUTBOX_FLUSH_INTERVAL,
+                 retention: float = NOTIFY_OUTBOX_RETENTION):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = retention
+        # One thread owns the connection, so writes are serialized without locking
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Keys recorded within the retention window -> when, oldest first
+        self._keys: Dict[str, float] = {}
+        self._inserts: List[tuple] = []
+        self._updates: List[tuple] = []
+        # Resolve once the buffered writes, and the ones being written, are committed
+        self._committed: Optional[asyncio.Future] = None
+        self._writing: Optional[asyncio.Future] = None
+        self._has_data: Optional[asyncio.Event] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune = time.monotonic()
+        self.enqueued = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.last_flush_ms: Optional[float] = None
+        self.dead_letters = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def buffered(self) -> int:
+        return len(self._inserts) + len(self._updates)
+
+    def _run_in_thread(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Commits survive a process crash; only an OS crash can lose the last few
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        cutoff = time.time() - self.retention
+        self._keys = dict(conn.execute(
+            "SELECT key, created_at FROM outbox WHERE created_at >= ? ORDER BY created_at", (cutoff,)))
+        self.dead_letters = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (DEAD,)).fetchone()[0]
+        self._conn = conn
+
+    async def open(self) -> None:
+        await self._run_in_thread(self._open)
+        logger.info(f"📮 Notification outbox {self.path}: {len(self._keys)} recent keys, "
+                    f"{self.dead_letters} dead letters")
+
+    def _load_pending(self) -> List[PendingRow]:
+        return self._conn.execute(
+            "SELECT key, channel, destination, event, attempts, next_attempt_at FROM outbox "
+            "WHERE status = ? ORDER BY created_at", (PENDING,)).fetchall()
+
+    async def load_pending(self) -> List[PendingRow]:
+        """Rows that never settled, typically left over from before a restart."""
+        return await self._run_in_thread(self._load_pending)
+
+    def add(self, key: str, event: AlertTriggerEvent, channel: str, destination: str) -> bool:
+        """Record a new pending notification; False if the key was already recorded."""
+        if key in self._keys:
+            self.duplicates += 1
+            return False
+        now = time.time()
+        self._keys[key] = now
+        self._inserts.append((key, event, channel, destination, now))
+        self.enqueued += 1
+        self._queued()
+        return True
+
+    def mark(self, keys: List[str], status: str, attempts: int, error: Optional[str] = None,
+             next_attempt_at: Optional[float] = None) -> None:
+        """Record an outcome (or, for PENDING, the next retry) for the given rows."""
+        now = time.time()
+        self._updates.extend((status, attempts, next_attempt_at, error, now, key) for key in keys)
+        if status == DEAD:
+            self.dead_letters += len(keys)
+        self._queued()
+
+    def _queued(self) -> None:
+        if self._task is None:
+            self._has_data = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._has_data.set()
+        if self._committed is None:
+            self._committed = asyncio.get_running_loop().create_future()
+
+    async def wait_durable(self) -> None:
+        """Wait until everything added so far is committed."""
+        # Flushes run one at a time, so the buffered batch commits after the one being written
+        pending = self._committed or self._writing
+        if pending is not None:
+            await asyncio.shield(pending)
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_data.wait()
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so close() cancelling the loop never drops a batch mid-write
+            await asyncio.shield(self.flush())
+            if time.monotonic() - self._last_prune >= NOTIFY_OUTBOX_PRUNE_INTERVAL:
+                await asyncio.shield(self.prune())
+
+    def _write(self, inserts: List[tuple], updates: List[tuple]) -> None:
+        rows = [
+            (key, event.alert_id, channel, destination, event.model_dump_json(exclude={'notification_data'}),
+             PENDING, created_at, created_at)
+            for key, event, channel, destination, created_at in inserts
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox (key, alert_id, channel, destination, event, status, created_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                "WHERE key = ?", updates)
+
+    async def flush(self) -> None:
+        """Commit everything buffered so far in one transaction."""
+        async with self._flush_lock:
+            inserts, self._inserts = self._inserts, []
+            updates, self._updates = self._updates, []
+            committed, self._committed = self._committed, None
+            if self._has_data is not None:
+                self._has_data.clear()
+            if not inserts and not updates:
+                if committed is not None and not committed.done():
+                    committed.set_result(None)
+                return
+            self._writing = committed
+            started = time.perf_counter()
+            try:
+                await self._run_in_thread(self._write, inserts, updates)
+                self.flushes += 1
+                self.rows_written += len(inserts) + len(updates)
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+            except Exception as e:
+                # Kept for the next flush; senders are released anyway so a broken disk never stops delivery
+                self.failed_flushes += 1
+                logger.error(f"❌ Notification outbox flush failed ({len(inserts) + len(updates)} rows): {e}")
+                self._inserts[:0] = inserts
+                self._updates[:0] = updates
+                if self._has_data is not None:
+                    self._has_data.set()
+            finally:
+                self._writing = None
+                if committed is not None and not committed.done():
+                    committed.set_result(None)
+
+    def _prune(self, cutoff: float) -> int:
+        with self._conn:
+            return self._conn.execute(
+                "DELETE FROM outbox WHERE status IN (?, ?) AND updated_at < ?", (SENT, DROPPED, cutoff)).rowcount
+
+    async def prune(self) -> None:
+        """Forget settled rows and keys older than the retention window."""
+        self._last_prune = time.monotonic()
+        cutoff = time.time() - self.retention
+        for key, created_at in list(self._keys.items()):
+            if created_at >= cutoff:
+                break
+            del self._keys[key]
+        try:
+            removed = await self._run_in_thread(self._prune, cutoff)
+        except Exception as e:
+            logger.error(f"❌ Notification outbox prune failed: {e}")
+            return
+        if removed:
+            logger.info(f"🧹 Pruned {removed} settled notifications from the outbox")
+
+    async def close(self) -> None:
+        """Stop the flush loop, commit whatever is buffered and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            await self.flush()
+            await self._run_in_thread(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "buffered": self.buffered,
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2) if self.last_flush_ms is not None else None,
+            "dead_letters": self.dead_letters,
+            "keys_tracked": len(self._keys),
+        }
@@ -0,0 +1,149 @@
+"""
+Long-lived HTTP clients for notification providers.
+There is one Twilio REST client per account, sitting on a pooled keep-alive
+session with (connect, read) timeouts. Failed connects are retried, but a
+request is never retried once sent, so no call is placed twice.
+NotificationService and the legacy helpers share these clients, and webhooks
+go through one httpx connection pool.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+from urllib3.util.retry import Retry
+
+from .metrics import PROVIDER_REQUEST
+
+TWILIO_CONNECT_TIMEOUT = float(os.getenv("TWILIO_CONNECT_TIMEOUT_SECONDS", "3.05"))
+TWILIO_READ_TIMEOUT = float(os.getenv("TWILIO_READ_TIMEOUT_SECONDS", "10"))
+# Keep-alive connections per account; at least NOTIFY_BLOCKING_WORKERS so no sender thread opens a spare
+TWILIO_POOL_SIZE = int(os.getenv("TWILIO_POOL_SIZE", os.getenv("NOTIFY_BLOCKING_WORKERS", "8")))
+# Sends the Twilio SDK's requests somewhere other than api.twilio.com (a proxy or a local stand-in)
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+# Retries of a connection that could not be opened; the request had not been sent yet
+PROVIDER_CONNECT_RETRIES = int(os.getenv("PROVIDER_CONNECT_RETRIES", "2"))
+
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_CONNECT_TIMEOUT = float(os.getenv("WEBHOOK_CONNECT_TIMEOUT_SECONDS", "3"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "64"))
+WEBHOOK_KEEPALIVE_SECONDS = float(os.getenv("WEBHOOK_KEEPALIVE_SECONDS", "30"))
+
+
+class PooledTwilioHttpClient(TwilioHttpClient):
+    """TwilioHttpClient with a sized keep-alive pool, connect retries and per-request timing.
+
+    ``request`` runs on the notification executor's threads, so the counters
+    are updated under a lock.
+    """
+
+    def __init__(self, pool_size: int = TWILIO_POOL_SIZE, connect_timeout: float = TWILIO_CONNECT_TIMEOUT,
+                 read_timeout: float = TWILIO_READ_TIMEOUT, connect_retries: int = PROVIDER_CONNECT_RETRIES,
+                 base_url: Optional[str] = TWILIO_API_BASE_URL):
+        super().__init__(pool_connections=True)
+        # requests takes a (connect, read) pair; the base class only validates a single number
+        self.timeout = (connect_timeout, read_timeout)
+        self.base_url = base_url.rstrip("/") if base_url else None
+        retry = Retry(total=connect_retries, connect=connect_retries, read=0, status=0, other=0, redirect=0,
+                      allowed_methods=None, backoff_factor=0.1, raise_on_status=False)
+        self._adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self._latency = PROVIDER_REQUEST.labels("twilio")
+        self.requests = 0
+        self.failures = 0
+        self.request_seconds = 0.0
+
+    def request(self, method: str, url: str, *args, **kwargs):
+        if self.base_url:
+            parts = urlsplit(url)
+            url = self.base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            failed = False
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.requests += 1
+                self.failures += failed
+                self.request_seconds += elapsed
+                self._latency.observe(elapsed)
+
+    def connection_counts(self) -> Tuple[int, int]:
+        """``(connections opened, requests sent)`` across the session's pools, retries included."""
+        opened = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            opened += pool.num_connections
+            sent += pool.num_requests
+        return opened, sent
+
+    def close(self) -> None:
+        self.session.close()
+
+    def get_stats(self) -> Dict:
+        opened, sent = self.connection_counts()
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_request_ms": round(self.request_seconds / self.requests * 1000, 2) if self.requests else None,
+            "connections_opened": opened,
+            # Share of requests that went out on an already open connection
+            "connection_reuse": round(1 - opened / sent, 3) if sent else None,
+        }
+
+
+_twilio_clients: Dict[Tuple[str, str, Optional[str]], Client] = {}
+_twilio_lock = threading.Lock()
+
+
+def twilio_client(account_sid: str, auth_token: str, base_url: Optional[str] = TWILIO_API_BASE_URL) -> Client:
+    """The shared Twilio client for an account, created on first use."""
+    key = (account_sid, auth_token, base_url)
+    with _twilio_lock:
+        client = _twilio_clients.get(key)
+        if client is None:
+            client = _twilio_clients[key] = Client(
+                account_sid, auth_token, http_client=PooledTwilioHttpClient(base_url=base_url))
+        return client
+
+
+def close_twilio_clients() -> None:
+    """Close every shared session; a client used afterwards opens new connections."""
+    with _twilio_lock:
+        clients = list(_twilio_clients.values())
+    for client in clients:
+        client.http_client.close()
+
+
+def webhook_http_client() -> httpx.AsyncClient:
+    """Keep-alive client for webhook deliveries; connect failures are retried by the transport."""
+    limits = httpx.Limits(max_connections=WEBHOOK_MAX_CONNECTIONS, max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS,
+                          keepalive_expiry=WEBHOOK_KEEPALIVE_SECONDS)
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(WEBHOOK_TIMEOUT_SECONDS, connect=WEBHOOK_CONNECT_TIMEOUT),
+        transport=httpx.AsyncHTTPTransport(limits=limits, retries=PROVIDER_CONNECT_RETRIES),
+    )
+
+
+def provider_stats() -> Dict:
+    """Per-account request and connection counters, keyed by a shortened account SID."""
+    with _twilio_lock:
+        clients = list(_twilio_clients.items())
+    return {
+        "twilio": {f"{account_sid[:8]}…": client.http_client.get_stats()
+                   for (account_sid, _, _), client in clients},
+    }
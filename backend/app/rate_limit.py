@@ -0,0 +1,65 @@
+"""
+Token buckets for pacing outbound notifications.
+A bucket can be reserved into debt, so a caller learns exactly how long to
+wait for its turn instead of polling; refusing a reservation costs nothing.
+"""
+import time
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """``capacity`` tokens refilled at ``rate`` tokens per second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a reservation made now would be served."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Take a token, going into debt if necessary; returns the seconds to wait for it."""
+        wait = self.wait_time(now)
+        self.tokens -= 1
+        return wait
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class BucketMap:
+    """Buckets created on demand per key, with idle (full) buckets pruned as the map grows."""
+
+    def __init__(self, rate: float, capacity: float, prune_above: int = 10_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.prune_above = prune_above
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.prune_above:
+                self.prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, now)
+        return bucket
+
+    def prune(self, now: float) -> None:
+        """Drop buckets that have refilled completely; a new one starts in the same state."""
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[key]
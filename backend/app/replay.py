@@ -0,0 +1,201 @@
+"""
+Record-and-replay of raw Binance market frames.
+The recorder appends frames with receive timestamps to compressed append-only
+segment files; the replayer feeds them back through the frame decoder and
+AlertManager.check_alert_conditions at 1x, Nx or maximum speed on a simulated clock.
+"""
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .decoders import DECODE_ERRORS, FrameDecoder, get_decoder
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg.gz"
+# Segment record: "<epoch seconds>\t<raw frame>\n"; JSON frames never contain raw tabs or newlines
+RECORD_SEPARATOR = "\t"
+
+_CLOSE = object()
+
+
+class FrameRecorder:
+    """Appends raw frames to rotating gzip segments from a background writer thread.
+
+    ``record`` only enqueues, so the WebSocket reader never waits on compression
+    or disk. Each flush appends a new gzip member, which keeps segments readable
+    up to the last flush even if the process dies.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 64 * 1024 * 1024, flush_every: int = 1000):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_every = flush_every
+        self.frames_recorded = 0
+        self.segments_written = 0
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, name="frame-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, frame: Union[str, bytes], received_at: Optional[float] = None) -> None:
+        """Queue one frame; ``received_at`` is wall-clock epoch seconds (defaults to now)."""
+        if isinstance(frame, bytes):
+            frame = frame.decode()
+        self._queue.put((received_at if received_at is not None else time.time(), frame))
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer."""
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    def _new_segment_path(self) -> str:
+        self.segments_written += 1
+        return os.path.join(self.directory, f"frames-{time.time():.6f}{SEGMENT_SUFFIX}")
+
+    def _writer(self) -> None:
+        path = self._new_segment_path()
+        lines: List[str] = []
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            while True:
+                if item is _CLOSE:
+                    closing = True
+                    break
+                received_at, frame = item
+                lines.append(f"{received_at:.6f}{RECORD_SEPARATOR}{frame}\n")
+                if len(lines) >= self.flush_every:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if lines:
+                try:
+                    with gzip.open(path, "at", encoding="utf-8", compresslevel=1) as f:
+                        f.writelines(lines)
+                    self.frames_recorded += len(lines)
+                except OSError as e:
+                    logger.error(f"❌ Failed to write frame segment {path}: {e}")
+                lines = []
+                if os.path.exists(path) and os.path.getsize(path) >= self.max_segment_bytes:
+                    path = self._new_segment_path()
+
+
+def segment_paths(paths: Iterable[str]) -> List[str]:
+    """Expand files and directories into segment paths in recording order."""
+    found: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, f"*{SEGMENT_SUFFIX}"))))
+        else:
+            found.append(path)
+    return found
+
+
+def read_segments(paths: Iterable[str]) -> Iterator[Tuple[float, str]]:
+    """Yield (receive timestamp, raw frame) from segment files in order."""
+    for path in segment_paths(paths):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                received_at, _, frame = line.rstrip("\n").partition(RECORD_SEPARATOR)
+                if frame:
+                    yield float(received_at), frame
+
+
+class SimulatedClock:
+    """Replay clock: recorded time mapped onto wall time at a fixed speed (None = as fast as possible)."""
+
+    def __init__(self, speed: Optional[float] = 1.0):
+        self.speed = speed
+        self.now: Optional[float] = None  # recorded time of the frame being replayed
+        self._origin: Optional[float] = None
+        self._wall_origin = 0.0
+
+    def delay_until(self, recorded_at: float) -> float:
+        """Advance to ``recorded_at``; return how long to sleep before it is due."""
+        if self._origin is None:
+            self._origin = recorded_at
+            self._wall_origin = time.monotonic()
+        self.now = recorded_at
+        if not self.speed:
+            return 0.0
+        due = self._wall_origin + (recorded_at - self._origin) / self.speed
+        return max(0.0, due - time.monotonic())
+
+
+class Replayer:
+    """Drives recorded frames through the decoder and an AlertManager."""
+
+    def __init__(self, alert_manager, speed: Optional[float] = None, decoder: Optional[FrameDecoder] = None):
+        self.alert_manager = alert_manager
+        self.clock = SimulatedClock(speed)
+        self.decoder = decoder or get_decoder()
+        self.latest_prices: Dict[str, float] = {}
+        self.frames = 0
+        self.ticks = 0
+        self.dropped = 0
+        self.triggers = 0
+        self.max_behind_ms = 0.0
+        self._trigger_latencies: List[float] = []
+        self._elapsed = 0.0
+
+    async def run(self, frames: Iterable[Tuple[float, str]]) -> Dict:
+        started = time.perf_counter()
+        for recorded_at, raw in frames:
+            self.frames += 1
+            delay = self.clock.delay_until(recorded_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif self.clock.speed:
+                self.max_behind_ms = max(self.max_behind_ms, -delay * 1000)
+
+            dispatched = time.perf_counter()
+            try:
+                tick = self.decoder.decode(raw)
+            except DECODE_ERRORS:
+                tick = None
+            if tick is None:
+                self.dropped += 1
+                continue
+
+            symbol = self.decoder.symbols.symbol(tick.symbol_id)
+            self.latest_prices[symbol] = tick.price
+            events = await self.alert_manager.check_alert_conditions(symbol, tick.price)
+            self.ticks += 1
+            if events:
+                latency_ms = (time.perf_counter() - dispatched) * 1000
+                self.triggers += len(events)
+                self._trigger_latencies.extend([latency_ms] * len(events))
+
+        self._elapsed = time.perf_counter() - started
+        return self.get_stats()
+
+    def get_stats(self) -> Dict:
+        latencies = sorted(self._trigger_latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))], 3)
+
+        return {
+            "decoder": self.decoder.name,
+            "speed": self.clock.speed or "max",
+            "frames": self.frames,
+            "ticks": self.ticks,
+            "dropped": self.dropped,
+            "triggers": self.triggers,
+            "elapsed_seconds": round(self._elapsed, 3),
+            "ticks_per_second": round(self.ticks / self._elapsed) if self._elapsed else None,
+            "trigger_latency_ms": {"p50": percentile(50), "p99": percentile(99), "max": percentile(100)},
+            "max_behind_schedule_ms": round(self.max_behind_ms, 3),
+        }
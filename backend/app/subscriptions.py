@@ -0,0 +1,385 @@
+"""
+Dynamic Binance stream subscriptions driven by the active alerts.
+Streams are added and removed at runtime with SUBSCRIBE/UNSUBSCRIBE control
+messages and sharded across connections to stay under the per-connection limit.
+Each connection is supervised: stale feeds are dropped, reconnects back off
+exponentially with jitter, and the outage window is handed to a recovery hook.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import websockets
+
+from .metrics import BINANCE_RECONNECTS
+
+logger = logging.getLogger(__name__)
+
+BINANCE_STREAM_BASE_URL = os.getenv("BINANCE_STREAM_BASE_URL", "wss://stream.binance.com:9443/stream")
+# Binance allows 1024 streams per connection; stay well under it by default
+MAX_STREAMS_PER_CONNECTION = int(os.getenv("BINANCE_MAX_STREAMS_PER_CONNECTION", "200"))
+# Binance allows 5 incoming messages per second per connection
+CONTROL_MESSAGE_INTERVAL = 0.25
+CONTROL_BATCH_SIZE = 100
+STREAM_SUFFIX = "@ticker"
+# Ticker streams push every second; silence this long means the feed is stale
+STALE_AFTER_SECONDS = float(os.getenv("BINANCE_STALE_AFTER_SECONDS", "15"))
+
+# Called with (raw frame, monotonic receive time) for every market data frame
+FrameHandler = Callable[[Union[str, bytes], float], None]
+# Called after a reconnect with (pairs on the connection, outage length in seconds)
+GapHandler = Callable[[List[str], float], Awaitable[None]]
+
+
+def stream_for_pair(pair: str) -> str:
+    return f"{pair.lower()}{STREAM_SUFFIX}"
+
+
+def pair_for_stream(stream: str) -> str:
+    return stream.split("@", 1)[0].upper()
+
+
+class StaleFeedError(Exception):
+    """No frames arrived within the stale timeout."""
+
+
+class Backoff:
+    """Exponential reconnect delay with full jitter."""
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30.0, factor: float = 2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        ceiling = min(self.maximum, self.initial * (self.factor ** self.attempts))
+        self.attempts += 1
+        return random.uniform(self.initial / 2, ceiling)
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+class StreamShard:
+    """One combined-stream connection carrying a bounded set of streams."""
+
+    def __init__(self, shard_id: int, url: str, on_frame: FrameHandler, request_ids: Iterable[int],
+                 on_gap: Optional[GapHandler] = None, stale_after: float = STALE_AFTER_SECONDS):
+        self.shard_id = shard_id
+        self.url = url
+        self.on_frame = on_frame
+        self.on_gap = on_gap
+        self.stale_after = stale_after
+        self._request_ids = request_ids
+        self.streams: Set[str] = set()
+        self._ws = None
+        self._send_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Gap recoveries still running; held here so they are not collected mid-run and close() can cancel them
+        self._recovery: Set[asyncio.Task] = set()
+        self.backoff = Backoff()
+        # Wall-clock start of the current outage, None while connected
+        self._gap_started: Optional[float] = None
+        self._last_frame_at: Optional[float] = None
+        self.frames_received = 0
+        self.connects = 0
+        self.control_errors = 0
+        self.disconnects = 0
+        self.stale_disconnects = 0
+        self.last_gap_seconds = 0.0
+        self.last_recovery_ms = 0.0
+        # Outage start until the gap's range has been evaluated: the bound on time-to-detect
+        self.last_time_to_recover_seconds = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        ws = self._ws
+        if ws is not None:
+            # Closed while the read loop still drains the socket: with the reader cancelled first,
+            # websockets' receive queue stays full and the closing handshake waits on it forever
+            await ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        recovering = list(self._recovery)
+        for task in recovering:
+            task.cancel()
+        await asyncio.gather(*recovering, return_exceptions=True)
+
+    async def run(self) -> None:
+        """Connect, subscribe the current streams, and read frames until stopped."""
+        while True:
+            try:
+                await self._session()
+                logger.warning(f"⚠️ Binance shard {self.shard_id} connection closed")
+            except asyncio.CancelledError:
+                raise
+            except StaleFeedError:
+                self.stale_disconnects += 1
+                logger.warning(f"⚠️ Binance shard {self.shard_id} stale for {self.stale_after:.0f}s, reconnecting")
+            except Exception as e:
+                if not self._stopping:
+                    logger.error(f"❌ Binance shard {self.shard_id} error: {e}")
+            if self._stopping:
+                return
+
+            self.disconnects += 1
+            BINANCE_RECONNECTS.inc()
+            if self._gap_started is None:
+                # The outage began with the last frame seen, not when it was detected
+                silent_for = time.monotonic() - self._last_frame_at if self._last_frame_at else 0.0
+                self._gap_started = time.time() - silent_for
+            delay = self.backoff.next_delay()
+            logger.info(f"🔁 Binance shard {self.shard_id} reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _session(self) -> None:
+        try:
+            async with websockets.connect(self.url) as ws:
+                self._ws = ws
+                self.connects += 1
+                logger.info(f"✅ Binance shard {self.shard_id} connected ({len(self.streams)} streams)")
+                await self._send_control("SUBSCRIBE", sorted(self.streams))
+                if self._gap_started is not None:
+                    gap_seconds = time.time() - self._gap_started
+                    self._gap_started = None
+                    task = asyncio.create_task(
+                        self._recover_gap([pair_for_stream(s) for s in self.streams], gap_seconds))
+                    self._recovery.add(task)
+                    task.add_done_callback(self._recovery_done)
+
+                healthy = False
+                while True:
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=self.stale_after)
+                    except asyncio.TimeoutError:
+                        raise StaleFeedError() from None
+                    received_at = time.monotonic()
+                    if self._is_control_reply(msg):
+                        continue
+                    if not healthy:
+                        # Data is flowing again; the next outage starts its backoff from scratch
+                        healthy = True
+                        self.backoff.reset()
+                    self.frames_received += 1
+                    self._last_frame_at = received_at
+                    self.on_frame(msg, received_at)
+        finally:
+            self._ws = None
+
+    def _recovery_done(self, task: asyncio.Task) -> None:
+        self._recovery.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Binance shard {self.shard_id} gap recovery crashed: {task.exception()}")
+
+    async def _recover_gap(self, pairs: List[str], gap_seconds: float) -> None:
+        """Hand the outage window to the recovery hook and time it."""
+        self.last_gap_seconds = gap_seconds
+        if self.on_gap is None or not pairs:
+            return
+        started = time.monotonic()
+        try:
+            await self.on_gap(pairs, gap_seconds)
+        except Exception as e:
+            logger.error(f"❌ Binance shard {self.shard_id} gap recovery failed: {e}")
+        self.last_recovery_ms = (time.monotonic() - started) * 1000
+        self.last_time_to_recover_seconds = gap_seconds + self.last_recovery_ms / 1000
+        logger.info(
+            f"🩹 Binance shard {self.shard_id} recovered {gap_seconds:.1f}s gap for {len(pairs)} pairs "
+            f"in {self.last_recovery_ms:.0f} ms"
+        )
+
+    def _is_control_reply(self, msg: Union[str, bytes]) -> bool:
+        # Market data frames are {"stream": ..., "data": ...}; replies are {"result"|"error": ..., "id": n}
+        if isinstance(msg, bytes):
+            msg = msg.decode()
+        if msg.startswith('{"stream"'):
+            return False
+        try:
+            reply = json.loads(msg)
+        except ValueError:
+            return False
+        if "stream" in reply:
+            return False
+        if reply.get("error"):
+            self.control_errors += 1
+            logger.warning(f"⚠️ Binance shard {self.shard_id} control error: {reply['error']}")
+        return True
+
+    async def subscribe(self, streams: List[str]) -> None:
+        self.streams.update(streams)
+        await self._send_control("SUBSCRIBE", streams)
+
+    async def unsubscribe(self, streams: List[str]) -> None:
+        self.streams.difference_update(streams)
+        await self._send_control("UNSUBSCRIBE", streams)
+
+    async def _send_control(self, method: str, streams: List[str]) -> None:
+        """Send paced control messages; streams are (re)subscribed on the next connect if offline."""
+        if not streams or self._ws is None:
+            return
+        async with self._send_lock:
+            for i in range(0, len(streams), CONTROL_BATCH_SIZE):
+                ws = self._ws
+                if ws is None:
+                    return
+                message = {"method": method, "params": streams[i:i + CONTROL_BATCH_SIZE], "id": next(self._request_ids)}
+                await ws.send(json.dumps(message))
+                await asyncio.sleep(CONTROL_MESSAGE_INTERVAL)
+
+
+class SubscriptionManager:
+    """Keeps the streamed pair set equal to what the active alerts (plus a base set) need."""
+
+    def __init__(
+        self,
+        on_frame: FrameHandler,
+        base_pairs: Iterable[str] = (),
+        on_gap: Optional[GapHandler] = None,
+        url: str = BINANCE_STREAM_BASE_URL,
+        max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+        reconcile_interval: float = 5.0,
+    ):
+        self.on_frame = on_frame
+        self.on_gap = on_gap
+        self.base_pairs = {pair.upper() for pair in base_pairs}
+        self.url = url
+        self.max_streams_per_connection = max_streams_per_connection
+        self.reconcile_interval = reconcile_interval
+        self.shards: List[StreamShard] = []
+        self._stream_to_shard: Dict[str, StreamShard] = {}
+        self._request_ids = itertools.count(1)
+        self._shard_ids = itertools.count(1)
+        self._changed = asyncio.Event()
+        self._reconcile_lock = asyncio.Lock()
+        self.subscribes = 0
+        self.unsubscribes = 0
+
+    @property
+    def streams(self) -> Set[str]:
+        return set(self._stream_to_shard)
+
+    def notify_changed(self) -> None:
+        """Ask the run loop to reconcile now instead of at the next interval."""
+        self._changed.set()
+
+    async def run(self, pairs_source: Callable[[], Union[Set[str], Awaitable[Set[str]]]]) -> None:
+        """Reconcile against ``pairs_source()`` on change notifications or every interval."""
+        try:
+            while True:
+                pairs = pairs_source()
+                if asyncio.iscoroutine(pairs):
+                    pairs = await pairs
+                try:
+                    await self.reconcile(pairs)
+                except Exception as e:
+                    logger.error(f"❌ Subscription reconcile failed: {e}")
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=self.reconcile_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._changed.clear()
+        finally:
+            await self.close()
+
+    async def reconcile(self, alert_pairs: Iterable[str]) -> None:
+        """Subscribe missing streams and unsubscribe ones no alert needs any more."""
+        async with self._reconcile_lock:
+            wanted = {stream_for_pair(pair) for pair in self.base_pairs.union(p.upper() for p in alert_pairs)}
+            current = set(self._stream_to_shard)
+
+            removed = current - wanted
+            by_shard: Dict[StreamShard, List[str]] = {}
+            for stream in removed:
+                by_shard.setdefault(self._stream_to_shard.pop(stream), []).append(stream)
+            # Control messages are paced per connection, so shards unsubscribe in parallel
+            await asyncio.gather(*(shard.unsubscribe(streams) for shard, streams in by_shard.items()))
+            self.unsubscribes += len(removed)
+
+            added = sorted(wanted - current)
+            if added:
+                await self._place(added)
+                self.subscribes += len(added)
+
+            for shard in [s for s in self.shards if not s.streams]:
+                await shard.stop()
+                self.shards.remove(shard)
+
+            if added or removed:
+                logger.info(
+                    f"📡 Subscriptions: +{len(added)} -{len(removed)} -> "
+                    f"{len(self._stream_to_shard)} streams on {len(self.shards)} connections"
+                )
+
+    async def _place(self, streams: List[str]) -> None:
+        """Fill existing shards first, then open new connections for the rest."""
+        pending = list(streams)
+        for shard in self.shards:
+            room = self.max_streams_per_connection - len(shard.streams)
+            if room <= 0 or not pending:
+                continue
+            batch, pending = pending[:room], pending[room:]
+            for stream in batch:
+                self._stream_to_shard[stream] = shard
+            await shard.subscribe(batch)
+
+        while pending:
+            batch, pending = pending[:self.max_streams_per_connection], pending[self.max_streams_per_connection:]
+            shard = StreamShard(next(self._shard_ids), self.url, self.on_frame, self._request_ids, self.on_gap)
+            # Subscribed on connect
+            shard.streams.update(batch)
+            for stream in batch:
+                self._stream_to_shard[stream] = shard
+            self.shards.append(shard)
+            shard.start()
+
+    async def close(self) -> None:
+        for shard in self.shards:
+            await shard.stop()
+        self.shards.clear()
+        self._stream_to_shard.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            "streams": len(self._stream_to_shard),
+            "connections": len(self.shards),
+            "max_streams_per_connection": self.max_streams_per_connection,
+            "subscribes": self.subscribes,
+            "unsubscribes": self.unsubscribes,
+            "shards": [
+                {
+                    "id": shard.shard_id,
+                    "streams": len(shard.streams),
+                    "connected": shard.connected,
+                    "connects": shard.connects,
+                    "frames_received": shard.frames_received,
+                    "control_errors": shard.control_errors,
+                    "disconnects": shard.disconnects,
+                    "stale_disconnects": shard.stale_disconnects,
+                    "last_gap_seconds": round(shard.last_gap_seconds, 3),
+                    "last_recovery_ms": round(shard.last_recovery_ms, 3),
+                    "last_time_to_recover_seconds": round(shard.last_time_to_recover_seconds, 3),
+                    "recovering": len(shard._recovery),
+                }
+                for shard in self.shards
+            ],
+        }
@@ -0,0 +1,242 @@
+"""
+Alert change feed against a local Postgres LISTEN/NOTIFY stand-in.
+
+The stand-in keeps alert rows in memory and, like the triggers in
+docs/alert-change-feed-migration.sql, notifies every listener with the id of
+each inserted, updated or deleted alert. Running this file streams inserts,
+edits and deletes through an AlertChangeFeed, drops the LISTEN connection
+once, and prints the change-to-armed latency and the database calls made:
+
+    cd backend && python -m app.tests.alert_change_feed_standin
+"""
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.generators import generate_alert_rows, symbol_prices
+from benchmarks.standins import InMemorySupabase, NullNotificationService
+
+
+class StandInListener:
+    """Same surface as PostgresNotifyListener, fed by the stand-in instead of a socket."""
+
+    def __init__(self, standin: "PostgresStandIn"):
+        self.standin = standin
+        self._queue = None
+
+    async def connect(self) -> None:
+        self._queue = asyncio.Queue()
+        self.standin.listeners.add(self)
+
+    def deliver(self, payload: str) -> None:
+        self._queue.put_nowait(payload)
+
+    def drop(self) -> None:
+        self._queue.put_nowait(ConnectionError("server closed the connection"))
+
+    async def next_payload(self) -> str:
+        item = await self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def close(self) -> None:
+        self.standin.listeners.discard(self)
+
+
+class PostgresStandIn(InMemorySupabase):
+    """Alert rows in memory plus NOTIFY on every write, as the migration's triggers do."""
+
+    def __init__(self, rows=None):
+        super().__init__(rows)
+        self.listeners = set()
+
+    def listener(self) -> StandInListener:
+        return StandInListener(self)
+
+    def _notify(self, table: str, op: str, alert_id: str) -> None:
+        payload = json.dumps({"table": table, "op": op, "alert_id": alert_id, "ts": time.time()})
+        for listener in list(self.listeners):
+            listener.deliver(payload)
+
+    @staticmethod
+    def _stamp(row) -> None:
+        # handle_updated_at, which child-table changes also bump (docs/delta-sync-migration.sql)
+        row["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+    def insert(self, row) -> None:
+        self._stamp(row)
+        self.rows.append(row)
+        self._notify("alerts", "INSERT", row["id"])
+
+    def update_condition(self, alert_id: str, target_value: float) -> None:
+        row = next(row for row in self.rows if row["id"] == alert_id)
+        row["alert_conditions"][0]["target_value"] = target_value
+        self._stamp(row)
+        self._notify("alert_conditions", "UPDATE", alert_id)
+
+    def delete(self, alert_id: str) -> None:
+        self.rows = [row for row in self.rows if row["id"] != alert_id]
+        self._notify("alerts", "DELETE", alert_id)
+
+    async def record_alert_triggers(self, triggers) -> bool:
+        """The record_alert_triggers RPC: raise the count to the sequence, stamp the row and notify."""
+        self.calls["record_alert_triggers"] += 1
+        rows = {row["id"]: row for row in self.rows}
+        for trigger in triggers:
+            row = rows.get(trigger["alert_id"])
+            if row is None:
+                continue
+            row["trigger_count"] = max(row.get("trigger_count", 0), trigger["trigger_count"])
+            row["triggered_at"] = trigger["triggered_at"]
+            self._stamp(row)
+            if not row.get("is_recurring"):
+                row["is_active"] = False
+            self._notify("alerts", "UPDATE", row["id"])
+        return True
+
+    def drop_listeners(self) -> None:
+        for listener in list(self.listeners):
+            listener.drop()
+
+
+async def wait_until(condition, timeout: float = 5.0) -> float:
+    """Seconds until ``condition()`` holds, checked on every loop iteration."""
+    started = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError("condition not reached")
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def warm_restart(db, manager, alert_id: str) -> None:
+    """A recurring alert saved mid-cooldown re-arms after a warm start, at once if the cooldown ran out while down."""
+    from app.alert_logic import AlertManager
+    from app.models import AlertStatus
+    from app.warm_start import WarmStartStore
+
+    pair = manager.get_alert(alert_id).pair
+    await asyncio.sleep(manager.recurring_cooldown)
+    assert [event.alert_id for event in await manager.check_alert_conditions(pair, 2.0)] == [alert_id]
+    with tempfile.TemporaryDirectory() as directory:
+        store = WarmStartStore(os.path.join(directory, "engine.snapshot"))
+        await store.checkpoint(manager, {})
+        for downtime in (0.0, manager.recurring_cooldown):
+            await asyncio.sleep(downtime)
+            restarted = AlertManager(db=db, notifier=NullNotificationService())
+            restarted.recurring_cooldown = manager.recurring_cooldown
+            assert await store.restore(restarted, {})
+            status = restarted.get_alert(alert_id).status
+            if downtime:
+                assert status == AlertStatus.ACTIVE, f"cooldown ran out while down but the alert is {status.value}"
+            else:
+                assert status == AlertStatus.TRIGGERED, status
+                await asyncio.sleep(manager.recurring_cooldown)
+            fired = [event.alert_id for event in await restarted.check_alert_conditions(pair, 2.0)]
+            assert fired == [alert_id], f"restored recurring alert did not re-arm after {downtime}s down"
+            await restarted.writes.close()
+    print("recurring alert, warm restart: re-armed after the cooldown, and at once when it ran out while down")
+
+
+async def main():
+    from app.alert_logic import AlertManager
+    from app.change_feed import AlertChangeFeed
+
+    prices = symbol_prices(20)
+    existing, incoming = generate_alert_rows(1000, prices)[:500], generate_alert_rows(1500, prices, seed=11)[1000:]
+    db = PostgresStandIn(existing)
+    manager = AlertManager(db=db, notifier=NullNotificationService())
+    feed = AlertChangeFeed(manager, db.listener())
+    task = asyncio.create_task(feed.run())
+    await wait_until(lambda: feed.live)
+    print(f"caught up: {len(manager.alerts)} alerts, calls={dict(db.calls)}")
+
+    # A failed full reload keeps the armed alerts and does not count as a sync
+    armed, synced_at = len(manager.alerts), manager.last_sync
+    db.failing = True
+    await manager.sync_database_alerts(full=True)
+    db.failing = False
+    assert len(manager.alerts) == armed, f"failed reload left {len(manager.alerts)} of {armed} alerts"
+    assert manager.last_sync == synced_at, "failed reload advanced last_sync"
+
+    inserted = []
+    for row in incoming:
+        db.insert(row)
+        inserted.append(await wait_until(lambda: row["id"] in manager.alerts))
+
+    row = incoming[0]
+    db.update_condition(row["id"], 123.0)
+    updated = await wait_until(lambda: manager.get_alert(row["id"]).target_value == 123.0)
+    db.delete(row["id"])
+    deleted = await wait_until(lambda: row["id"] not in manager.alerts)
+
+    # Connection loss: the feed reconnects and resyncs, catching the change made while down. While the
+    # database is unreachable it keeps retrying the catch-up instead of going live with stale alerts
+    db.failing = True
+    db.drop_listeners()
+    await wait_until(lambda: not feed.live)
+    missed, added = incoming[1], dict(incoming[4], id="added-while-down")
+    db.delete(missed["id"])
+    db.insert(added)
+    await wait_until(lambda: feed.catchup_failures >= 2, timeout=30)
+    assert not feed.live, "feed went live after a failed catch-up sync"
+    assert missed["id"] in manager.alerts
+    db.failing = False
+    await wait_until(lambda: feed.live, timeout=30)
+    assert missed["id"] not in manager.alerts and added["id"] in manager.alerts
+    # The reconnect caught up with a delta from the high-water mark, not a reload
+    assert db.calls["fetch_active_alerts"] == 2, dict(db.calls)
+
+    # A recurring alert's own trigger write comes back through the feed; it must not re-arm the alert
+    recurring = dict(incoming[2], id="recurring-alert", is_recurring=True, recurring_frequency="once",
+                     alert_conditions=[{"condition_type": "price_above", "target_value": 1.0}])
+    db.insert(recurring)
+    await wait_until(lambda: "recurring-alert" in manager.alerts)
+    manager.recurring_cooldown = 0.5
+    pair = manager.get_alert("recurring-alert").pair
+    fires, started = 0, time.monotonic()
+    while time.monotonic() - started < 1.25:
+        events = await manager.check_alert_conditions(pair, 2.0)
+        fires += sum(event.alert_id == "recurring-alert" for event in events)
+        await asyncio.sleep(0.05)
+    await manager.writes.flush()
+    assert fires == 3, f"recurring alert fired {fires} times in 1.25s with a 0.5s cooldown, expected 3"
+    # A batch that committed but timed out and is sent again must not count its triggers twice
+    row = next(row for row in db.rows if row["id"] == "recurring-alert")
+    assert row["trigger_count"] == fires, row["trigger_count"]
+    await db.record_alert_triggers([{"alert_id": "recurring-alert", "trigger_count": fires, "price": 2.0,
+                                     "triggered_at": row["triggered_at"]}])
+    assert row["trigger_count"] == fires, f"replayed batch raised trigger_count to {row['trigger_count']}"
+    print(f"recurring alert, 0.5s cooldown: {fires} fires in 1.25s of ticks, "
+          f"trigger_count={manager.get_alert('recurring-alert').trigger_count}")
+    await warm_restart(db, manager, "recurring-alert")
+
+    # A row armed by a single-alert lookup (no notification seen) still tells the stream subscriptions
+    changes = []
+    manager.on_alerts_changed = lambda: changes.append(True)
+    unseen = dict(incoming[3], id="unseen-alert")
+    db.rows.append(unseen)
+    assert await manager.lookup_alert("unseen-alert") is not None
+    assert changes, "lookup armed an alert without calling on_alerts_changed"
+
+    ms = sorted(t * 1000 for t in inserted)
+    print(f"insert-to-armed over {len(ms)} inserts: p50={statistics.median(ms):.2f}ms "
+          f"p99={ms[int(len(ms) * 0.99)]:.2f}ms max={ms[-1]:.2f}ms")
+    print(f"update-to-armed {updated * 1000:.2f}ms, delete-to-disarmed {deleted * 1000:.2f}ms")
+    print(f"feed stats: {feed.get_stats()}")
+    print(f"database calls: {dict(db.calls)} (one full reload at boot; reconnects catch up with a delta)")
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Local stand-in for the Binance combined-stream WebSocket API.
+
+Speaks SUBSCRIBE / UNSUBSCRIBE / LIST_SUBSCRIPTIONS and emits 24hr ticker frames
+for every subscribed stream, so the subscription manager can be exercised
+without network access. Running this file drives a SubscriptionManager through
+growing and shrinking pair sets against the stand-in, asserting that every
+subscribed pair delivers frames, that the streams sit on as few connections as
+the per-connection limit allows, and that dropped pairs go quiet:
+
+    cd backend && python -m app.tests.binance_ws_standin
+"""
+import asyncio
+import json
+import math
+import random
+import time
+
+import websockets
+
+MAX_STREAMS_PER_CONNECTION = 1024
+
+
+class BinanceStandIn:
+    """Minimal combined-stream server: one random-walk ticker per subscribed stream."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tick_interval: float = 0.2,
+                 max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION):
+        self.host = host
+        self.port = port
+        self.tick_interval = tick_interval
+        self.max_streams_per_connection = max_streams_per_connection
+        self.prices = {}
+        self.connections = set()
+        self.control_messages = 0
+        # While paused the connections stay open but no market data flows (a stalled feed)
+        self.paused = False
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/stream"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def drop_all(self):
+        """Close every client connection, as Binance does on maintenance."""
+        for ws in list(self.connections):
+            await ws.close()
+
+    def price(self, pair: str) -> float:
+        price = self.prices.get(pair) or random.uniform(1, 1000)
+        price *= 1 + random.uniform(-0.001, 0.001)
+        self.prices[pair] = price
+        return price
+
+    def ticker_frame(self, stream: str) -> str:
+        pair = stream.split("@")[0].upper()
+        price = self.price(pair)
+        data = {
+            "e": "24hrTicker", "E": int(time.time() * 1000), "s": pair,
+            "p": "0.0", "P": "0.0", "c": f"{price:.8f}", "v": f"{random.uniform(1e3, 1e6):.8f}",
+            "h": f"{price * 1.01:.8f}", "l": f"{price * 0.99:.8f}",
+        }
+        return json.dumps({"stream": stream, "data": data}, separators=(",", ":"))
+
+    async def _handler(self, ws, *_):
+        streams = set()
+        self.connections.add(ws)
+        pump = asyncio.create_task(self._pump(ws, streams))
+        try:
+            async for msg in ws:
+                self.control_messages += 1
+                request = json.loads(msg)
+                method, params, request_id = request.get("method"), request.get("params", []), request.get("id")
+                if method == "SUBSCRIBE":
+                    if len(streams.union(params)) > self.max_streams_per_connection:
+                        await ws.send(json.dumps({"error": {"code": 3, "msg": "Too many streams"}, "id": request_id}))
+                        continue
+                    streams.update(params)
+                    await ws.send(json.dumps({"result": None, "id": request_id}))
+                elif method == "UNSUBSCRIBE":
+                    streams.difference_update(params)
+                    await ws.send(json.dumps({"result": None, "id": request_id}))
+                elif method == "LIST_SUBSCRIPTIONS":
+                    await ws.send(json.dumps({"result": sorted(streams), "id": request_id}))
+                else:
+                    await ws.send(json.dumps({"error": {"code": 2, "msg": "Invalid request"}, "id": request_id}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            pump.cancel()
+            self.connections.discard(ws)
+
+    async def _pump(self, ws, streams):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            if self.paused:
+                continue
+            for stream in list(streams):
+                await ws.send(self.ticker_frame(stream))
+
+
+async def main():
+    from app.subscriptions import SubscriptionManager
+
+    standin = await BinanceStandIn(tick_interval=0.1).start()
+    frames = {}
+
+    def on_frame(msg, received_at):
+        pair = json.loads(msg)["data"]["s"]
+        frames[pair] = frames.get(pair, 0) + 1
+
+    base_pairs = {"BTCUSDT", "ETHUSDT"}
+    manager = SubscriptionManager(on_frame, base_pairs=base_pairs, url=standin.url, max_streams_per_connection=100)
+    for size in (20, 350, 50):
+        pairs = {f"P{i:04d}USDT" for i in range(size)}
+        started = time.monotonic()
+        await manager.reconcile(pairs)
+        reconcile_ms = 1000 * (time.monotonic() - started)
+        # Let frames already on the wire for dropped streams arrive before counting
+        await asyncio.sleep(standin.tick_interval)
+        frames.clear()
+        await asyncio.sleep(1.5)
+        wanted = pairs | base_pairs
+        streamed = {stream.split("@")[0].upper() for stream in manager.streams}
+        covered = len(streamed & set(frames))
+        stats = manager.get_stats()
+        assert streamed == wanted, f"streaming {len(streamed)} pairs, wanted {len(wanted)}"
+        assert covered == len(wanted), f"{len(wanted) - covered} subscribed pairs delivered no frames"
+        assert set(frames) <= wanted, f"dropped pairs still delivering: {sorted(set(frames) - wanted)[:5]}"
+        expected = math.ceil(stats["streams"] / manager.max_streams_per_connection)
+        assert stats["connections"] == expected, f"{stats['connections']} connections, expected {expected}"
+        print(f"{size:>4} alert pairs -> {stats['streams']} streams on {stats['connections']} connections, "
+              f"{covered} pairs delivering frames, reconcile {reconcile_ms:.0f} ms")
+
+    await manager.close()
+    print(f"control messages handled by stand-in: {standin.control_messages}")
+    await standin.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
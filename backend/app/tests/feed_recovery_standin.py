@@ -0,0 +1,161 @@
+"""
+Reconnect and missed-crossing recovery against local Binance stand-ins.
+
+Stalls the stand-in feed while the price spikes through an alert threshold and
+comes back, then checks that the supervised shard notices the stale feed,
+reconnects, takes a REST window snapshot and fires the alert. A second target
+that only the rolling window's pre-outage minute reached, and a percentage
+alert created mid-outage, must not fire. Asserts each of
+those and prints the outage-to-trigger time:
+
+    cd backend && python -m app.tests.feed_recovery_standin
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.tests.binance_ws_standin import BinanceStandIn
+
+
+class BinanceRestStandIn:
+    """Serves ``GET /api/v3/ticker`` rolling-window snapshots and ``GET /api/v3/klines`` from range tables.
+
+    ``ranges`` is what the rolling window saw, outage plus the minute before
+    it; ``gap_ranges`` is the outage alone, returned as a single kline.
+    """
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.ranges = {}  # pair -> (low, high, last)
+        self.gap_ranges = {}  # pair -> (low, high, last)
+        self.requests = 0
+        self.kline_requests = 0
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/api/v3/ticker":
+                    standin.requests += 1
+                    symbols = json.loads(query["symbols"][0])
+                    body = [
+                        {"symbol": s, "lowPrice": str(low), "highPrice": str(high), "lastPrice": str(last)}
+                        for s, (low, high, last) in ((s, standin.ranges[s]) for s in symbols if s in standin.ranges)
+                    ]
+                elif url.path == "/api/v3/klines":
+                    standin.kline_requests += 1
+                    low, high, last = standin.gap_ranges[query["symbol"][0]]
+                    start = int(query["startTime"][0])
+                    body = [[start, str(last), str(high), str(low), str(last), "0", start + 999]]
+                else:
+                    self.send_error(404)
+                    return
+                body = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, 0), Handler)
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+
+async def main():
+    from app.alert_logic import AlertManager
+    from app.binance_client import BinanceRestClient
+    from app.models import Alert, AlertDirection, AlertStatus, AlertType
+    from app.subscriptions import SubscriptionManager
+
+    ws_standin = await BinanceStandIn(tick_interval=0.1).start()
+    rest_standin = BinanceRestStandIn().start()
+    rest_client = BinanceRestClient(base_url=rest_standin.url)
+
+    manager = AlertManager()
+    ws_standin.prices["BTCUSDT"] = 100.0
+    alert = manager.create_alert(Alert(
+        symbol="BTC", alert_type=AlertType.PRICE_TARGET, direction=AlertDirection.ABOVE, target_value=105.0,
+    ))
+    # Reached only in the minute before the outage, which the rolling window also covers
+    before_outage = manager.create_alert(Alert(
+        symbol="BTC", alert_type=AlertType.PRICE_TARGET, direction=AlertDirection.ABOVE, target_value=120.0,
+    ))
+
+    triggered = asyncio.Event()
+    fired_at = {}
+    fired = []
+
+    async def on_gap(pairs, gap_seconds):
+        # What main.recover_feed_gap does
+        started_at = time.time() - gap_seconds
+        ranges = await rest_client.get_window_ranges(pairs, gap_seconds)
+        flagged = [pair for pair, (low, high, _) in ranges.items() if manager.range_fires_alert(pair, low, high)]
+        if flagged:
+            ranges.update(await rest_client.get_gap_ranges(flagged, started_at))
+        for pair, (low, high, last) in ranges.items():
+            events = await manager.check_price_range(pair, low, high, last)
+            fired.extend(event.alert_id for event in events)
+            if events:
+                fired_at[pair] = time.monotonic()
+                triggered.set()
+
+    def on_frame(msg, received_at):
+        data = json.loads(msg)["data"]
+        asyncio.ensure_future(manager.check_alert_conditions(data["s"], float(data["c"])))
+
+    subscriptions = SubscriptionManager(on_frame, on_gap=on_gap, url=ws_standin.url)
+    await subscriptions.reconcile(manager.get_monitored_pairs())
+    shard = subscriptions.shards[0]
+    shard.stale_after = 1.0
+    await asyncio.sleep(0.5)
+
+    # Feed stalls; meanwhile BTC spikes to 110 and falls back, which the stream never shows
+    stalled_at = time.monotonic()
+    ws_standin.paused = True
+    rest_standin.ranges["BTCUSDT"] = (90.0, 125.0, 100.0)
+    rest_standin.gap_ranges["BTCUSDT"] = (90.0, 110.0, 100.0)
+    # Created mid-outage, so it has no baseline; neither the gap's high nor its low may be measured against it
+    percentage = manager.create_alert(Alert(
+        symbol="BTC", alert_type=AlertType.PERCENTAGE_CHANGE, direction=AlertDirection.BELOW, target_value=5.0,
+    ))
+    while shard.stale_disconnects == 0:
+        await asyncio.sleep(0.05)
+    ws_standin.paused = False
+
+    await asyncio.wait_for(triggered.wait(), timeout=15)
+    # The stream only ever showed 100, so the trigger can only have come from the REST snapshot
+    assert manager.get_alert(alert.id).status == AlertStatus.TRIGGERED, manager.get_alert(alert.id).status
+    assert shard.stale_disconnects >= 1 and shard.connects >= 2, (shard.stale_disconnects, shard.connects)
+    assert rest_standin.requests >= 1, "no REST window snapshot was taken"
+    assert rest_standin.kline_requests >= 1, "the flagged pair was not re-read over the gap alone"
+    assert fired == [alert.id], f"gap recovery fired {fired}, expected only {alert.id}"
+    assert manager.get_alert(before_outage.id).status == AlertStatus.ACTIVE
+    assert manager.get_alert(percentage.id).status == AlertStatus.ACTIVE
+    print(f"alert {alert.id[:8]} status={manager.get_alert(alert.id).status.value}")
+    print(f"stale disconnects={shard.stale_disconnects} reconnects={shard.connects - 1} "
+          f"gap={shard.last_gap_seconds:.2f}s recovery={shard.last_recovery_ms:.1f}ms")
+    print(f"stall-to-trigger: {fired_at['BTCUSDT'] - stalled_at:.2f}s "
+          f"(stale timeout {shard.stale_after:.1f}s + backoff + REST snapshot)")
+
+    await subscriptions.close()
+    assert not shard._recovery, f"{len(shard._recovery)} gap recoveries outlived close()"
+    await rest_client.close()
+    rest_standin.stop()
+    await ws_standin.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,277 @@
+"""
+Notification dispatch against a blocking Twilio stand-in.
+
+The stand-in's ``calls.create`` sleeps like the real synchronous SDK does
+while it waits on HTTP. Running this file fires a wave of triggers (a voice and
+an email destination each) two ways: the old path, a task per event calling
+the SDK inline, and NotificationDispatcher. For each it prints the wall time,
+how long the event loop was stalled and the peak concurrent calls. It then
+fires several alerts at one phone within the coalescing window, and (with
+coalescing off) a burst to one phone number, an overload wave, a fresh alert
+queued behind retries, throttled webhooks behind a slow results log and a
+sustained burst at a failing provider to show per-destination pacing, priority
+shedding, priority ordering, that drops never make submit wait and that
+retries stay within max_pending. Each scenario asserts its outcome (calls placed, and
+sent, delayed, throttled and shed counts) and fails with an AssertionError:
+
+    cd backend && python -m app.tests.notification_dispatch_standin
+"""
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from app.alerts import NotificationService
+from app.dispatch import NotificationDispatcher
+from app.models import AlertDirection, AlertTriggerEvent, AlertType
+from app.tests.standin_support import RecordingService, make_service, voice_event
+
+WAVE = 200
+VOICE_LIMIT = 8
+
+
+class InlineTwilioService(NotificationService):
+    """The pre-dispatcher voice path: the SDK call runs on the event loop."""
+
+    async def _send_voice_call(self, phone_number: str, message: str):
+        call = self.twilio_client.calls.create(
+            to=self._clean_phone_number(phone_number), from_=self.twilio_phone, twiml=message)
+        return call.sid
+
+
+def wave(size: int = WAVE, same_phone: bool = False, symbols=("BTC",)):
+    return [
+        AlertTriggerEvent(
+            alert_id=f"alert-{i}", symbol=symbols[i % len(symbols)], trigger_price=70000.0,
+            target_value=69000.0 + 1000 * i,
+            alert_type=AlertType.PRICE_TARGET, direction=AlertDirection.ABOVE,
+            message="BTC crossed 69,000", triggered_at=datetime.now(),
+            notification_data=[
+                {"notification_type": "voice", "destination": "+15550000001" if same_phone else f"+1555{i:07d}",
+                 "is_enabled": True},
+                {"notification_type": "email", "destination": f"user{i}@example.com", "is_enabled": True},
+            ],
+        )
+        for i in range(size)
+    ]
+
+
+async def loop_lag(stop: asyncio.Event, samples: list) -> None:
+    """Record how late a 10ms sleep wakes up; a blocked loop shows up as large lag."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - started - 0.01)
+
+
+async def run(label: str, send_wave, cls=NotificationService) -> None:
+    service = make_service(cls)
+    stop, lag = asyncio.Event(), []
+    monitor = asyncio.create_task(loop_lag(stop, lag))
+    started = time.perf_counter()
+    await send_wave(service, wave())
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    calls = service.twilio_client.calls
+    assert calls.made == WAVE, f"{label}: {calls.made} of {WAVE} voice calls placed"
+    print(f"{label:<22} {elapsed:6.2f}s for {WAVE} voice calls | loop lag max {max(lag) * 1000:7.1f}ms "
+          f"p50 {statistics.median(lag) * 1000:5.1f}ms | peak concurrent calls {service.twilio_client.calls.peak}")
+    await service.close()
+
+
+async def task_per_event(service, events) -> None:
+    # What listen_to_binance used to do: one unbounded task per event, destinations in sequence
+    await asyncio.gather(*(asyncio.create_task(service.send_notifications(event)) for event in events))
+
+
+async def dispatched(service, events) -> None:
+    # Account pacing is lifted here so only the concurrency cap shapes the wave
+    dispatcher = NotificationDispatcher(service, concurrency={"voice": VOICE_LIMIT}, provider_rates={"twilio": 1000})
+    for event in events:
+        await dispatcher.submit(event)
+    await dispatcher.close(timeout=60)
+    stats = dispatcher.get_stats()["channels"]
+    sent = stats["voice"]["sent"], stats["email"]["sent"]
+    assert sent == (len(events), len(events)), f"sent (voice, email) = {sent} of {len(events)} each"
+    assert service.twilio_client.calls.peak <= VOICE_LIMIT, service.twilio_client.calls.peak
+    print(f"{'':<22} voice sent={stats['voice']['sent']} email sent={stats['email']['sent']} "
+          f"(voice limit {stats['voice']['limit']})")
+
+
+async def coalesced() -> None:
+    """Three alerts for one phone inside the window go out as a single call, the user's own message intact."""
+    service = make_service(RecordingService)
+    dispatcher = NotificationDispatcher(service, provider_rates={"twilio": 1000}, coalesce_window=0.25)
+    events = [
+        voice_event("alert-btc", "+15550000001", "BTC", 69000.0),
+        voice_event("alert-eth", "+15550000001", "ETH", 4000.0),
+        voice_event("alert-sol", "+15550000001", "SOL", 150.0, message="Time to take SOL profits",
+                    custom_message=True),
+    ]
+    for event in events:
+        await dispatcher.submit(event)
+        await asyncio.sleep(0.05)
+    await dispatcher.close(timeout=5)
+    stats = dispatcher.get_stats()
+    assert len(service.messages) == 1, service.messages
+    assert service.messages[0] == "CryptoAlarm Alert! BTC above 69,000 and ETH above 4,000. Time to take SOL profits."
+    assert stats["coalesce_ratio"] == 3.0 and stats["channels"]["voice"]["coalesced"] == 2, stats
+    print(f"coalesced, 3 alerts    calls placed={len(service.messages)} "
+          f"coalesce ratio={stats['coalesce_ratio']} message={service.messages[0]!r}")
+    await service.close()
+
+
+async def hot_destination() -> None:
+    """40 alerts firing at once for the same phone: a burst goes out, a few wait, the rest are throttled."""
+    service = make_service()
+    dispatcher = NotificationDispatcher(service, provider_rates={"twilio": 1000}, coalesce_window=0,
+                                        destination_limits={"voice": (2, 60)}, max_delay=2.0)
+    for event in wave(40, same_phone=True):
+        await dispatcher.submit(event)
+    await dispatcher.close(timeout=10)
+    voice = dispatcher.get_stats()["channels"]["voice"]
+    # Burst of 2, then one a second: two more fit inside max_delay and the other 36 are throttled
+    assert service.twilio_client.calls.made == 4, service.twilio_client.calls.made
+    held = voice["delayed"], voice["throttled"]
+    assert held == (2, 36), f"(delayed, throttled) = {held}"
+    print(f"one phone, 40 alerts   calls placed={service.twilio_client.calls.made} delayed={held[0]} "
+          f"throttled={held[1]}")
+    await service.close()
+
+
+async def overload() -> None:
+    """More jobs than capacity: email is shed at half capacity, voice only when full."""
+    service = make_service()
+    dispatcher = NotificationDispatcher(service, max_pending=100, provider_rates={"twilio": 1000},
+                                        coalesce_window=0)
+    for event in wave(150):
+        await dispatcher.submit(event)
+    stats = dispatcher.get_stats()["channels"]
+    await dispatcher.close(timeout=0)
+    # Voice and email alternate, so email stops at 25 (half of 100 pending) and voice takes the other 75
+    shed = stats["voice"]["shed"], stats["email"]["shed"]
+    assert shed == (75, 125), f"shed (voice, email) = {shed}"
+    print(f"overload, capacity 100 voice shed={shed[0]} email shed={shed[1]}")
+    await service.close()
+
+
+class GatedService(NotificationService):
+    """Records the order calls are placed in; numbers ending in 9 fail once, ``held`` waits for ``gate``."""
+
+    def __init__(self, held: str):
+        super().__init__()
+        self.held = held
+        self.gate = asyncio.Event()
+        self.failed = set()
+        self.placed = []
+
+    async def _send_voice_call(self, phone_number: str, message: str):
+        if phone_number == self.held:
+            await self.gate.wait()
+        elif phone_number.endswith("9") and phone_number not in self.failed:
+            self.failed.add(phone_number)
+            raise TimeoutError("provider timed out")
+        self.placed.append(phone_number)
+        return f"CA{len(self.placed):032d}"
+
+
+async def priority() -> None:
+    """A fresh alert queued behind three retries is called first."""
+    held, fresh = "+15550000100", "+15550000200"
+    retried = [f"+155500001{i}9" for i in range(3)]
+    service = GatedService(held)
+    dispatcher = NotificationDispatcher(service, concurrency={"voice": 1}, provider_rates={"twilio": 1000},
+                                        coalesce_window=0, retry_base=0.01, retry_max=0.01)
+    # Each first attempt fails and parks a retry; the one worker is then held by the next call
+    for i, phone in enumerate(retried + [held]):
+        await dispatcher.submit(voice_event(f"alert-{i}", phone))
+    await asyncio.sleep(0.1)
+    assert dispatcher.get_stats()["channels"]["voice"]["queued"] == len(retried)
+    await dispatcher.submit(voice_event("alert-fresh", fresh))
+    service.gate.set()
+    await dispatcher.close(timeout=5)
+    # Retries keep their jittered backoff order among themselves
+    assert service.placed[:2] == [held, fresh] and sorted(service.placed[2:]) == retried, service.placed
+    print(f"priority, 3 retries    call order after the held call: fresh first, then retries {service.placed[2:]}")
+    await service.close()
+
+
+class FailingService(NotificationService):
+    """Every voice call times out, so each notification keeps coming back as a retry."""
+
+    async def _send_voice_call(self, phone_number: str, message: str):
+        await asyncio.sleep(0.001)
+        raise TimeoutError("provider timed out")
+
+
+async def bounded() -> None:
+    """A sustained burst at a failing provider: open batches and retries stay within max_pending."""
+    service = make_service(FailingService)
+    dispatcher = NotificationDispatcher(service, max_pending=50, provider_rates={"twilio": 1000},
+                                        coalesce_window=0.05, retry_base=0.05, retry_max=0.1)
+    peak = 0
+    for i in range(500):
+        await dispatcher.submit(voice_event(f"alert-{i}", f"+1555{i:07d}"))
+        peak = max(peak, dispatcher.pending)
+        if i % 25 == 0:
+            await asyncio.sleep(0.01)
+            peak = max(peak, dispatcher.pending)
+    while dispatcher.pending:
+        await asyncio.sleep(0.01)
+        peak = max(peak, dispatcher.pending)
+    voice = dispatcher.get_stats()["channels"]["voice"]
+    await dispatcher.close(timeout=0)
+    assert peak <= dispatcher.max_pending, f"pending peaked at {peak} with max_pending {dispatcher.max_pending}"
+    assert voice["shed"] > 0, voice
+    print(f"bounded, 500 failing   pending peak={peak} of {dispatcher.max_pending} shed={voice['shed']} "
+          f"retried={voice['retried']} dead-lettered={voice['dead_lettered']}")
+    await service.close()
+
+
+class SlowLogService(NotificationService):
+    """Takes ``LOG_SECONDS`` to log each event's results, like a slow database write."""
+
+    LOG_SECONDS = 0.5
+
+    async def log_notification_results(self, alert_id, results):
+        await asyncio.sleep(self.LOG_SECONDS)
+
+
+async def drops_never_wait() -> None:
+    """Throttled webhooks are dropped on the submit path; recording them must not hold up submit."""
+    service = make_service(SlowLogService)
+    dispatcher = NotificationDispatcher(service, coalesce_window=0, destination_limits={"webhook": (1, 1)},
+                                        max_delay=0)
+    events = [
+        voice_event(f"alert-{i}", "").model_copy(update={"notification_data": [
+            {"notification_type": "webhook", "destination": "https://example.com/hook", "is_enabled": True}]})
+        for i in range(20)
+    ]
+    started = time.perf_counter()
+    for event in events:
+        await dispatcher.submit(event)
+    elapsed = time.perf_counter() - started
+    throttled = dispatcher.get_stats()["channels"]["webhook"]["throttled"]
+    await dispatcher.close(timeout=0)
+    assert throttled == len(events) - 1, f"{throttled} webhooks throttled"
+    assert elapsed < SlowLogService.LOG_SECONDS, f"submitting {len(events)} events took {elapsed:.2f}s"
+    print(f"drops, 19 throttled    submit took {elapsed * 1000:.1f}ms for {len(events)} events")
+    await service.close()
+
+
+async def main():
+    await run("task per event", task_per_event, InlineTwilioService)
+    await run("dispatcher", dispatched)
+    await coalesced()
+    await hot_destination()
+    await overload()
+    await priority()
+    await drops_never_wait()
+    await bounded()
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main())
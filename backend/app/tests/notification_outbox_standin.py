@@ -0,0 +1,174 @@
+"""
+Notification outbox against a flaky provider stand-in and a simulated restart.
+
+Running this file sends alerts through NotificationDispatcher with a
+NotificationOutbox in a temporary directory:
+
+* a provider that times out on the first two attempts per destination, and a
+  destination that always fails, to show retries and dead-lettering;
+* a provider that hangs, so the dispatcher is stopped with every notification
+  still pending, then a fresh outbox and dispatcher that recover and send them;
+* the same triggers submitted again with a later trigger time, which the
+  idempotency keys (alert, trigger_count, channel, destination) skip;
+* a recovery with more pending rows than ``max_pending``, whose excess is shed.
+
+Each run asserts that every notification ends up sent or dead-lettered, that
+none is lost across the restart and that no number is called twice.
+
+    cd backend && python -m app.tests.notification_outbox_standin
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+from collections import Counter
+from datetime import datetime
+
+from app.alerts import NotificationService
+from app.dispatch import NotificationDispatcher
+from app.outbox import NotificationOutbox
+from app.tests.standin_support import make_service, voice_event
+
+MAX_ATTEMPTS = 4
+
+
+class FlakyService(NotificationService):
+    """Voice calls time out ``failures`` times per number; numbers ending in 9 never get through."""
+
+    def __init__(self, failures: int = 2, hang: bool = False):
+        super().__init__()
+        self.failures = failures
+        self.hang = hang
+        self.attempts = Counter()
+        self.placed = Counter()
+
+    async def _send_voice_call(self, phone_number: str, message: str):
+        if self.hang:
+            await asyncio.Event().wait()
+        self.attempts[phone_number] += 1
+        if phone_number.endswith("9") or self.attempts[phone_number] <= self.failures:
+            raise TimeoutError("provider timed out")
+        self.placed[phone_number] += 1
+        return f"CA{sum(self.placed.values()):032d}"
+
+    async def log_notification_results(self, alert_id, results):
+        pass
+
+
+def triggers(size: int):
+    return [voice_event(f"alert-{i}", f"+1555{i:07d}", trigger_count=1) for i in range(size)]
+
+
+def unreachable(size: int) -> int:
+    """How many of ``triggers(size)`` go to a number FlakyService never gets through to."""
+    return sum(1 for i in range(size) if i % 10 == 9)
+
+
+def statuses(path: str) -> dict:
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+
+def dispatcher_for(service, outbox, max_pending: int = 5000) -> NotificationDispatcher:
+    return NotificationDispatcher(service, outbox=outbox, provider_rates={"twilio": 1000}, coalesce_window=0,
+                                  max_attempts=MAX_ATTEMPTS, retry_base=0.05, retry_max=0.2,
+                                  max_pending=max_pending)
+
+
+async def leave_pending(path: str, events) -> None:
+    """Submit ``events`` to a provider that never answers and shut down with all of them pending."""
+    outbox = NotificationOutbox(path)
+    await outbox.open()
+    hung = make_service(FlakyService, failures=0, hang=True)
+    dispatcher = dispatcher_for(hung, outbox)
+    for event in events:
+        await dispatcher.submit(event)
+    await asyncio.sleep(0.1)
+    await dispatcher.close(timeout=0)
+    await outbox.close()
+    await hung.close()
+    assert statuses(path) == {"pending": len(events)}, statuses(path)
+
+
+async def retries(directory: str) -> None:
+    path = os.path.join(directory, "retries.db")
+    outbox = NotificationOutbox(path)
+    await outbox.open()
+    service = make_service(FlakyService)
+    dispatcher = dispatcher_for(service, outbox)
+    for event in triggers(20):
+        await dispatcher.submit(event)
+    await dispatcher.close(timeout=10)
+    await outbox.close()
+    voice = dispatcher.get_stats()["channels"]["voice"]
+    dead = unreachable(20)
+    # Two timeouts per reachable number, and every attempt after the first for each unreachable one
+    assert sum(service.placed.values()) == 20 - dead, service.placed
+    assert voice["retried"] == 2 * (20 - dead) + (MAX_ATTEMPTS - 1) * dead, voice["retried"]
+    assert statuses(path) == {"sent": 20 - dead, "dead": dead}, statuses(path)
+    print(f"flaky provider, 20     placed={sum(service.placed.values())} retried={voice['retried']} "
+          f"dead-lettered={voice['dead_lettered']} | outbox {statuses(path)}")
+    await service.close()
+
+
+async def restart(directory: str) -> None:
+    path = os.path.join(directory, "restart.db")
+    events = triggers(200)
+    await leave_pending(path, events)
+    before = statuses(path)
+
+    outbox = NotificationOutbox(path)
+    await outbox.open()
+    service = make_service(FlakyService, failures=0)
+    dispatcher = dispatcher_for(service, outbox)
+    recovered = await dispatcher.recover()
+    assert recovered == len(events), f"{recovered} of {len(events)} pending notifications recovered"
+    # The same triggers replayed later (as a restarted evaluator would) carry a new triggered_at
+    for event in events:
+        await dispatcher.submit(event.model_copy(update={"triggered_at": datetime.now()}))
+    await dispatcher.close(timeout=10)
+    await outbox.close()
+    duplicates = outbox.get_stats()["duplicates"]
+    assert duplicates == len(events), f"{duplicates} of {len(events)} replayed triggers were skipped"
+    dead = unreachable(len(events))
+    assert sum(service.placed.values()) == len(events) - dead, service.placed
+    assert max(service.placed.values()) == 1, service.placed.most_common(3)
+    assert statuses(path) == {"sent": len(events) - dead, "dead": dead}, statuses(path)
+    print(f"restart, 200 pending   before restart {before} | recovered={recovered} "
+          f"placed={sum(service.placed.values())} max per number={max(service.placed.values())} "
+          f"resubmits skipped={duplicates} | outbox {statuses(path)}")
+    await service.close()
+
+
+async def bounded_recovery(directory: str) -> None:
+    """Recovered rows are admitted like new notifications: past max_pending they are shed, not queued."""
+    path = os.path.join(directory, "bounded.db")
+    events = triggers(200)
+    await leave_pending(path, events)
+
+    outbox = NotificationOutbox(path)
+    await outbox.open()
+    service = make_service(FlakyService, failures=0)
+    dispatcher = dispatcher_for(service, outbox, max_pending=50)
+    recovered = await dispatcher.recover()
+    pending = dispatcher.pending
+    await dispatcher.close(timeout=10)
+    await outbox.close()
+    assert recovered == pending == 50, f"recovered={recovered} pending={pending} with max_pending 50"
+    settled = statuses(path)
+    assert settled.get("dropped") == len(events) - 50 and "pending" not in settled, settled
+    print(f"recovery, max 50       recovered={recovered} of {len(events)} | outbox {settled}")
+    await service.close()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        await retries(directory)
+        await restart(directory)
+        await bounded_recovery(directory)
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Fakes and fixtures shared by the notification stand-ins.
+
+``FakeTwilioClient`` stands in for the Twilio SDK client: its
+``calls.create`` blocks the calling thread like the real synchronous SDK while
+it waits on HTTP, and counts the calls made. ``make_service`` wires a
+NotificationService (or a subclass) to it, and ``voice_event`` builds a
+trigger with a single voice destination.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.alerts import NotificationService
+from app.models import AlertDirection, AlertTriggerEvent, AlertType
+
+CALL_SECONDS = 0.05
+FROM_PHONE = "+15550000000"
+
+
+class BlockingCalls:
+    """``client.calls`` whose ``create`` blocks the calling thread, tracking peak concurrency."""
+
+    def __init__(self, seconds: float = CALL_SECONDS):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.made = 0
+
+    def create(self, to, from_, twiml):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.active -= 1
+            self.made += 1
+        return type("Call", (), {"sid": f"CA{self.made:032d}"})()
+
+
+class FakeTwilioClient:
+    def __init__(self, seconds: float = CALL_SECONDS):
+        self.calls = BlockingCalls(seconds)
+
+
+class RecordingService(NotificationService):
+    """Keeps the message of every voice call instead of placing it."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    async def _send_voice_call(self, phone_number: str, message: str):
+        self.messages.append(message)
+        return f"CA{len(self.messages):032d}"
+
+
+def make_service(cls=NotificationService, twilio=None, **kwargs) -> NotificationService:
+    """``cls(**kwargs)`` placing calls through ``twilio``, a FakeTwilioClient unless given."""
+    service = cls(**kwargs)
+    service.twilio_client = twilio if twilio is not None else FakeTwilioClient()
+    service.twilio_phone = FROM_PHONE
+    return service
+
+
+def voice_event(alert_id: str, phone: str, symbol: str = "BTC", target_value: float = 69000.0,
+                message: str = "BTC crossed 69,000", custom_message: bool = False, trigger_count: int = 0,
+                triggered_at: Optional[datetime] = None) -> AlertTriggerEvent:
+    return AlertTriggerEvent(
+        alert_id=alert_id, symbol=symbol, trigger_price=target_value + 1000, target_value=target_value,
+        alert_type=AlertType.PRICE_TARGET, direction=AlertDirection.ABOVE, message=message,
+        triggered_at=triggered_at or datetime.now(), custom_message=custom_message, trigger_count=trigger_count,
+        notification_data=[{"notification_type": "voice", "destination": phone, "is_enabled": True}],
+    )
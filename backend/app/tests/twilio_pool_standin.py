@@ -0,0 +1,155 @@
+"""
+Twilio connection reuse against a local HTTP stand-in for the Calls API.
+
+The stand-in answers ``POST .../Calls.json`` like Twilio does, keeps
+connections alive and counts the TCP connections it accepts. Each new
+connection is delayed by ``HANDSHAKE_SECONDS`` to stand in for the TCP and TLS
+round trips to api.twilio.com. Running this file places calls two ways:
+
+* a new Twilio client per call, as ``send_voice_alert`` and ``make_call`` used to do;
+* the shared pooled client from app/providers.py, one call at a time and then
+  a concurrent wave through NotificationService's executor.
+
+It prints per-call latency, the connections the stand-in saw, and the client's
+connection reuse, and asserts that every call arrived, that the shared client
+kept to its pool and that it reused connections for at least ``MIN_REUSE`` of
+its requests:
+
+    cd backend && python -m app.tests.twilio_pool_standin
+"""
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from twilio.rest import Client
+
+from app.providers import TWILIO_POOL_SIZE, PooledTwilioHttpClient, twilio_client
+from app.tests.standin_support import make_service
+
+ACCOUNT_SID = "AC" + "0" * 32
+AUTH_TOKEN = "standin-token"
+HANDSHAKE_SECONDS = 0.03
+API_SECONDS = 0.005
+CALLS = 50
+WAVE = 200
+MIN_REUSE = 0.95
+
+
+class TwilioStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per kept-alive request
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(HANDSHAKE_SECONDS)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(API_SECONDS)
+        with self.server.lock:
+            self.server.calls += 1
+            sid = f"CA{self.server.calls:032d}"
+        body = json.dumps({"sid": sid, "account_sid": ACCOUNT_SID, "status": "queued"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TwilioStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), TwilioStandInHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.calls = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self) -> None:
+        self.connections = 0
+        self.calls = 0
+
+
+def place(client: Client) -> float:
+    started = time.perf_counter()
+    client.calls.create(to="+15550000001", from_="+15550000000", twiml="<Response><Say>Test</Say></Response>")
+    return time.perf_counter() - started
+
+
+def check(label: str, server: TwilioStandIn, calls: int, max_connections: int, reuse=None) -> None:
+    assert server.calls == calls, f"{label}: {server.calls} of {calls} calls reached the stand-in"
+    assert server.connections <= max_connections, f"{label}: {server.connections} connections opened"
+    if reuse is not None:
+        assert reuse >= MIN_REUSE, f"{label}: connection reuse {reuse:.1%} below {MIN_REUSE:.0%}"
+
+
+def report(label: str, server: TwilioStandIn, latencies, reuse=None) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    reuse = f" | client reuse {reuse:.1%}" if reuse is not None else ""
+    print(f"{label:<24} {server.calls:>4} calls | latency p50 {statistics.median(latencies) * 1000:6.1f}ms "
+          f"p99 {p99 * 1000:6.1f}ms | connections accepted {server.connections:>4}{reuse}")
+    server.reset()
+
+
+async def concurrent_wave(server: TwilioStandIn) -> None:
+    service = make_service(twilio=twilio_client(ACCOUNT_SID, AUTH_TOKEN, base_url=server.url))
+    http = service.twilio_client.http_client
+    requests_before, seconds_before = http.requests, http.request_seconds
+
+    started = time.perf_counter()
+    await asyncio.gather(*(service._send_voice_call(f"+1555{i:07d}", "BTC crossed 69,000") for i in range(WAVE)))
+    elapsed = time.perf_counter() - started
+    # Per-request time from the client; time queued for an executor thread is left out
+    per_request = (http.request_seconds - seconds_before) / (http.requests - requests_before)
+    reuse = http.get_stats()["connection_reuse"]
+    label = f"shared client, {WAVE} conc."
+    check(label, server, WAVE, TWILIO_POOL_SIZE, reuse)
+    print(f"{label:<24} {server.calls:>4} calls | {elapsed:.2f}s wall, "
+          f"{per_request * 1000:.1f}ms per request | connections accepted {server.connections:>4} "
+          f"| client reuse {reuse:.1%}")
+    server.reset()
+    await service.close()
+
+
+def main():
+    server = TwilioStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies = []
+    for _ in range(CALLS):
+        client = Client(ACCOUNT_SID, AUTH_TOKEN, http_client=PooledTwilioHttpClient(base_url=server.url))
+        latencies.append(place(client))
+        client.http_client.close()
+    check("client per call", server, CALLS, CALLS)
+    report("client per call", server, latencies)
+
+    shared = twilio_client(ACCOUNT_SID, AUTH_TOKEN, base_url=server.url)
+    latencies = [place(shared) for _ in range(CALLS)]
+    reuse = shared.http_client.get_stats()["connection_reuse"]
+    # One call at a time needs exactly one connection
+    check("shared client", server, CALLS, 1, reuse)
+    report("shared client", server, latencies, reuse)
+
+    asyncio.run(concurrent_wave(server))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.WARNING)
+    main()
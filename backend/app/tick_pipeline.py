@@ -0,0 +1,97 @@
+"""
+Conflating hand-off between the Binance reader and the alert evaluator.
+The reader only parses frames; the evaluator drains the latest tick per dirty symbol.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+# (symbol, price, monotonic receive time)
+PendingTick = Tuple[str, float, float]
+
+
+class ConflatingTickBuffer:
+    """Latest-tick-per-symbol slot with a dirty set.
+
+    ``put`` never blocks: if a symbol already has an unevaluated tick it is
+    overwritten (conflated), so a slow evaluator costs freshness, not memory,
+    and the WebSocket reader keeps up with Binance.
+    """
+
+    def __init__(self):
+        self._latest: Dict[str, Tuple[float, float]] = {}
+        # Insertion-ordered set of symbols waiting for evaluation
+        self._dirty: Dict[str, None] = {}
+        self._ready = asyncio.Event()
+
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.ticks_conflated = 0
+        self.ticks_evaluated = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_queue_depth = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._lag_total_ms = 0.0
+
+    def frame_received(self) -> None:
+        self.frames_received += 1
+
+    def drop_frame(self) -> None:
+        """Count a frame the reader could not turn into a tick."""
+        self.frames_dropped += 1
+
+    def put(self, symbol: str, price: float, received_at: float) -> None:
+        """Publish the latest price for a symbol, replacing any pending one."""
+        if symbol in self._dirty:
+            self.ticks_conflated += 1
+        else:
+            self._dirty[symbol] = None
+            if len(self._dirty) > self.max_queue_depth:
+                self.max_queue_depth = len(self._dirty)
+        self._latest[symbol] = (price, received_at)
+        self._ready.set()
+
+    async def drain(self) -> List[PendingTick]:
+        """Wait for dirty symbols and take all of them as one batch."""
+        while not self._dirty:
+            self._ready.clear()
+            await self._ready.wait()
+
+        batch = [(symbol,) + self._latest[symbol] for symbol in self._dirty]
+        self._dirty = {}
+        self._ready.clear()
+
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        return batch
+
+    def record_evaluated(self, received_at: float) -> None:
+        """Record receive-to-evaluated lag for one tick."""
+        lag_ms = (time.monotonic() - received_at) * 1000
+        self.ticks_evaluated += 1
+        self.last_lag_ms = lag_ms
+        self._lag_total_ms += lag_ms
+        if lag_ms > self.max_lag_ms:
+            self.max_lag_ms = lag_ms
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._dirty)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for sizing the pipeline under bursty markets."""
+        return {
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "ticks_conflated": self.ticks_conflated,
+            "ticks_evaluated": self.ticks_evaluated,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "avg_lag_ms": round(self._lag_total_ms / self.ticks_evaluated, 3) if self.ticks_evaluated else 0.0,
+        }
@@ -1,9 +1,10 @@
 # Twilio client placeholder
 from app import config
-from twilio.rest import Client
+from app.providers import twilio_client
 
 def make_call():
-    client = Client(config.TWILIO_ACCOUNT_SID, config.TWILIO_AUTH_TOKEN)
+    # Shared pooled client for the account (see app/providers.py)
+    client = twilio_client(config.TWILIO_ACCOUNT_SID, config.TWILIO_AUTH_TOKEN)
 
     call = client.calls.create(
         twiml='<Response><Say>🚨 Crypto Alarm Alert! Your price target has been reached.</Say></Response>',
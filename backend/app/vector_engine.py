@@ -0,0 +1,175 @@
+"""
+Optional NumPy-backed alert evaluation.
+Alerts are stored struct-of-arrays (pair id, type, direction, threshold, baseline,
+armed) and a batch of dirty symbols is evaluated with vectorized comparisons.
+AlertManager._check_price_target / _check_percentage_change remain the reference
+semantics; see benchmarks/vector_engine.py for the equivalence check and timings.
+Enable with ALERT_ENGINE=numpy (requires numpy).
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .decoders import SymbolTable
+from .models import AlertDirection, AlertType
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+VECTOR_ENGINE_AVAILABLE = np is not None
+
+KIND_PRICE_TARGET = 0
+KIND_PERCENTAGE_CHANGE = 1
+_KINDS = {AlertType.PRICE_TARGET: KIND_PRICE_TARGET, AlertType.PERCENTAGE_CHANGE: KIND_PERCENTAGE_CHANGE}
+
+DIR_ABOVE = 0
+DIR_BELOW = 1
+DIR_BOTH = 2
+_DIRECTIONS = {AlertDirection.ABOVE: DIR_ABOVE, AlertDirection.BELOW: DIR_BELOW, AlertDirection.BOTH: DIR_BOTH}
+
+
+class VectorAlertEngine:
+    """Armed alerts as parallel NumPy arrays, one row per alert.
+
+    Rows of removed alerts are disarmed and recycled through a free list, so
+    the arrays only grow to the peak number of armed alerts.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise RuntimeError("numpy is required for the vector alert engine")
+        self.symbols = SymbolTable()
+        self.prices = np.full(64, np.nan)
+        self._size = 0  # rows in use, including freed ones
+        self.pair_id = np.zeros(capacity, np.int32)
+        self.kind = np.zeros(capacity, np.int8)
+        self.direction = np.zeros(capacity, np.int8)
+        self.threshold = np.zeros(capacity, np.float64)
+        self.baseline = np.full(capacity, np.nan)
+        self.armed = np.zeros(capacity, bool)
+        self.alert_ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._row_of
+
+    def _grow(self) -> None:
+        capacity = len(self.armed) * 2
+        for name in ("pair_id", "kind", "direction", "threshold", "armed"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        baseline = np.full(capacity, np.nan)
+        baseline[:len(self.baseline)] = self.baseline
+        self.baseline = baseline
+
+    def _symbol_id(self, pair: str) -> int:
+        symbol_id = self.symbols.id_for(pair)
+        if symbol_id >= len(self.prices):
+            prices = np.full(len(self.prices) * 2, np.nan)
+            prices[:len(self.prices)] = self.prices
+            self.prices = prices
+        return symbol_id
+
+    def add(self, alert_id: str, pair: str, alert_type: AlertType, direction: AlertDirection,
+            threshold: float, baseline: Optional[float] = None) -> bool:
+        """Arm an alert; returns False for alert types this engine never fires."""
+        kind = _KINDS.get(alert_type)
+        if kind is None:
+            return False
+        self.remove(alert_id)
+
+        if self._free:
+            row = self._free.pop()
+            self.alert_ids[row] = alert_id
+        else:
+            if self._size == len(self.armed):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self.alert_ids.append(alert_id)
+
+        self.pair_id[row] = self._symbol_id(pair)
+        self.kind[row] = kind
+        self.direction[row] = _DIRECTIONS[direction]
+        self.threshold[row] = threshold
+        self.baseline[row] = baseline if baseline else np.nan
+        self.armed[row] = True
+        self._row_of[alert_id] = row
+        return True
+
+    def remove(self, alert_id: str) -> bool:
+        row = self._row_of.pop(alert_id, None)
+        if row is None:
+            return False
+        self.armed[row] = False
+        self.alert_ids[row] = None
+        self._free.append(row)
+        return True
+
+    def pairs(self) -> Set[str]:
+        """Trading pairs with at least one armed alert."""
+        ids = np.unique(self.pair_id[:self._size][self.armed[:self._size]])
+        return {self.symbols.symbol(int(i)) for i in ids}
+
+    def evaluate(self, ticks: Iterable[Tuple[str, float]]) -> Tuple[List[str], List[Tuple[str, float]]]:
+        """Apply a batch of (pair, price) ticks and evaluate every armed alert on those pairs.
+
+        Returns the triggered alert ids (which are disarmed here) and the
+        (alert id, baseline) pairs captured for percentage alerts seen for the
+        first time, so the caller can mirror them onto its models.
+        """
+        n = self._size
+        touched = []
+        for pair, price in ticks:
+            symbol_id = self._symbol_id(pair)
+            self.prices[symbol_id] = price
+            touched.append(symbol_id)
+        if n == 0 or not touched:
+            return [], []
+
+        dirty = np.zeros(len(self.prices), bool)
+        dirty[touched] = True
+
+        rows = np.flatnonzero(self.armed[:n] & dirty[self.pair_id[:n]])
+        if rows.size == 0:
+            return [], []
+
+        price = self.prices[self.pair_id[rows]]
+        kind = self.kind[rows]
+        direction = self.direction[rows]
+        threshold = self.threshold[rows]
+        baseline = self.baseline[rows]
+
+        above = direction == DIR_ABOVE
+        below = direction == DIR_BELOW
+        is_price = kind == KIND_PRICE_TARGET
+        hits = is_price & ((above & (price >= threshold)) | (below & (price <= threshold)))
+
+        # Percentage alerts capture their baseline on first sight and never fire on that tick
+        is_pct = kind == KIND_PERCENTAGE_CHANGE
+        unset = is_pct & (np.isnan(baseline) | (baseline == 0))
+        captured = rows[unset]
+        self.baseline[captured] = price[unset]
+
+        has_base = is_pct & ~unset
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = ((price - baseline) / baseline) * 100
+        hits |= has_base & (
+            (above & (change >= threshold))
+            | (below & (change <= -threshold))
+            | ((direction == DIR_BOTH) & (np.abs(change) >= threshold))
+        )
+
+        fired = rows[hits]
+        self.armed[fired] = False
+        ids = self.alert_ids
+        return (
+            [ids[row] for row in fired.tolist()],
+            [(ids[row], float(self.baseline[row])) for row in captured.tolist()],
+        )
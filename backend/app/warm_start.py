@@ -0,0 +1,204 @@
+"""
+Warm-start snapshots of the alert engine.
+The in-memory alerts (with their lazily captured percentage baselines), the
+delta-sync high-water mark and the last seen prices are written to a compact
+marshal file at intervals and on shutdown. On boot the file is memory-mapped and
+loaded, so alerts are armed before Supabase answers; a delta sync from the saved
+high-water mark (the first periodic sync, or the change feed's catch-up) then
+reconciles. Recurring alerts keep their cooldown state (status, ``triggered_at``
+and the per-alert cooldown), and restore_alerts reschedules their re-arms from
+it. Loading and indexing are still linear in the alert count, roughly
+2.5s and 6s per million alerts here: a warm start saves the fetch and row
+conversion of a full sync, not the index build.
+"""
+import asyncio
+import gc
+import logging
+import marshal
+import mmap
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .alert_record import AlertRecord, ColdAlertFields
+from .models import AlertDirection, AlertStatus, AlertType
+
+logger = logging.getLogger(__name__)
+
+# Unset disables warm starts (every boot waits for a full sync)
+WARM_START_PATH = os.getenv("WARM_START_PATH")
+WARM_START_SAVE_INTERVAL = float(os.getenv("WARM_START_SAVE_INTERVAL_SECONDS", "60"))
+# Older snapshots are ignored; a delta from that far back costs about as much as a full sync
+WARM_START_MAX_AGE = float(os.getenv("WARM_START_MAX_AGE_SECONDS", "86400"))
+
+SNAPSHOT_MAGIC = b"CAWS"
+# Bump when the row layout changes. marshal's own format is tied to the
+# interpreter, so the Python version is part of the header too
+SNAPSHOT_FORMAT = 3
+
+_ALERT_TYPES = {member.value: member for member in AlertType}
+_DIRECTIONS = {member.value: member for member in AlertDirection}
+_STATUSES = {member.value: member for member in AlertStatus}
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
+def _datetimes(values: tuple) -> List[Optional[datetime]]:
+    fromtimestamp = datetime.fromtimestamp
+    return [None if value is None else fromtimestamp(value) for value in values]
+
+
+def encode_alert(alert: AlertRecord) -> tuple:
+    """Flatten a record into a tuple of marshal-friendly values."""
+    cold = alert.cold
+    created_at = cold._created_at
+    return (
+        alert.id, alert.symbol, alert.pair, alert.alert_type.value, alert.direction.value,
+        alert.target_value, alert.baseline_price, alert.status.value, alert.trigger_count,
+        alert.is_one_time, alert.current_price, _timestamp(alert.triggered_at), _timestamp(alert.last_checked),
+        cold.user_id, cold.message, created_at if isinstance(created_at, str) else created_at.isoformat(),
+        cold._notifications, cold.cooldown,
+    )
+
+
+def encode_alerts(alerts: List[AlertRecord]) -> tuple:
+    """Records as one tuple per field (the ``encode_alert`` layout, transposed)."""
+    return tuple(zip(*map(encode_alert, alerts)))
+
+
+def decode_alerts(columns: tuple) -> List[AlertRecord]:
+    """Rebuild records from ``encode_alerts`` columns.
+
+    Enums and timestamps are converted a column at a time and records are
+    filled through ``AlertRecord.restore``, which is about twice as fast as
+    decoding row by row.
+    """
+    if not columns:
+        return []
+    (ids, symbols, pairs, alert_types, directions, target_values, baselines, statuses, trigger_counts,
+     one_time, current_prices, triggered_at, last_checked, user_ids, messages, created_at, notifications,
+     cooldowns) = columns
+    colds = map(ColdAlertFields, user_ids, messages, created_at, notifications, cooldowns)
+    return list(map(
+        AlertRecord.restore, ids, symbols, pairs, map(_ALERT_TYPES.__getitem__, alert_types),
+        map(_DIRECTIONS.__getitem__, directions), target_values, baselines, map(_STATUSES.__getitem__, statuses),
+        trigger_counts, one_time, current_prices, _datetimes(triggered_at), _datetimes(last_checked), colds,
+    ))
+
+
+class WarmStartStore:
+    """Reads and writes the engine snapshot file.
+
+    Saves go to a temporary file that replaces the old one, so a crash
+    mid-write leaves the previous snapshot intact. ``save`` and ``load`` do
+    blocking I/O and are run in a worker thread by ``checkpoint``/``restore``.
+    """
+
+    def __init__(self, path: str, max_age: float = WARM_START_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.saves = 0
+        self.last_save_ms: Optional[float] = None
+        self.last_save_bytes = 0
+        self.last_load_ms: Optional[float] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def save(self, alerts: List[AlertRecord], sync_high_water: Optional[str],
+             prices: Dict[str, float]) -> int:
+        """Write a snapshot; returns its size in bytes."""
+        started = time.perf_counter()
+        header = (SNAPSHOT_FORMAT, tuple(sys.version_info[:2]), time.time(), sync_high_water)
+        body = marshal.dumps((header, encode_alerts(alerts), prices))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.saves += 1
+        self.last_save_bytes = len(body) + len(SNAPSHOT_MAGIC)
+        self.last_save_ms = (time.perf_counter() - started) * 1000
+        return self.last_save_bytes
+
+    def load(self) -> Optional[Tuple[List[AlertRecord], Optional[str], Dict[str, float], float]]:
+        """Read the snapshot, or None if it is missing, stale or from another format.
+
+        Returns ``(alerts, sync_high_water, prices, saved_at)``.
+        """
+        started = time.perf_counter()
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                    logger.warning(f"⚠️ Ignoring warm-start file {self.path}: not a snapshot")
+                    return None
+                with memoryview(mapped)[len(SNAPSHOT_MAGIC):] as body:
+                    header, columns, prices = marshal.loads(body)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, TypeError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable warm-start file {self.path}: {e}")
+            return None
+
+        snapshot_format, python_version, saved_at, sync_high_water = header
+        if snapshot_format != SNAPSHOT_FORMAT or tuple(python_version) != tuple(sys.version_info[:2]):
+            logger.warning(f"⚠️ Ignoring warm-start file {self.path}: written by another version")
+            return None
+        if time.time() - saved_at > self.max_age:
+            logger.info(f"Warm-start file {self.path} is older than {self.max_age:g}s; doing a full sync")
+            return None
+
+        alerts = decode_alerts(columns)
+        self.last_load_ms = (time.perf_counter() - started) * 1000
+        return alerts, sync_high_water, prices, saved_at
+
+    async def checkpoint(self, manager, prices: Dict[str, float]) -> None:
+        """Snapshot the manager's current alerts from a worker thread."""
+        # Copied on the loop so the thread never iterates a dict that is being mutated
+        alerts = list(manager.alerts.values())
+        size = await asyncio.to_thread(self.save, alerts, manager.sync_high_water, dict(prices))
+        logger.info(f"💾 Warm-start snapshot: {len(alerts)} alerts, {size / 1024:.0f} KiB in {self.last_save_ms:.0f}ms")
+
+    async def restore(self, manager, prices: Dict[str, float]) -> bool:
+        """Load the snapshot into the manager and ``prices``; False if there was nothing usable."""
+        # A boot-time load allocates millions of long-lived objects; the collector
+        # would rescan them over and over, so it is paused until they are indexed
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            loaded = await asyncio.to_thread(self.load)
+            if loaded is None:
+                return False
+            alerts, sync_high_water, saved_prices, saved_at = loaded
+            await manager.restore_alerts(alerts, sync_high_water)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        for symbol, price in saved_prices.items():
+            prices.setdefault(symbol, price)
+        logger.info(f"♻️ Warm start: {len(alerts)} alerts from a snapshot {time.time() - saved_at:.0f}s old, "
+                    f"loaded in {self.last_load_ms:.0f}ms")
+        return True
+
+    async def run(self, manager, prices: Dict[str, float], interval: float = WARM_START_SAVE_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.checkpoint(manager, prices)
+            except Exception as e:
+                logger.error(f"❌ Warm-start snapshot failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "saves": self.saves,
+            "last_save_ms": round(self.last_save_ms, 1) if self.last_save_ms is not None else None,
+            "last_save_bytes": self.last_save_bytes,
+            "last_load_ms": round(self.last_load_ms, 1) if self.last_load_ms is not None else None,
+        }
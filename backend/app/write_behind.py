@@ -0,0 +1,152 @@
+"""
+Write-behind buffer for alert trigger side-effects.
+Trigger bookkeeping is coalesced per alert id and applied server-side in one
+RPC, trigger/notification log rows are bulk-inserted, and both are flushed when a batch fills or after a short interval, so
+firing an alert never waits on a database round trip.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .database import supabase_client
+from .metrics import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "50")) / 1000
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500"))
+# Pending writes beyond this make writers wait for a flush instead of growing the buffer
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "20000"))
+
+
+class WriteBehindBuffer:
+    """Batched trigger bookkeeping and ``alert_logs`` inserts.
+
+    ``record_trigger`` folds into the pending entry for that alert, and one
+    ``record_alert_triggers`` call per batch raises every count on the server
+    to its trigger sequence (see docs/atomic-trigger-count-migration.sql), so
+    a batch that is applied twice counts once. ``log`` queues a row for the next bulk INSERT. Both return
+    without a round trip unless the buffer is full, in which case the
+    caller flushes first (backpressure rather than unbounded memory).
+    """
+
+    def __init__(self, db, flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+                 max_batch: int = WRITE_BEHIND_MAX_BATCH, max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        # alert_id -> {"alert_id", "trigger_count", "price", "triggered_at"}
+        self._triggers: Dict[str, Dict[str, Any]] = {}
+        self._logs: List[Dict[str, Any]] = []
+        self._has_data = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.triggers_recorded = 0
+        self.triggers_coalesced = 0
+        self.logs_queued = 0
+        self.flushes = 0
+        self.failed_writes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._triggers) + len(self._logs)
+
+    async def record_trigger(self, alert_id: str, trigger_count: int, price: float, triggered_at: str) -> None:
+        """Queue the ``trigger_count``-th trigger of an alert; later ones replace it."""
+        self.triggers_recorded += 1
+        pending = self._triggers.get(alert_id)
+        if pending is None:
+            self._triggers[alert_id] = {"alert_id": alert_id, "trigger_count": trigger_count, "price": price,
+                                        "triggered_at": triggered_at}
+        else:
+            self.triggers_coalesced += 1
+            pending["trigger_count"] = max(pending["trigger_count"], trigger_count)
+            pending["price"] = price
+            pending["triggered_at"] = triggered_at
+        await self._queued()
+
+    async def log(self, row: Dict[str, Any]) -> None:
+        """Queue an ``alert_logs`` row for the next bulk insert."""
+        self.logs_queued += 1
+        self._logs.append(row)
+        await self._queued()
+
+    async def _queued(self) -> None:
+        self._start()
+        self._has_data.set()
+        if self.pending >= self.max_batch:
+            self._batch_full.set()
+        if self.pending >= self.max_pending:
+            await self.flush()
+
+    def _start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Flush once a batch fills or ``flush_interval`` after the first queued write."""
+        while True:
+            await self._has_data.wait()
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Shielded so close() cancelling the loop never drops a batch mid-write
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> None:
+        """Write everything queued so far."""
+        async with self._flush_lock:
+            triggers, self._triggers = list(self._triggers.values()), {}
+            logs, self._logs = self._logs, []
+            self._has_data.clear()
+            self._batch_full.clear()
+            if not triggers and not logs:
+                return
+            if not self.db.is_connected():
+                logger.warning(f"Supabase not connected - skipping {len(triggers) + len(logs)} buffered writes")
+                return
+
+            started = time.perf_counter()
+            step = self.max_batch
+            results = await asyncio.gather(
+                *(self.db.record_alert_triggers(triggers[i:i + step]) for i in range(0, len(triggers), step)),
+                *(self.db.insert_alert_logs(logs[i:i + step]) for i in range(0, len(logs), step)),
+                return_exceptions=True,
+            )
+            WRITE_BEHIND_FLUSH.observe(time.perf_counter() - started)
+            WRITE_BEHIND_BATCH_SIZE.observe(len(triggers) + len(logs))
+            self.flushes += 1
+            failed = sum(1 for result in results if result is not True)
+            if failed:
+                self.failed_writes += failed
+                logger.error(f"❌ Write-behind flush: {failed} of {len(results)} writes failed")
+
+    async def close(self) -> None:
+        """Stop the flush loop and write out whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending": self.pending,
+            "triggers_recorded": self.triggers_recorded,
+            "triggers_coalesced": self.triggers_coalesced,
+            "logs_queued": self.logs_queued,
+            "flushes": self.flushes,
+            "failed_writes": self.failed_writes,
+        }
+
+
+# Global buffer in front of the shared Supabase client
+trigger_writes = WriteBehindBuffer(supabase_client)
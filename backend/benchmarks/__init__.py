@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the CryptoAlarm alert engine.
+Run from the backend directory, e.g. ``python -m benchmarks.decode_frames``.
+"""
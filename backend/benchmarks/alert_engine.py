@@ -0,0 +1,159 @@
+"""
+Alert-engine benchmark suite.
+
+Generates N alerts (mixed PRICE_TARGET / PERCENTAGE_CHANGE, ABOVE/BELOW/BOTH,
+across M symbols), syncs them into an AlertManager backed by in-memory
+Supabase and notification stand-ins, then drives random-walk ticks through
+check_alert_conditions. Reports full and delta sync cost, memory per alert, ticks/sec and
+per-tick latency percentiles, and writes JSON for tracking across commits.
+
+Usage (from backend/):
+    python -m benchmarks.alert_engine                             # 1k, 100k, 1M alerts
+    python -m benchmarks.alert_engine --sizes 1000,100000 --ticks 50000 --output bench.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List
+
+from app.alert_logic import AlertManager
+from benchmarks.generators import generate_alert_rows, random_walk_ticks, symbol_prices
+from benchmarks.standins import InMemorySupabase, NullNotificationService
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def percentiles(samples_ns: array) -> Dict[str, float]:
+    ordered = sorted(samples_ns)
+    if not ordered:
+        return {}
+
+    def at(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] / 1000, 3)
+
+    return {"p50_us": at(50), "p90_us": at(90), "p99_us": at(99), "p999_us": at(99.9), "max_us": at(100)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_size(size: int, symbols: int, ticks: int, percentage_share: float, tick_budget: float) -> Dict:
+    prices = symbol_prices(symbols)
+    rows = generate_alert_rows(size, prices, percentage_share=percentage_share)
+    db = InMemorySupabase(rows)
+    notifier = NullNotificationService()
+    manager = AlertManager(db=db, notifier=notifier)
+
+    gc.collect()
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    await manager.sync_database_alerts()
+    cold_sync = time.perf_counter() - started
+    gc.collect()
+    rss_after = rss_bytes()
+
+    started = time.perf_counter()
+    await manager.sync_database_alerts(full=True)
+    warm_sync = time.perf_counter() - started
+
+    # Nothing changed since the last sync: only the id-only tombstone check runs
+    started = time.perf_counter()
+    await manager.sync_database_alerts()
+    delta_sync = time.perf_counter() - started
+
+    latencies = array("q", bytes(8 * ticks))
+    triggers = 0
+    done = 0
+    check = manager.check_alert_conditions
+    clock = time.perf_counter_ns
+    started = time.perf_counter()
+    deadline = started + tick_budget
+    for pair, price in random_walk_ticks(prices, ticks):
+        t0 = clock()
+        events = await check(pair, price)
+        latencies[done] = clock() - t0
+        triggers += len(events)
+        done += 1
+        # Large sizes can be slow per tick; stop at the time budget and report what ran
+        if done & 255 == 0 and time.perf_counter() > deadline:
+            break
+    elapsed = time.perf_counter() - started
+    del latencies[done:]
+    # Land the buffered trigger writes so db_calls reflects what the database would see
+    await manager.writes.close()
+
+    return {
+        "alerts": size,
+        "symbols": symbols,
+        "ticks": done,
+        "sync_cold_seconds": round(cold_sync, 4),
+        "sync_warm_seconds": round(warm_sync, 4),
+        "sync_delta_seconds": round(delta_sync, 4),
+        "memory_per_alert_bytes": round((rss_after - rss_before) / size) if size else 0,
+        "ticks_per_second": round(done / elapsed) if elapsed else None,
+        "tick_latency": percentiles(latencies),
+        "triggers": triggers,
+        "db_calls": dict(db.calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma-separated alert counts")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--tick-budget", type=float, default=30.0, help="max seconds of ticks per size")
+    parser.add_argument("--percentage-share", type=float, default=0.2, help="fraction of PERCENTAGE_CHANGE alerts")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results: List[Dict] = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        result = asyncio.run(run_size(size, args.symbols, args.ticks, args.percentage_share, args.tick_budget))
+        results.append(result)
+        lat = result["tick_latency"]
+        print(
+            f"{size:>9,} alerts | sync {result['sync_cold_seconds']:.3f}s cold {result['sync_warm_seconds']:.3f}s warm "
+            f"{result['sync_delta_seconds']:.3f}s delta | "
+            f"{result['memory_per_alert_bytes']:,} B/alert | {result['ticks_per_second']:,} ticks/s | "
+            f"p50 {lat['p50_us']}us p99 {lat['p99_us']}us | {result['triggers']:,} triggers"
+        )
+        gc.collect()
+
+    report = {
+        "benchmark": "alert_engine",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
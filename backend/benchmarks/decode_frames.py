@@ -0,0 +1,106 @@
+"""
+Micro-benchmark of the Binance frame decoders.
+
+Usage (from backend/):
+    python -m benchmarks.decode_frames                      # built-in ticker/trade frames
+    python -m benchmarks.decode_frames --frames frames.txt  # one raw frame per line
+    python -m benchmarks.decode_frames --frames recordings/ # recorded segments (app/replay.py)
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import List
+
+from app.decoders import DECODE_ERRORS, available_decoders, get_decoder
+from app.replay import SEGMENT_SUFFIX, read_segments
+
+PAIRS = [
+    "BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT", "ADAUSDT",
+    "SHIBUSDT", "USDCUSDT", "SUIUSDT", "PEPEUSDT", "TRXUSDT", "LINKUSDT", "LTCUSDT",
+]
+
+
+def sample_frames(count: int, seed: int = 7) -> List[str]:
+    """Combined-stream frames in Binance's 24hr ticker layout (plus some trades)."""
+    rng = random.Random(seed)
+    frames = []
+    event_time = 1_700_000_000_000
+    for i in range(count):
+        pair = rng.choice(PAIRS)
+        price = rng.uniform(0.5, 70_000)
+        event_time += rng.randint(1, 50)
+        if i % 10 == 9:
+            data = {
+                "e": "trade", "E": event_time, "s": pair, "t": 12345 + i,
+                "p": f"{price:.8f}", "q": f"{rng.uniform(0, 5):.8f}",
+                "T": event_time, "m": bool(i % 2), "M": True,
+            }
+            stream = f"{pair.lower()}@trade"
+        else:
+            data = {
+                "e": "24hrTicker", "E": event_time, "s": pair,
+                "p": f"{rng.uniform(-500, 500):.8f}", "P": f"{rng.uniform(-5, 5):.3f}",
+                "w": f"{price:.8f}", "x": f"{price:.8f}", "c": f"{price:.8f}",
+                "Q": f"{rng.uniform(0, 2):.8f}", "b": f"{price:.8f}", "B": f"{rng.uniform(0, 9):.8f}",
+                "a": f"{price:.8f}", "A": f"{rng.uniform(0, 9):.8f}", "o": f"{price:.8f}",
+                "h": f"{price * 1.02:.8f}", "l": f"{price * 0.98:.8f}",
+                "v": f"{rng.uniform(1e3, 1e6):.8f}", "q": f"{rng.uniform(1e6, 1e9):.8f}",
+                "O": event_time - 86_400_000, "C": event_time, "F": 1, "L": 2 + i, "n": 1 + i,
+            }
+            stream = f"{pair.lower()}@ticker"
+        frames.append(json.dumps({"stream": stream, "data": data}, separators=(",", ":")))
+    return frames
+
+
+def load_frames(path: str) -> List[str]:
+    if os.path.isdir(path) or path.endswith(SEGMENT_SUFFIX):
+        return [frame for _, frame in read_segments([path])]
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def bench(name: str, frames: List[str], rounds: int) -> dict:
+    decoder = get_decoder(name)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for raw in frames:
+            try:
+                decoder.decode(raw)
+            except DECODE_ERRORS:
+                pass
+        best = min(best, time.perf_counter() - start)
+    return {
+        "decoder": name,
+        "frames": len(frames),
+        "frames_per_sec": round(len(frames) / best),
+        "ns_per_frame": round(best / len(frames) * 1e9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="file with one raw frame per line, or recorded segments")
+    parser.add_argument("--count", type=int, default=50_000, help="number of built-in frames")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else sample_frames(args.count)
+    # Binance sends text frames, so websockets hands the reader str; bench that path
+    results = [bench(name, frames, args.rounds) for name in available_decoders()]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    baseline = next(r for r in results if r["decoder"] == "json")
+    print(f"{'decoder':<10} {'frames/s':>12} {'ns/frame':>10} {'speedup':>8}")
+    for r in results:
+        speedup = baseline["ns_per_frame"] / r["ns_per_frame"]
+        print(f"{r['decoder']:<10} {r['frames_per_sec']:>12,} {r['ns_per_frame']:>10,} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Synthetic alert and market data generators for the alert-engine benchmarks.
+"""
+import random
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Real pairs first, then synthetic ones if more symbols are requested
+KNOWN_PRICES = {
+    "BTC": 67_000.0, "ETH": 3_500.0, "BNB": 580.0, "SOL": 150.0, "XRP": 0.52, "DOGE": 0.15,
+    "ADA": 0.45, "SHIB": 0.000024, "USDC": 1.0, "SUI": 1.1, "PEPE": 0.000011, "TRX": 0.12,
+    "LINK": 14.0, "LTC": 80.0, "BCH": 450.0, "DOT": 6.5, "AVAX": 30.0, "UNI": 8.0, "XLM": 0.1,
+}
+
+# Database condition types per (alert type, direction), as written by the frontend
+CONDITION_TYPES = {
+    ("price", "above"): "price_above",
+    ("price", "below"): "price_below",
+    ("price", "both"): "price_between",
+    ("percent_change", "above"): "percentage_increase",
+    ("percent_change", "below"): "percentage_decrease",
+    ("percent_change", "both"): "percentage_change",
+}
+
+
+def symbol_prices(count: int, seed: int = 3) -> Dict[str, float]:
+    """Crypto symbols (e.g. "BTC") with starting prices."""
+    rng = random.Random(seed)
+    prices = dict(list(KNOWN_PRICES.items())[:count])
+    for i in range(len(prices), count):
+        prices[f"SYM{i}"] = round(rng.uniform(0.01, 500), 6)
+    return prices
+
+
+def generate_alert_rows(
+    count: int,
+    prices: Dict[str, float],
+    percentage_share: float = 0.2,
+    users: Optional[int] = None,
+    seed: int = 5,
+) -> List[Dict]:
+    """Supabase-shaped alert rows (with conditions and notifications) around the given prices.
+
+    Price targets sit within +/-10% of the starting price; percentage alerts ask for 1-10% moves.
+    """
+    rng = random.Random(seed)
+    symbols = list(prices)
+    users = users or max(1, count // 10)
+    rows = []
+    for i in range(count):
+        symbol = rng.choice(symbols)
+        direction = rng.choice(("above", "below", "both"))
+        if rng.random() < percentage_share:
+            alert_type = "percent_change"
+            target = round(rng.uniform(1, 10), 2)
+        else:
+            alert_type = "price"
+            offset = rng.uniform(0.0, 0.10)
+            target = prices[symbol] * (1 - offset if direction == "below" else 1 + offset)
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": f"user-{rng.randrange(users)}",
+            "name": f"Alert {i}",
+            "description": "",
+            "symbol": symbol,
+            "alert_type": alert_type,
+            "is_active": True,
+            "created_at": "2024-01-01T00:00:00+00:00",
+            "updated_at": "2024-01-01T00:00:00+00:00",
+            "trigger_count": 0,
+            "is_recurring": False,
+            "alert_conditions": [{"condition_type": CONDITION_TYPES[(alert_type, direction)], "target_value": target}],
+            "alert_notifications": [
+                {"notification_type": "voice", "destination": f"+1555{rng.randrange(10**7):07d}", "is_enabled": True}
+            ],
+        })
+    return rows
+
+
+def random_walk_ticks(
+    prices: Dict[str, float],
+    count: int,
+    volatility: float = 0.001,
+    seed: int = 9,
+) -> Iterator[Tuple[str, float]]:
+    """(trading pair, price) ticks: each tick moves one random symbol by a Gaussian step."""
+    rng = random.Random(seed)
+    current = dict(prices)
+    symbols = list(current)
+    pairs = {symbol: f"{symbol}USDT" for symbol in symbols}
+    for _ in range(count):
+        symbol = rng.choice(symbols)
+        price = current[symbol] * (1 + rng.gauss(0, volatility))
+        current[symbol] = price
+        yield pairs[symbol], price
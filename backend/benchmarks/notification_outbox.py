@@ -0,0 +1,86 @@
+"""
+Notification outbox throughput benchmark.
+
+Adds N notifications to a NotificationOutbox the way the dispatcher does
+(a burst per event-loop turn), waits until they are committed, then marks
+them sent. Reports committed enqueues per second, the time the event loop
+spent inside ``add`` and the database size.
+
+Usage (from backend/):
+    python -m benchmarks.notification_outbox                   # 10k, 100k
+    python -m benchmarks.notification_outbox --sizes 50000 --burst 100
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict
+
+from app.models import AlertDirection, AlertTriggerEvent, AlertType
+from app.outbox import SENT, NotificationOutbox, idempotency_key
+
+
+def make_event(i: int) -> AlertTriggerEvent:
+    return AlertTriggerEvent(
+        alert_id=f"alert-{i}", symbol="BTC", trigger_price=70000.0, target_value=69000.0,
+        alert_type=AlertType.PRICE_TARGET, direction=AlertDirection.ABOVE,
+        message="CryptoAlarm Alert! BTC is now above 69,000.", triggered_at=datetime.now(), trigger_count=1,
+    )
+
+
+async def run_size(size: int, burst: int, path: str) -> Dict:
+    outbox = NotificationOutbox(path)
+    await outbox.open()
+    events = [make_event(i) for i in range(size)]
+    keys = [idempotency_key(event, "voice", f"+1555{i:07d}") for i, event in enumerate(events)]
+
+    add_seconds = 0.0
+    started = time.perf_counter()
+    for start in range(0, size, burst):
+        turn = time.perf_counter()
+        for i in range(start, min(start + burst, size)):
+            outbox.add(keys[i], events[i], "voice", f"+1555{i:07d}")
+        add_seconds += time.perf_counter() - turn
+        await asyncio.sleep(0)
+    await outbox.wait_durable()
+    enqueued = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for start in range(0, size, burst):
+        outbox.mark(keys[start:start + burst], SENT, 1)
+        await asyncio.sleep(0)
+    await outbox.wait_durable()
+    settled = time.perf_counter() - started
+    stats = outbox.get_stats()
+    await outbox.close()
+    return {
+        "enqueues_per_second": size / enqueued,
+        "settles_per_second": size / settled,
+        "add_us": add_seconds / size * 1e6,
+        "flushes": stats["flushes"],
+        "db_bytes": sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated notification counts")
+    parser.add_argument("--burst", type=int, default=500, help="notifications added per event-loop turn")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(s) for s in args.sizes.split(",")):
+            r = asyncio.run(run_size(size, args.burst, os.path.join(directory, f"outbox-{size}.db")))
+            print(
+                f"{size:>9,} notifications | {r['enqueues_per_second']:>9,.0f} enqueues/s committed "
+                f"({r['add_us']:.1f}us on the loop each) | {r['settles_per_second']:>9,.0f} settles/s | "
+                f"{r['flushes']} flushes | {r['db_bytes'] / 1e6:.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
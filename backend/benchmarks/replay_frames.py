@@ -0,0 +1,81 @@
+"""
+Replay recorded Binance frames through the decoder and AlertManager.
+
+Record frames in production by setting RECORD_FRAMES_DIR, then:
+    python -m benchmarks.replay_frames recordings/ --speed max --alerts 10000
+    python -m benchmarks.replay_frames recordings/frames-*.seg.gz --speed 10
+    python -m benchmarks.replay_frames --synthetic 100000 --speed max   # no recording needed
+"""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+from typing import Dict, List
+
+from app.alert_logic import AlertManager
+from app.decoders import DECODE_ERRORS, get_decoder
+from app.replay import FrameRecorder, Replayer, read_segments
+from benchmarks.decode_frames import sample_frames
+from benchmarks.generators import generate_alert_rows
+from benchmarks.standins import InMemorySupabase, NullNotificationService
+
+
+def record_synthetic(count: int, directory: str) -> List[str]:
+    """Write synthetic frames 10 ms apart into a segment, as the production recorder would."""
+    recorder = FrameRecorder(directory)
+    for i, frame in enumerate(sample_frames(count)):
+        recorder.record(frame, received_at=1_700_000_000 + i * 0.01)
+    recorder.close()
+    return [directory]
+
+
+def first_prices(paths: List[str]) -> Dict[str, float]:
+    """Opening price per crypto symbol (e.g. "BTC") in the recording."""
+    decoder = get_decoder()
+    prices: Dict[str, float] = {}
+    for _, raw in read_segments(paths):
+        try:
+            tick = decoder.decode(raw)
+        except DECODE_ERRORS:
+            continue
+        if tick is not None:
+            pair = decoder.symbols.symbol(tick.symbol_id)
+            prices.setdefault(pair[:-4] if pair.endswith("USDT") else pair, tick.price)
+    return prices
+
+
+async def replay(paths: List[str], speed, alerts: int) -> Dict:
+    rows = generate_alert_rows(alerts, first_prices(paths))
+    manager = AlertManager(db=InMemorySupabase(rows), notifier=NullNotificationService())
+    await manager.sync_database_alerts()
+    return await Replayer(manager, speed=speed).run(read_segments(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("segments", nargs="*", help="segment files or recording directories")
+    parser.add_argument("--speed", default="max", help="replay speed multiplier, or 'max'")
+    parser.add_argument("--alerts", type=int, default=10_000, help="generated alerts to arm (see benchmarks/generators.py)")
+    parser.add_argument("--synthetic", type=int, help="record this many synthetic frames and replay them")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    speed = None if args.speed == "max" else float(args.speed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = record_synthetic(args.synthetic, tmp) if args.synthetic else args.segments
+        if not paths:
+            parser.error("give segment paths or --synthetic N")
+        stats = asyncio.run(replay(paths, speed, args.alerts))
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    for key, value in stats.items():
+        print(f"{key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
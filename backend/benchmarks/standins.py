@@ -0,0 +1,84 @@
+"""
+In-memory stand-ins for Supabase and the notification service.
+They implement just the surface AlertManager uses and count the calls made.
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+class InMemorySupabase:
+    """Serves alert rows from memory; writes are counted, not stored.
+
+    Set ``failing`` to make the alert fetches fail the way SupabaseClient's do (None).
+    """
+
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None):
+        self.rows = rows or []
+        self.calls: Counter = Counter()
+        self.failing = False
+
+    def is_connected(self) -> bool:
+        return True
+
+    async def fetch_active_alerts(self) -> Optional[List[Dict[str, Any]]]:
+        self.calls["fetch_active_alerts"] += 1
+        if self.failing:
+            return None
+        return [row for row in self.rows if row.get("is_active", True)]
+
+    async def fetch_changed_alerts(self, since: str) -> Optional[List[Dict[str, Any]]]:
+        self.calls["fetch_changed_alerts"] += 1
+        if self.failing:
+            return None
+        return [row for row in self.rows if row.get("updated_at", "") > since]
+
+    async def fetch_active_alert_ids(self) -> Optional[List[str]]:
+        self.calls["fetch_active_alert_ids"] += 1
+        if self.failing:
+            return None
+        return [row["id"] for row in self.rows if row.get("is_active", True)]
+
+    async def fetch_alerts_by_ids(self, alert_ids: List[str]) -> Optional[List[Dict[str, Any]]]:
+        self.calls["fetch_alerts_by_ids"] += 1
+        if self.failing:
+            return None
+        wanted = set(alert_ids)
+        return [row for row in self.rows if row["id"] in wanted]
+
+    async def get_alert_by_id(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        self.calls["get_alert_by_id"] += 1
+        return next((row for row in self.rows if row["id"] == alert_id), None)
+
+    async def update_alert_status(self, alert_id: str, status_data: Dict[str, Any]) -> bool:
+        self.calls["update_alert_status"] += 1
+        return True
+
+    async def log_alert_trigger(self, alert_log_data: Dict[str, Any]) -> bool:
+        self.calls["log_alert_trigger"] += 1
+        return True
+
+    async def record_alert_triggers(self, triggers: List[Dict[str, Any]]) -> bool:
+        self.calls["record_alert_triggers"] += 1
+        return True
+
+    async def insert_alert_logs(self, rows: List[Dict[str, Any]]) -> bool:
+        self.calls["insert_alert_logs"] += 1
+        return True
+
+    async def create_alert_log_entry(self, alert_id: str, trigger_data: Dict[str, Any]) -> bool:
+        self.calls["create_alert_log_entry"] += 1
+        return True
+
+
+class NullNotificationService:
+    """Accepts trigger events without sending anything."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def is_twilio_configured(self) -> bool:
+        return False
+
+    async def send_notifications(self, trigger_event) -> List[Dict[str, Any]]:
+        self.sent += 1
+        return []
@@ -0,0 +1,116 @@
+"""
+Vectorized vs indexed alert evaluation.
+
+Syncs the same synthetic alerts into two AlertManagers, one on the indexed
+engine (the reference semantics of _check_price_target / _check_percentage_change)
+and one on the NumPy engine, then feeds both the same conflated tick batches.
+Every batch must trigger exactly the same alert ids and capture the same
+percentage baselines; timings are reported per engine.
+
+Usage (from backend/, requires numpy):
+    python -m benchmarks.vector_engine                          # 100k and 300k alerts
+    python -m benchmarks.vector_engine --sizes 100000 --batches 2000 --batch-size 10
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from app.alert_logic import AlertManager
+from app.vector_engine import VECTOR_ENGINE_AVAILABLE
+from benchmarks.generators import generate_alert_rows, random_walk_ticks, symbol_prices
+from benchmarks.standins import InMemorySupabase, NullNotificationService
+
+
+def conflated_batches(ticks: Iterator[Tuple[str, float]], batch_size: int) -> Iterator[List[Tuple[str, float]]]:
+    """Group ticks the way ConflatingTickBuffer does: latest price per symbol, up to ``batch_size`` symbols."""
+    batch: Dict[str, float] = {}
+    for pair, price in ticks:
+        batch[pair] = price
+        if len(batch) >= batch_size:
+            yield list(batch.items())
+            batch = {}
+    if batch:
+        yield list(batch.items())
+
+
+async def run_size(size: int, symbols: int, batches: int, batch_size: int, percentage_share: float) -> Dict:
+    prices = symbol_prices(symbols)
+    rows = generate_alert_rows(size, prices, percentage_share=percentage_share)
+    indexed = AlertManager(db=InMemorySupabase(rows), notifier=NullNotificationService(), vector_engine=False)
+    vector = AlertManager(db=InMemorySupabase(rows), notifier=NullNotificationService(), vector_engine=True)
+
+    sync_seconds = {}
+    for name, manager in (("indexed", indexed), ("vector", vector)):
+        started = time.perf_counter()
+        await manager.sync_database_alerts()
+        sync_seconds[name] = round(time.perf_counter() - started, 3)
+
+    work = list(conflated_batches(random_walk_ticks(prices, batches * batch_size, volatility=0.004), batch_size))
+    elapsed = {"indexed": 0.0, "vector": 0.0}
+    mismatches = 0
+    triggers = 0
+    for batch in work:
+        started = time.perf_counter()
+        expected = await indexed.check_alert_batch(batch)
+        elapsed["indexed"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        got = await vector.check_alert_batch(batch)
+        elapsed["vector"] += time.perf_counter() - started
+
+        triggers += len(expected)
+        if {e.alert_id for e in expected} != {e.alert_id for e in got}:
+            mismatches += 1
+
+    baseline_mismatches = sum(
+        1 for alert_id, alert in indexed.alerts.items()
+        if vector.alerts[alert_id].baseline_price != alert.baseline_price
+    )
+    ticks = sum(len(batch) for batch in work)
+    return {
+        "alerts": size,
+        "batches": len(work),
+        "ticks": ticks,
+        "triggers": triggers,
+        "mismatched_batches": mismatches,
+        "mismatched_baselines": baseline_mismatches,
+        "sync_seconds": sync_seconds,
+        "indexed_ticks_per_second": round(ticks / elapsed["indexed"]),
+        "vector_ticks_per_second": round(ticks / elapsed["vector"]),
+        "speedup": round(elapsed["indexed"] / elapsed["vector"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,300000", help="comma-separated alert counts")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--batches", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=8, help="distinct symbols per conflated batch")
+    parser.add_argument("--percentage-share", type=float, default=0.2, help="fraction of PERCENTAGE_CHANGE alerts")
+    args = parser.parse_args()
+
+    if not VECTOR_ENGINE_AVAILABLE:
+        parser.exit(1, "numpy is not installed\n")
+
+    logging.disable(logging.WARNING)
+    failed = False
+    for size in (int(s) for s in args.sizes.split(",")):
+        result = asyncio.run(run_size(size, args.symbols, args.batches, args.batch_size, args.percentage_share))
+        failed |= bool(result["mismatched_batches"] or result["mismatched_baselines"])
+        print(
+            f"{size:>9,} alerts | {result['ticks']:,} ticks in {result['batches']:,} batches | "
+            f"indexed {result['indexed_ticks_per_second']:,} ticks/s | vector {result['vector_ticks_per_second']:,} ticks/s | "
+            f"x{result['speedup']} | {result['triggers']:,} triggers | "
+            f"mismatches {result['mismatched_batches']} batches, {result['mismatched_baselines']} baselines"
+        )
+        gc.collect()
+    if failed:
+        raise SystemExit("vector engine diverged from the reference evaluation")
+
+
+if __name__ == "__main__":
+    main()
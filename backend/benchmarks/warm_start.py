@@ -0,0 +1,114 @@
+"""
+Boot-to-armed benchmark: full sync versus a warm-start snapshot.
+
+Syncs N alerts into an AlertManager, lets percentage alerts capture their
+baselines, writes a warm-start snapshot, then boots a fresh manager both ways
+and reports how long it took until alerts were armed. ``--db-latency`` adds a
+fixed delay to the full fetch to stand in for Supabase round trips.
+
+Usage (from backend/):
+    python -m benchmarks.warm_start                          # 10k, 100k, 1M alerts
+    python -m benchmarks.warm_start --sizes 100000 --db-latency 2.0
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import tempfile
+import time
+from typing import Dict
+
+from app.alert_logic import AlertManager
+from app.models import AlertStatus, AlertType
+from app.warm_start import WarmStartStore
+from benchmarks.generators import generate_alert_rows, symbol_prices
+from benchmarks.standins import InMemorySupabase, NullNotificationService
+
+
+class SlowSupabase(InMemorySupabase):
+    """In-memory rows behind a fixed full-fetch delay."""
+
+    def __init__(self, rows, latency: float):
+        super().__init__(rows)
+        self.latency = latency
+
+    async def fetch_active_alerts(self):
+        await asyncio.sleep(self.latency)
+        return await super().fetch_active_alerts()
+
+
+async def run_size(size: int, symbols: int, db_latency: float, path: str) -> Dict:
+    prices = symbol_prices(symbols)
+    db = SlowSupabase(generate_alert_rows(size, prices), db_latency)
+    manager = AlertManager(db=db, notifier=NullNotificationService())
+    await manager.sync_database_alerts()
+    for pair, price in prices.items():
+        await manager.check_alert_conditions(pair, price)
+    store = WarmStartStore(path)
+    await store.checkpoint(manager, prices)
+    baselines = sum(1 for alert in manager.alerts.values() if alert.baseline_price)
+    del manager
+    gc.collect()
+
+    started = time.perf_counter()
+    cold = AlertManager(db=db, notifier=NullNotificationService())
+    await cold.sync_database_alerts()
+    cold_armed = time.perf_counter() - started
+    cold_baselines = sum(1 for alert in cold.alerts.values() if alert.baseline_price)
+    del cold
+    gc.collect()
+
+    started = time.perf_counter()
+    warm = AlertManager(db=db, notifier=NullNotificationService())
+    loader = WarmStartStore(path)
+    restored = await loader.restore(warm, {})
+    warm_armed = time.perf_counter() - started
+    assert restored
+    armed = warm.snapshot.count(AlertStatus.ACTIVE)
+    kept = sum(1 for alert in warm.alerts.values()
+               if alert.alert_type == AlertType.PERCENTAGE_CHANGE and alert.baseline_price)
+    # The reconciling sync that follows a warm start is a delta, not a reload
+    started = time.perf_counter()
+    await warm.sync_database_alerts()
+    reconcile = time.perf_counter() - started
+    await warm.writes.close()
+
+    return {
+        "alerts": size,
+        "snapshot_bytes": store.last_save_bytes,
+        "save_ms": round(store.last_save_ms, 1),
+        "cold_boot_to_armed_ms": round(cold_armed * 1000, 1),
+        "warm_boot_to_armed_ms": round(warm_armed * 1000, 1),
+        "load_ms": round(loader.last_load_ms, 1),
+        "reconcile_ms": round(reconcile * 1000, 1),
+        "armed": armed,
+        "baselines_saved": baselines,
+        "baselines_restored": kept,
+        "baselines_after_cold_boot": cold_baselines,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated alert counts")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--db-latency", type=float, default=0.0, help="seconds added to the full fetch")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "engine.snapshot")
+        for size in (int(s) for s in args.sizes.split(",")):
+            r = asyncio.run(run_size(size, args.symbols, args.db_latency, path))
+            print(
+                f"{size:>9,} alerts | snapshot {r['snapshot_bytes'] / 1e6:.1f} MB saved in {r['save_ms']:.0f}ms | "
+                f"boot-to-armed cold {r['cold_boot_to_armed_ms']:.0f}ms warm {r['warm_boot_to_armed_ms']:.0f}ms "
+                f"(file load {r['load_ms']:.0f}ms) | "
+                f"reconcile {r['reconcile_ms']:.0f}ms | baselines {r['baselines_restored']:,}/{r['baselines_saved']:,} "
+                f"kept (cold boot: {r['baselines_after_cold_boot']:,})"
+            )
+
+
+if __name__ == "__main__":
+    main()
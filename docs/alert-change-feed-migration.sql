@@ -0,0 +1,45 @@
+-- Migration: Push alert changes to the backend with LISTEN/NOTIFY
+-- Run this in your Supabase SQL Editor.
+--
+-- Every insert, update or delete on alerts, alert_conditions or
+-- alert_notifications sends a notification on the 'alert_changes' channel
+-- naming the affected alert. The backend LISTENs on it and re-reads only those
+-- alerts, so the 30-second poll is no longer needed while it is connected.
+--
+-- Point SUPABASE_DB_URL at the direct (port 5432) or session-mode connection
+-- string. The transaction-mode pooler (port 6543) does not deliver notifications.
+
+-- Payload: {"table": ..., "op": ..., "alert_id": ..., "ts": commit-side epoch seconds}
+-- Only the id is sent, which keeps payloads far below the 8000 byte limit.
+CREATE OR REPLACE FUNCTION notify_alert_change()
+RETURNS TRIGGER AS $$
+DECLARE
+  changed_alert_id UUID;
+BEGIN
+  IF TG_TABLE_NAME = 'alerts' THEN
+    changed_alert_id := COALESCE(NEW.id, OLD.id);
+  ELSE
+    changed_alert_id := COALESCE(NEW.alert_id, OLD.alert_id);
+  END IF;
+
+  PERFORM pg_notify('alert_changes', json_build_object(
+    'table', TG_TABLE_NAME,
+    'op', TG_OP,
+    'alert_id', changed_alert_id,
+    'ts', extract(epoch FROM clock_timestamp())
+  )::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_alerts_change
+  AFTER INSERT OR UPDATE OR DELETE ON public.alerts
+  FOR EACH ROW EXECUTE PROCEDURE notify_alert_change();
+
+CREATE TRIGGER notify_alert_conditions_change
+  AFTER INSERT OR UPDATE OR DELETE ON public.alert_conditions
+  FOR EACH ROW EXECUTE PROCEDURE notify_alert_change();
+
+CREATE TRIGGER notify_alert_notifications_change
+  AFTER INSERT OR UPDATE OR DELETE ON public.alert_notifications
+  FOR EACH ROW EXECUTE PROCEDURE notify_alert_change();
@@ -0,0 +1,60 @@
+-- Migration: Atomic, batched trigger bookkeeping
+-- Run this in your Supabase SQL Editor.
+--
+-- The backend used to read trigger_count and write back count + 1, which took
+-- two round trips and lost increments when triggers raced. record_alert_triggers
+-- applies a whole batch of triggers in one statement: it raises trigger_count to
+-- the trigger's sequence number, sets triggered_at and last_trigger_price, and
+-- deactivates alerts that are not recurring.
+--
+-- The sequence is the backend's own count for the trigger (1 for the first one),
+-- so applying a batch twice (a write that committed but timed out and was sent
+-- again) leaves the count where it was. The notification outbox keys its rows on
+-- the same number.
+
+ALTER TABLE public.alerts
+ADD COLUMN IF NOT EXISTS last_trigger_price NUMERIC;
+
+-- triggers: [{"alert_id": uuid, "trigger_count": int, "price": number, "triggered_at": timestamptz}, ...]
+-- The highest trigger_count per alert wins; the latest entry sets the price and time.
+-- An entry without trigger_count (a caller with no sequence of its own) adds one to the count.
+CREATE OR REPLACE FUNCTION public.record_alert_triggers(triggers JSONB)
+RETURNS TABLE (alert_id UUID, trigger_count INTEGER, is_active BOOLEAN) AS $$
+  WITH entries AS (
+    SELECT
+      (t->>'alert_id')::UUID AS alert_id,
+      (t->>'trigger_count')::INTEGER AS seq,
+      (t->>'price')::NUMERIC AS price,
+      COALESCE((t->>'triggered_at')::TIMESTAMPTZ, NOW()) AS triggered_at
+    FROM jsonb_array_elements(triggers) AS t
+  ), batch AS (
+    SELECT
+      alert_id,
+      MAX(seq) AS seq,
+      COUNT(*) FILTER (WHERE seq IS NULL)::INTEGER AS unsequenced,
+      MAX(triggered_at) AS triggered_at,
+      (ARRAY_AGG(price ORDER BY triggered_at DESC))[1] AS price
+    FROM entries
+    GROUP BY alert_id
+  )
+  UPDATE public.alerts AS a
+  SET
+    trigger_count = GREATEST(COALESCE(a.trigger_count, 0) + batch.unsequenced, COALESCE(batch.seq, 0)),
+    triggered_at = GREATEST(a.triggered_at, batch.triggered_at),
+    last_trigger_price = COALESCE(batch.price, a.last_trigger_price),
+    is_active = a.is_active AND COALESCE(a.is_recurring, false)
+  FROM batch
+  WHERE a.id = batch.alert_id
+  RETURNING a.id, a.trigger_count, a.is_active;
+$$ LANGUAGE sql;
+
+-- Single-trigger convenience wrapper
+CREATE OR REPLACE FUNCTION public.record_alert_trigger(p_alert_id UUID, p_price NUMERIC, p_triggered_at TIMESTAMPTZ DEFAULT NOW())
+RETURNS TABLE (alert_id UUID, trigger_count INTEGER, is_active BOOLEAN) AS $$
+  SELECT * FROM public.record_alert_triggers(
+    jsonb_build_array(jsonb_build_object('alert_id', p_alert_id, 'price', p_price, 'triggered_at', p_triggered_at))
+  );
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION public.record_alert_triggers(JSONB) IS 'Atomically record a batch of alert triggers (count, time, last price, one-time deactivation)';
+COMMENT ON COLUMN public.alerts.last_trigger_price IS 'Price at the most recent trigger';
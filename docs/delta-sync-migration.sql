@@ -0,0 +1,47 @@
+-- Migration: Support incremental (delta) alert sync in the backend
+-- Run this in your Supabase SQL Editor.
+--
+-- The backend keeps a high-water mark of alerts.updated_at and only fetches rows
+-- changed since then. Edits to an alert's conditions or notifications must
+-- therefore also move the parent alert's updated_at.
+
+-- Child tables get their own updated_at
+ALTER TABLE public.alert_conditions
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+ALTER TABLE public.alert_notifications
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE TRIGGER handle_alert_conditions_updated_at
+  BEFORE UPDATE ON public.alert_conditions
+  FOR EACH ROW EXECUTE PROCEDURE handle_updated_at();
+
+CREATE TRIGGER handle_alert_notifications_updated_at
+  BEFORE UPDATE ON public.alert_notifications
+  FOR EACH ROW EXECUTE PROCEDURE handle_updated_at();
+
+-- Any insert, update or delete of a child row touches the parent alert
+CREATE OR REPLACE FUNCTION touch_parent_alert()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE public.alerts
+  SET updated_at = NOW()
+  WHERE id = COALESCE(NEW.alert_id, OLD.alert_id);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER touch_alert_on_condition_change
+  AFTER INSERT OR UPDATE OR DELETE ON public.alert_conditions
+  FOR EACH ROW EXECUTE PROCEDURE touch_parent_alert();
+
+CREATE TRIGGER touch_alert_on_notification_change
+  AFTER INSERT OR UPDATE OR DELETE ON public.alert_notifications
+  FOR EACH ROW EXECUTE PROCEDURE touch_parent_alert();
+
+-- Delta query: alerts changed since the high-water mark
+CREATE INDEX IF NOT EXISTS idx_alerts_updated_at ON public.alerts(updated_at);
+CREATE INDEX IF NOT EXISTS idx_alert_notifications_alert_id ON public.alert_notifications(alert_id);
+
+COMMENT ON COLUMN public.alert_conditions.updated_at IS 'Last change; also propagated to alerts.updated_at for delta sync';
+COMMENT ON COLUMN public.alert_notifications.updated_at IS 'Last change; also propagated to alerts.updated_at for delta sync';